@@ -1,14 +1,22 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from typing import List, Literal, Optional
+from app.models.job import IngestJob
 from app.models.video import Video, SearchResult, VideoSegment
+from app.services.executor import run_blocking
+from app.services.job_service import get_job, submit_job
 from app.services.video_service import (
-    process_video,
-    search_video_segments,
-    get_all_segments,
-    get_processed_videos,
-    get_video_by_id,
+    SEARCH_BATCH_MAX_QUERIES,
+    async_search_video_segments,
+    async_search_video_segments_batch,
+    async_get_segments_page,
+    async_iter_segments,
+    async_find_processed_video,
+    async_get_processed_videos,
+    async_get_video_by_id,
+    extract_video_id,
 )
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 router = APIRouter()
 
@@ -17,36 +25,57 @@ class VideoRequest(BaseModel):
     url: str
 
 
+class BatchSearchQuery(BaseModel):
+    """A single search of a batch search request."""
+
+    query: str = Field(..., description="Search query for video content")
+    video_id: Optional[str] = Field(None, description="Optional YouTube video ID to limit search")
+    limit: int = Field(5, ge=1, description="Maximum number of results to return")
+
+
+class BatchSearchRequest(BaseModel):
+    """Request model for many searches sharing the same search parameters."""
+
+    queries: List[BatchSearchQuery] = Field(
+        ..., min_length=1, max_length=SEARCH_BATCH_MAX_QUERIES
+    )
+    hnsw_ef: Optional[int] = Field(None, ge=1)
+    oversampling: Optional[float] = Field(None, ge=1)
+    rescore: Optional[bool] = None
+    exact: Optional[bool] = None
+    mode: Optional[Literal["hybrid", "dense", "lexical"]] = None
+
+
 class VideoResponse(BaseModel):
     """Response model for video processing with additional status information."""
 
     video: Video
     newly_processed: bool = False
+    job: Optional[IngestJob] = None
 
 
 @router.post("/process", response_model=VideoResponse)
 async def process_video_endpoint(video_request: VideoRequest) -> VideoResponse:
-    """Process a YouTube video to extract and store transcript segments.
-    If the video has already been processed, returns the existing data without reprocessing."""
+    """Queue a YouTube video for background processing.
+    If the video has already been processed, returns the existing data without reprocessing.
+    Otherwise returns the ingestion job, whose progress is available at /jobs/{job_id}."""
     try:
         import logging
 
         # Get the video ID first
-        from app.services.video_service import extract_video_id, get_video_by_id
-
         video_id = extract_video_id(video_request.url)
 
-        # Check if already processed
-        existing_video = get_video_by_id(video_id)
-        already_processed = existing_video is not None and existing_video.processed
+        # Check if already processed, in the registry only: the metadata of
+        # new videos is fetched by the job, along with their transcript
+        existing_video = await async_find_processed_video(video_id)
 
-        if already_processed:
+        if existing_video is not None:
             logging.info(f"Video {video_id} already processed, returning existing data")
             return VideoResponse(video=existing_video, newly_processed=False)
 
-        # Process the video if needed
-        result = process_video(video_request.url)
-        return VideoResponse(video=result, newly_processed=True)
+        # Enqueue the video for processing, reusing any job already running for it
+        job = await run_blocking(submit_job, video_request.url)
+        return VideoResponse(video=Video(video_id=video_id), newly_processed=True, job=job)
 
     except Exception as e:
         import logging
@@ -64,8 +93,23 @@ async def search_video_endpoint(
         None, description="Optional YouTube video ID to limit search"
     ),
     limit: int = Query(5, description="Maximum number of results to return"),
+    hnsw_ef: Optional[int] = Query(
+        None, ge=1, description="HNSW search breadth, higher is more accurate and slower"
+    ),
+    oversampling: Optional[float] = Query(
+        None, ge=1, description="Candidates fetched with quantized vectors, per result"
+    ),
+    rescore: Optional[bool] = Query(
+        None, description="Rescore quantized candidates with the original vectors"
+    ),
+    exact: Optional[bool] = Query(None, description="Search exhaustively, without the index"),
+    mode: Optional[Literal["hybrid", "dense", "lexical"]] = Query(
+        None,
+        description="Semantic and keyword search fused by rank (hybrid), or only one of them",
+    ),
 ) -> List[SearchResult]:
-    """Search for video segments based on the provided query."""
+    """Search for video segments based on the provided query.
+    Search parameters that are not given use the server defaults."""
     import logging
 
     # Check for invalid video_id
@@ -74,7 +118,16 @@ async def search_video_endpoint(
         video_id = None  # Clear invalid video_id to perform a global search instead
 
     try:
-        results = search_video_segments(query, video_id, limit)
+        results = await async_search_video_segments(
+            query,
+            video_id,
+            limit,
+            hnsw_ef=hnsw_ef,
+            oversampling=oversampling,
+            rescore=rescore,
+            exact=exact,
+            mode=mode,
+        )
         return results
     except Exception as e:
         logging.error(
@@ -83,9 +136,57 @@ async def search_video_endpoint(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/search/batch")
+async def search_video_batch_endpoint(
+    batch_request: BatchSearchRequest,
+) -> List[List[SearchResult]]:
+    """Run many searches in a single request.
+    The results of each query are returned in the order of the queries. All
+    the queries are encoded together and searched with one Qdrant request."""
+    import logging
+
+    searches = []
+    for item in batch_request.queries:
+        video_id = item.video_id
+        # Invalid video IDs get a global search, as in the single search endpoint
+        if video_id and video_id.lower() in ("undefined", "null"):
+            video_id = None
+        searches.append((item.query, video_id, item.limit))
+
+    try:
+        return await async_search_video_segments_batch(
+            searches,
+            hnsw_ef=batch_request.hnsw_ef,
+            oversampling=batch_request.oversampling,
+            rescore=batch_request.rescore,
+            exact=batch_request.exact,
+            mode=batch_request.mode,
+        )
+    except Exception as e:
+        logging.error(f"Error running a batch of {len(searches)} searches: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/segments/{video_id}")
-async def get_segments_endpoint(video_id: str) -> List[VideoSegment]:
-    """Get all segments for a specific video, ordered by start time."""
+async def get_segments_endpoint(
+    video_id: str,
+    response: Response,
+    start: Optional[float] = Query(
+        None, ge=0, description="Only return segments starting at or after this time (s)"
+    ),
+    end: Optional[float] = Query(
+        None, ge=0, description="Only return segments starting before this time (s)"
+    ),
+    cursor: Optional[float] = Query(
+        None, description="Cursor of the page to return, from the X-Next-Cursor header"
+    ),
+    limit: Optional[int] = Query(
+        None, ge=1, le=1000, description="Maximum number of segments to return"
+    ),
+) -> List[VideoSegment]:
+    """Get the segments of a specific video, ordered by start time.
+    Without a limit, all the segments in the time range are returned. With a
+    limit, the cursor of the next page is sent in the X-Next-Cursor header."""
     import logging
 
     # Check for invalid video ID
@@ -94,10 +195,18 @@ async def get_segments_endpoint(video_id: str) -> List[VideoSegment]:
         return []  # Return empty list for invalid IDs to avoid frontend errors
 
     try:
-        segments = get_all_segments(video_id)
-        if not segments:
-            # Return an empty list instead of 404 to allow frontend to handle gracefully
-            return []
+        # Unknown videos get an empty list instead of 404, for the frontend to handle gracefully
+        if limit is None:
+            # The whole range is returned, so a cursor only moves its start
+            if cursor is not None:
+                start = max(start or 0.0, cursor)
+            return [segment async for segment in async_iter_segments(video_id, start, end)]
+
+        segments, next_cursor = await async_get_segments_page(
+            video_id, start, end, cursor, limit
+        )
+        if next_cursor is not None:
+            response.headers["X-Next-Cursor"] = repr(next_cursor)
         return segments
     except Exception as e:
         # Log the exception for debugging
@@ -107,13 +216,35 @@ async def get_segments_endpoint(video_id: str) -> List[VideoSegment]:
         )
 
 
+@router.get("/segments/{video_id}/stream")
+async def stream_segments_endpoint(
+    video_id: str,
+    start: Optional[float] = Query(None, ge=0, description="Start of the time range (s)"),
+    end: Optional[float] = Query(None, ge=0, description="End of the time range (s)"),
+) -> StreamingResponse:
+    """Stream the segments of a video as newline-delimited JSON, ordered by start time.
+    Segments are read from Qdrant page by page, so exports of long videos use
+    constant memory."""
+    import logging
+
+    async def lines():
+        try:
+            async for segment in async_iter_segments(video_id, start, end):
+                yield segment.model_dump_json() + "\n"
+        except Exception as e:
+            # The response has already started, so the stream just ends early
+            logging.error(f"Error streaming segments for video {video_id}: {str(e)}")
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @router.get("/recent")
 async def get_recent_videos_endpoint(
     limit: int = Query(10, description="Maximum number of videos to return"),
 ) -> List[Video]:
     """Get recently processed videos ordered by creation time."""
     try:
-        videos = get_processed_videos(limit=limit)
+        videos = await async_get_processed_videos(limit=limit)
         return videos
     except Exception as e:
         # Log the exception for debugging
@@ -129,7 +260,7 @@ async def get_recent_videos_endpoint(
 async def get_video_info_endpoint(video_id: str) -> Video:
     """Get metadata for a specific video."""
     try:
-        video = get_video_by_id(video_id)
+        video = await async_get_video_by_id(video_id)
         if not video:
             # Return a basic video object if not found in database
             return Video(video_id=video_id, title=f"Video {video_id}")
@@ -141,3 +272,12 @@ async def get_video_info_endpoint(video_id: str) -> Video:
         raise HTTPException(
             status_code=500, detail=f"Could not retrieve video info: {str(e)}"
         )
+
+
+@router.get("/jobs/{job_id}")
+async def get_job_endpoint(job_id: str) -> IngestJob:
+    """Get the status and progress of a video ingestion job."""
+    job = await run_blocking(get_job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
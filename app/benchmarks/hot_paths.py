@@ -0,0 +1,460 @@
+"""
+Latency of the ingest and search hot paths, measured offline.
+
+Runs against an in-process Qdrant (in memory, or a local-mode directory with
+--qdrant-path) filled with synthetic transcripts, and measures at p50, p95
+and p99:
+- segmentation: normalizing and segmenting a transcript, as process_video does
+- embed_single and embed_batch: get_embeddings for one text, and
+  get_embeddings_batch for a batch of texts
+- store_segments: embedding and upserting the segments of a video
+- search_<mode>: search_video_segments in every mode the collection supports,
+  and search_filtered: a search within a single video
+- get_all_segments: reading all the segments of a video
+
+The embedding model is loaded from the local model cache, without network
+access, or replaced with a deterministic synthetic encoder (--encoder
+synthetic) for machines that do not have it. Search caches are disabled, so
+every search encodes its query and queries Qdrant.
+
+Results are written as JSON with --output. With --compare, a previous result
+file is used as the baseline, and the command exits with status 1 if any
+benchmark got slower than the tolerance allows, so it can gate deploys.
+
+Run with: python -m app.benchmarks.hot_paths [--output results.json] [--compare baseline.json]
+"""
+
+import os
+
+# The Qdrant clients and the search cache are created from the environment
+# when the services are imported, so it is set up first
+os.environ["QDRANT_URL"] = ":memory:"
+os.environ.pop("QDRANT_API_KEY", None)
+os.environ["SEARCH_CACHE_BACKEND"] = "none"
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+
+import argparse  # noqa: E402
+import json  # noqa: E402
+import platform  # noqa: E402
+import random  # noqa: E402
+import sys  # noqa: E402
+import time  # noqa: E402
+import warnings  # noqa: E402
+import zlib  # noqa: E402
+from datetime import datetime  # noqa: E402
+from typing import Any, Callable, Dict, List, Optional  # noqa: E402
+
+import numpy as np  # noqa: E402
+
+from app.services import embedding_service, qdrant_service, video_service  # noqa: E402
+from app.services.embedding_service import get_embeddings, get_embeddings_batch  # noqa: E402
+from app.services.video_service import (  # noqa: E402
+    SEARCH_MODES,
+    SPARSE_VECTOR_NAME,
+    ensure_collection_exists,
+    get_all_segments,
+    get_segment_vectors,
+    normalize_transcript,
+    query_embedding_cache,
+    search_video_segments,
+    segment_transcript,
+    store_segments,
+)
+
+RESULTS_FORMAT_VERSION = 1
+
+
+class SyntheticEncoder:
+    """
+    Deterministic stand-in for the embedding model.
+
+    Every token gets a fixed pseudo-random vector, and a text is embedded as
+    the normalized mean of the vectors of its tokens, so texts sharing words
+    are close. It costs about as much as a static embedding model.
+    """
+
+    def __init__(self, dimension: int = 1024):
+        self._dimension = dimension
+        self._token_vectors: Dict[str, np.ndarray] = {}
+
+    def _token_vector(self, token: str) -> np.ndarray:
+        vector = self._token_vectors.get(token)
+        if vector is None:
+            rng = np.random.default_rng(zlib.crc32(token.encode("utf-8")))
+            vector = rng.standard_normal(self._dimension).astype(np.float32)
+            self._token_vectors[token] = vector
+        return vector
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        embeddings = np.zeros((len(texts), self._dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = text.lower().split()
+            if tokens:
+                embeddings[row] = np.mean([self._token_vector(t) for t in tokens], axis=0)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
+
+    def dimension(self) -> int:
+        return self._dimension
+
+    def max_seq_length(self) -> Optional[int]:
+        return None
+
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        return [len(text.split()) for text in texts]
+
+
+def use_local_qdrant(path: str) -> None:
+    """Run the benchmarks against a local-mode Qdrant stored in `path`."""
+    from qdrant_client import QdrantClient
+
+    client = QdrantClient(path=path)
+    qdrant_service.qdrant_client = client
+    video_service.qdrant_client = client
+
+
+def make_vocabulary(size: int, seed: int = 0) -> List[str]:
+    """Generate pronounceable pseudo-words, to be drawn with Zipf frequencies."""
+    rng = random.Random(seed)
+    syllables = [c + v for c in "bcdfghklmnprstvz" for v in "aeiou"]
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(syllables) for _ in range(rng.randint(1, 4))))
+    return sorted(words)
+
+
+class TranscriptGenerator:
+    """Synthetic transcripts and queries, with Zipf-distributed word frequencies."""
+
+    def __init__(self, vocabulary_size: int = 5000, seed: int = 0):
+        self.vocabulary = make_vocabulary(vocabulary_size, seed)
+        ranks = np.arange(1, len(self.vocabulary) + 1)
+        self.weights = (1.0 / ranks) / np.sum(1.0 / ranks)
+        self.rng = np.random.default_rng(seed)
+
+    def _words(self, count: int) -> List[str]:
+        indexes = self.rng.choice(len(self.vocabulary), size=count, p=self.weights)
+        return [self.vocabulary[index] for index in indexes]
+
+    def transcript(
+        self, entries: int, words_per_entry: int = 12, entry_seconds: float = 4.0
+    ) -> List[Dict[str, Any]]:
+        """A raw transcript, as returned by the transcript sources."""
+        words = self._words(entries * words_per_entry)
+        return [
+            {
+                "text": " ".join(words[i * words_per_entry : (i + 1) * words_per_entry]),
+                "start": i * entry_seconds,
+                "duration": entry_seconds,
+            }
+            for i in range(entries)
+        ]
+
+    def queries(self, count: int) -> List[str]:
+        """Queries of 2 to 6 words, skipping the most frequent words."""
+        queries = []
+        for _ in range(count):
+            length = int(self.rng.integers(2, 7))
+            indexes = self.rng.integers(20, len(self.vocabulary) // 2, size=length)
+            queries.append(" ".join(self.vocabulary[index] for index in indexes))
+        return queries
+
+
+def measure(
+    run: Callable[[int], Any],
+    iterations: int,
+    warmup: int,
+    before: Optional[Callable[[int], Any]] = None,
+) -> List[float]:
+    """Time `iterations` calls of run(i) after `warmup` untimed ones, in seconds.
+    `before` is called untimed before every call."""
+    samples = []
+    for i in range(warmup + iterations):
+        if before:
+            before(i)
+        started = time.perf_counter()
+        run(i)
+        elapsed = time.perf_counter() - started
+        if i >= warmup:
+            samples.append(elapsed)
+    return samples
+
+
+def summarize(samples: List[float], items: int = 1) -> Dict[str, float]:
+    """Latency percentiles of the samples, in milliseconds."""
+    latencies = np.asarray(samples) * 1000
+    return {
+        "iterations": len(samples),
+        "items": items,
+        "mean_ms": float(np.mean(latencies)),
+        "min_ms": float(np.min(latencies)),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def run_benchmarks(args: argparse.Namespace) -> Dict[str, Dict[str, float]]:
+    """Fill the collection with synthetic videos and measure every hot path."""
+    import logging
+
+    generator = TranscriptGenerator(seed=args.seed)
+    transcripts = {
+        f"bench{index:05d}": generator.transcript(args.transcript_entries)
+        for index in range(args.videos)
+    }
+    video_ids = list(transcripts)
+    queries = generator.queries(max(args.iterations + args.warmup, 1))
+
+    ensure_collection_exists()
+    segments = {}
+    logging.info(f"Storing {len(video_ids)} synthetic videos")
+    for video_id, transcript in transcripts.items():
+        segments[video_id] = segment_transcript(video_id, normalize_transcript(transcript))
+        store_segments(segments[video_id])
+
+    results = {}
+
+    def record(name: str, samples: List[float], items: int = 1) -> None:
+        results[name] = summarize(samples, items)
+        logging.info(f"{name}: p50 {results[name]['p50_ms']:.2f} ms")
+
+    first = transcripts[video_ids[0]]
+    record(
+        "segmentation",
+        measure(
+            lambda i: segment_transcript(video_ids[0], normalize_transcript(first)),
+            args.iterations,
+            args.warmup,
+        ),
+        items=len(first),
+    )
+
+    texts = [segment.text for segment in segments[video_ids[0]]]
+    record(
+        "embed_single",
+        measure(lambda i: get_embeddings(texts[i % len(texts)]), args.iterations, args.warmup),
+    )
+    batch = texts[: args.embedding_batch_size]
+    record(
+        "embed_batch",
+        measure(
+            lambda i: get_embeddings_batch(batch, len(batch)), args.iterations, args.warmup
+        ),
+        items=len(batch),
+    )
+
+    # The same points are upserted again, so the collection keeps its size
+    record(
+        "store_segments",
+        measure(
+            lambda i: store_segments(segments[video_ids[i % len(video_ids)]]),
+            args.store_iterations,
+            min(args.warmup, 1),
+        ),
+        items=len(segments[video_ids[0]]),
+    )
+
+    def clear_query_cache(i: int) -> None:
+        query_embedding_cache.clear()
+
+    modes = [
+        mode
+        for mode in SEARCH_MODES
+        if mode == "dense" or SPARSE_VECTOR_NAME in get_segment_vectors()
+    ]
+    for mode in modes:
+        record(
+            f"search_{mode}",
+            measure(
+                lambda i: search_video_segments(queries[i], limit=args.limit, mode=mode),
+                args.iterations,
+                args.warmup,
+                before=clear_query_cache,
+            ),
+        )
+    record(
+        "search_filtered",
+        measure(
+            lambda i: search_video_segments(
+                queries[i], video_ids[i % len(video_ids)], limit=args.limit
+            ),
+            args.iterations,
+            args.warmup,
+            before=clear_query_cache,
+        ),
+    )
+
+    record(
+        "get_all_segments",
+        measure(
+            lambda i: get_all_segments(video_ids[i % len(video_ids)]),
+            args.iterations,
+            args.warmup,
+        ),
+        items=len(segments[video_ids[0]]),
+    )
+    return results
+
+
+def environment(args: argparse.Namespace) -> Dict[str, Any]:
+    """Describe what was measured, so results are only compared with like."""
+    from importlib.metadata import version
+
+    return {
+        "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "qdrant_client": version("qdrant-client"),
+        "qdrant": "local:" + args.qdrant_path if args.qdrant_path else "memory",
+        "encoder": args.encoder,
+        "model": embedding_service.MODEL_NAME if args.encoder == "model" else None,
+        "vectors": get_segment_vectors(),
+        "quantization": video_service.QUANTIZATION,
+        "videos": args.videos,
+        "transcript_entries": args.transcript_entries,
+        "embedding_batch_size": args.embedding_batch_size,
+        "limit": args.limit,
+        "seed": args.seed,
+    }
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    metric: str,
+    tolerance: float,
+    min_delta_ms: float,
+) -> List[str]:
+    """Print the results next to the baseline and return the benchmarks that
+    regressed: slower by more than `tolerance` and by at least `min_delta_ms`."""
+    key = f"{metric}_ms"
+    regressions = []
+    print(f"{'benchmark':<20} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, summary in results.items():
+        current = summary[key]
+        if name not in baseline:
+            print(f"{name:<20} {'-':>10} {current:>10.2f} {'new':>8}")
+            continue
+        previous = baseline[name][key]
+        change = (current - previous) / previous if previous else 0.0
+        regressed = change > tolerance and current - previous >= min_delta_ms
+        if regressed:
+            regressions.append(name)
+        print(
+            f"{name:<20} {previous:>10.2f} {current:>10.2f} {change:>+8.1%}"
+            + ("  REGRESSION" if regressed else "")
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON file to compare the results with")
+    parser.add_argument(
+        "--results",
+        help="Compare this JSON file with the baseline instead of running the benchmarks",
+    )
+    parser.add_argument(
+        "--metric",
+        choices=["p50", "p95", "p99", "mean"],
+        default="p50",
+        help="Latency compared with the baseline",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Relative slowdown allowed before a benchmark counts as a regression",
+    )
+    parser.add_argument(
+        "--min-delta-ms",
+        type=float,
+        default=0.1,
+        help="Slowdowns smaller than this are never regressions",
+    )
+    parser.add_argument(
+        "--encoder",
+        choices=["model", "synthetic"],
+        default="model",
+        help="Cached embedding model, or a synthetic encoder that needs no model",
+    )
+    parser.add_argument("--qdrant-path", help="Use a local-mode Qdrant in this directory")
+    parser.add_argument("--videos", type=int, default=20, help="Synthetic videos stored")
+    parser.add_argument(
+        "--transcript-entries",
+        type=int,
+        default=1000,
+        help="Entries of every synthetic transcript, about 4 seconds each",
+    )
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--store-iterations", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--embedding-batch-size", type=int, default=64)
+    parser.add_argument("--limit", type=int, default=5, help="Results per search")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="Log every benchmark")
+    args = parser.parse_args()
+
+    import logging
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format="%(asctime)s %(levelname)s %(message)s",
+    )
+
+    # Local-mode Qdrant warns that it ignores the payload indexes
+    warnings.filterwarnings("ignore", message="Payload indexes have no effect")
+
+    if args.results:
+        with open(args.results) as f:
+            report = json.load(f)
+    else:
+        if args.qdrant_path:
+            use_local_qdrant(args.qdrant_path)
+        if args.encoder == "synthetic":
+            embedding_service._encoder = SyntheticEncoder()
+        results = run_benchmarks(args)
+        report = {
+            "version": RESULTS_FORMAT_VERSION,
+            "environment": environment(args),
+            "results": results,
+        }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+    if not args.compare:
+        print(f"{'benchmark':<20} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+        for name, summary in report["results"].items():
+            print(
+                f"{name:<20} {summary['p50_ms']:>10.2f} "
+                f"{summary['p95_ms']:>10.2f} {summary['p99_ms']:>10.2f}"
+            )
+        return
+
+    with open(args.compare) as f:
+        baseline = json.load(f)
+    ignored = ("created_at", "platform")
+    differences = [
+        key
+        for key, value in report["environment"].items()
+        if key not in ignored and baseline["environment"].get(key) != value
+    ]
+    if differences:
+        print(f"Warning: the baseline was measured with different {', '.join(differences)}")
+
+    regressions = compare(
+        report["results"], baseline["results"], args.metric, args.tolerance, args.min_delta_ms
+    )
+    if regressions:
+        print(f"{len(regressions)} benchmarks regressed: {', '.join(regressions)}")
+        sys.exit(1)
+    print("No regressions")
+
+
+if __name__ == "__main__":
+    main()
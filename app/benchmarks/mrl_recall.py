@@ -0,0 +1,195 @@
+"""
+Recall@k of Matryoshka (MRL) two-stage search against full-dimension search.
+
+Samples segments with their full vectors from the segments collection and
+uses the beginning of some of their texts as queries. For every truncated
+dimension, it compares with the exact full-dimension top k:
+- searching the truncated vectors only, and
+- prefetching `oversampling * k` candidates on the truncated vectors and
+  rescoring them with the full ones, as searches do with MRL_DIMENSION set.
+
+If the collection stores an MRL vector, the recall and latency of the actual
+Qdrant query are measured too.
+
+Run with: python -m app.benchmarks.mrl_recall [--k 10] [--dimensions 64,128,256]
+"""
+
+import argparse
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.embedding_service import get_embeddings_batch
+from app.services.qdrant_service import qdrant_client
+from app.services.video_service import (
+    COLLECTION_NAME,
+    FULL_VECTOR_NAME,
+    MRL_OVERSAMPLING,
+    MRL_VECTOR_NAME,
+    _segment_query,
+    get_segment_vectors,
+)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indexes of the k highest scores of every row, in no particular order."""
+    k = min(k, scores.shape[1])
+    return np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+
+def _recall(found: np.ndarray, expected: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(e)) for f, e in zip(found.tolist(), expected.tolist()))
+    return hits / expected.size
+
+
+def load_sample(sample_size: int) -> Tuple[List[str], np.ndarray]:
+    """Scroll up to `sample_size` segments with their texts and full vectors."""
+    layout = get_segment_vectors()
+    vector_name = "" if "" in layout else FULL_VECTOR_NAME
+
+    texts, vectors = [], []
+    offset = None
+    while len(texts) < sample_size:
+        points, offset = qdrant_client.scroll(
+            collection_name=COLLECTION_NAME,
+            limit=min(1000, sample_size - len(texts)),
+            offset=offset,
+            with_payload=["text"],
+            with_vectors=[vector_name] if vector_name else True,
+        )
+        for point in points:
+            texts.append(point.payload["text"])
+            vector = point.vector[vector_name] if vector_name else point.vector
+            vectors.append(vector)
+        if offset is None:
+            break
+
+    return texts, np.asarray(vectors, dtype=np.float32)
+
+
+def make_queries(texts: List[str], count: int, words: int = 8, seed: int = 0) -> List[str]:
+    """Use the beginning of random segment texts as queries."""
+    rng = random.Random(seed)
+    sample = rng.sample(texts, min(count, len(texts)))
+    return [" ".join(text.split()[:words]) for text in sample]
+
+
+def offline_recall(
+    corpus: np.ndarray,
+    queries: np.ndarray,
+    k: int,
+    dimensions: List[int],
+    oversampling: float,
+) -> List[Dict[str, float]]:
+    """Compute the recall@k of truncated and two-stage search for every dimension."""
+    corpus_full = _normalize(corpus)
+    queries_full = _normalize(queries)
+    full_scores = queries_full @ corpus_full.T
+    expected = _top_k(full_scores, k)
+    candidates_count = max(k, int(k * oversampling))
+
+    rows = []
+    for dimension in dimensions:
+        corpus_short = _normalize(corpus[:, :dimension])
+        queries_short = _normalize(queries[:, :dimension])
+        short_scores = queries_short @ corpus_short.T
+
+        truncated = _top_k(short_scores, k)
+        candidates = _top_k(short_scores, candidates_count)
+        candidate_scores = np.take_along_axis(full_scores, candidates, axis=1)
+        rescored = np.take_along_axis(candidates, _top_k(candidate_scores, k), axis=1)
+
+        rows.append(
+            {
+                "dimension": dimension,
+                "bytes_per_point": dimension * 4,
+                "recall_truncated": _recall(truncated, expected),
+                "recall_rescored": _recall(rescored, expected),
+            }
+        )
+    return rows
+
+
+def qdrant_recall(queries: np.ndarray, k: int) -> Optional[Dict[str, float]]:
+    """Measure the recall@k and latency of the MRL query against exact full search."""
+    from qdrant_client.http import models
+
+    if MRL_VECTOR_NAME not in get_segment_vectors():
+        return None
+
+    hits = 0
+    latencies = []
+    for query in queries.tolist():
+        exact = qdrant_client.query_points(
+            collection_name=COLLECTION_NAME,
+            query=query,
+            using=FULL_VECTOR_NAME,
+            limit=k,
+            search_params=models.SearchParams(exact=True),
+        ).points
+
+        started = time.perf_counter()
+        found = qdrant_client.query_points(
+            collection_name=COLLECTION_NAME, **_segment_query(query, None, None, k)
+        ).points
+        latencies.append(time.perf_counter() - started)
+
+        hits += len({point.id for point in exact} & {point.id for point in found})
+
+    return {
+        "recall": hits / (len(queries) * k),
+        "latency_p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "latency_p95_ms": float(np.percentile(latencies, 95) * 1000),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--sample", type=int, default=10000, help="Segments to sample")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--dimensions", default="64,128,256")
+    parser.add_argument("--oversampling", type=float, default=MRL_OVERSAMPLING)
+    args = parser.parse_args()
+
+    texts, corpus = load_sample(args.sample)
+    if not texts:
+        print(f"No segments in {COLLECTION_NAME}, ingest some videos first")
+        return
+    queries = np.asarray(
+        get_embeddings_batch(make_queries(texts, args.queries)), dtype=np.float32
+    )
+    dimensions = [
+        int(dimension)
+        for dimension in args.dimensions.split(",")
+        if int(dimension) < corpus.shape[1]
+    ]
+
+    print(
+        f"{len(queries)} queries over {len(texts)} segments, recall@{args.k} against "
+        f"full {corpus.shape[1]}-dimension search, oversampling {args.oversampling}"
+    )
+    print(f"{'dimension':>10} {'bytes/point':>12} {'truncated':>10} {'rescored':>10}")
+    for row in offline_recall(corpus, queries, args.k, dimensions, args.oversampling):
+        print(
+            f"{row['dimension']:>10} {row['bytes_per_point']:>12} "
+            f"{row['recall_truncated']:>10.3f} {row['recall_rescored']:>10.3f}"
+        )
+
+    live = qdrant_recall(queries, args.k)
+    if live is not None:
+        print(
+            f"Qdrant MRL query: recall@{args.k} {live['recall']:.3f}, "
+            f"p50 {live['latency_p50_ms']:.1f} ms, p95 {live['latency_p95_ms']:.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
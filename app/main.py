@@ -1,16 +1,41 @@
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager, nullcontext
 from typing import Any
 
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, RedirectResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import router as api_router
-from app.services.video_service import get_video_by_id
+from app.services.metrics import HTTP_REQUEST_SECONDS, monitor_event_loop_lag, render_metrics
+from app.services.tracing import SERVER_TIMING, server_timing, trace
+from app.services.video_service import async_get_video_by_id
+from app.services.warmup import readiness, start_warmup, stop_warmup
 from jinja2 import pass_context
 from starlette.datastructures import URL
 
-app = FastAPI(title="In-Video Search", docs_url=None, redoc_url=None, openapi_url=None)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the model, create missing collections and payload indexes, and
+    # report schema drift; failed steps are retried in the background
+    await start_warmup()
+    lag_monitor = asyncio.create_task(monitor_event_loop_lag())
+    yield
+    lag_monitor.cancel()
+    stop_warmup()
+
+
+app = FastAPI(
+    title="In-Video Search",
+    docs_url=None,
+    redoc_url=None,
+    openapi_url=None,
+    lifespan=lifespan,
+)
 
 # Enable CORS
 app.add_middleware(
@@ -21,6 +46,49 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def time_request(request: Request, call_next):
+    """
+    Record the latency of every request. Requests with the trace=true query
+    parameter, or all requests when SERVER_TIMING is on, are also traced:
+    their stages are timed in a Server-Timing header, and with trace=true,
+    JSON responses are wrapped in an object that also has the full span tree.
+    """
+    # Streamed responses are timed until their headers are sent
+    started = time.perf_counter()
+    status = 500
+    debug = request.query_params.get("trace") == "true"
+    try:
+        with trace(request.url.path) if SERVER_TIMING or debug else nullcontext() as root:
+            response = await call_next(request)
+        status = response.status_code
+        if root is None:
+            return response
+        response.headers["Server-Timing"] = server_timing(root)
+
+        content_type = response.headers.get("content-type", "")
+        if not debug or content_type != "application/json":
+            return response
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        headers = {
+            name: value for name, value in response.headers.items() if name != "content-length"
+        }
+        return JSONResponse(
+            {"trace": root.to_dict(), "response": json.loads(body)},
+            status_code=response.status_code,
+            headers=headers,
+        )
+    finally:
+        # Routes are labeled by their template, so video IDs do not add series
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.labels(
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status),
+        ).observe(time.perf_counter() - started)
+
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
@@ -47,7 +115,7 @@ async def index(request: Request):
 @app.get("/video/{video_id}", response_class=HTMLResponse)
 async def video_page(request: Request, video_id: str):
     # Try to get video info from database
-    video = get_video_by_id(video_id)
+    video = await async_get_video_by_id(video_id)
     title = "Video Player"
 
     # If video exists and has a title, use it
@@ -60,6 +128,26 @@ async def video_page(request: Request, video_id: str):
     )
 
 
+@app.get("/healthz")
+async def healthz():
+    """Liveness probe: the worker is up and its event loop responds."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness probe: the worker is warmed up and Qdrant answers."""
+    state = await readiness()
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics, aggregated over all the worker processes."""
+    content, content_type = render_metrics()
+    return PlainTextResponse(content, media_type=content_type)
+
+
 @app.get("/watch")
 async def watch_redirect(request: Request, v: str):
     # Redirect YouTube-style URLs to our video page
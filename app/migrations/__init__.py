@@ -0,0 +1 @@
+# Initialize migrations package
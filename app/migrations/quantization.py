@@ -0,0 +1,118 @@
+"""
+Apply the quantization configuration to an existing segments collection.
+
+Collections created before QUANTIZATION was set keep plain float32 vectors.
+This quantizes them as configured (or as given with --quantization), keeping
+the quantized vectors in RAM and moving the original vectors to disk. With
+"none", quantization is disabled again and the originals go back to RAM.
+Qdrant rebuilds the vectors in the background, while searches keep working.
+
+Running it again once the collection matches the configuration does nothing.
+
+Run with: python -m app.migrations.quantization [--quantization scalar] [--dry-run]
+"""
+
+import argparse
+import logging
+from typing import Any, Dict, Optional
+
+from qdrant_client.http import models
+
+from app.services.qdrant_service import qdrant_client
+from app.services.video_service import (
+    COLLECTION_NAME,
+    FULL_VECTOR_NAME,
+    MRL_FULL_VECTOR_ON_DISK,
+    MRL_VECTOR_NAME,
+    QUANTIZATION,
+    quantization_config,
+    resolve_collection_name,
+)
+
+
+def plan_quantization(quantization: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Compare the segments collection with the quantization configuration.
+
+    Returns:
+        Dict[str, Any]: The target quantization config, and the vectors whose
+        on_disk flag must change (by name, "" being the unnamed vector), or
+        empty values if the collection already matches
+    """
+    target = quantization_config(quantization)
+    config = qdrant_client.get_collection(resolve_collection_name(COLLECTION_NAME)).config
+
+    vectors = config.params.vectors
+    if not isinstance(vectors, dict):
+        vectors = {"": vectors}
+
+    on_disk_changes = {}
+    for name, params in vectors.items():
+        on_disk = target is not None or (
+            name == FULL_VECTOR_NAME and MRL_VECTOR_NAME in vectors and MRL_FULL_VECTOR_ON_DISK
+        )
+        if bool(params.on_disk) != on_disk:
+            on_disk_changes[name] = on_disk
+
+    return {
+        "current": config.quantization_config,
+        "target": target,
+        "quantization_changed": config.quantization_config != target,
+        "on_disk": on_disk_changes,
+    }
+
+
+def migrate_quantization(
+    quantization: Optional[str] = None, dry_run: bool = False
+) -> Dict[str, Any]:
+    """Update the segments collection to the quantization configuration."""
+    plan = plan_quantization(quantization)
+    if dry_run or not (plan["quantization_changed"] or plan["on_disk"]):
+        return plan
+
+    quantization_diff = None
+    if plan["quantization_changed"]:
+        quantization_diff = plan["target"] or models.Disabled.DISABLED
+    vectors_diff = None
+    if plan["on_disk"]:
+        vectors_diff = {
+            name: models.VectorParamsDiff(on_disk=on_disk)
+            for name, on_disk in plan["on_disk"].items()
+        }
+
+    logging.info(f"Updating the quantization of {COLLECTION_NAME} to {plan['target']}")
+    qdrant_client.update_collection(
+        collection_name=resolve_collection_name(COLLECTION_NAME),
+        quantization_config=quantization_diff,
+        vectors_config=vectors_diff,
+    )
+    return plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--quantization",
+        choices=["none", "scalar", "binary"],
+        default=QUANTIZATION,
+        help="Quantization to apply, defaults to the QUANTIZATION setting",
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Only show the changes")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    plan = migrate_quantization(args.quantization, dry_run=args.dry_run)
+    if not (plan["quantization_changed"] or plan["on_disk"]):
+        print(f"{COLLECTION_NAME} already uses quantization {args.quantization}")
+        return
+
+    prefix = "Would update" if args.dry_run else "Updated"
+    print(f"{prefix} {COLLECTION_NAME}:")
+    if plan["quantization_changed"]:
+        print(f"  quantization: {plan['current']} -> {plan['target']}")
+    for name, on_disk in plan["on_disk"].items():
+        print(f"  vector {name or '(unnamed)'}: on_disk={on_disk}")
+
+
+if __name__ == "__main__":
+    main()
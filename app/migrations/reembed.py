@@ -0,0 +1,391 @@
+"""
+Rebuild the segments collection into a new versioned collection, and switch
+searches to it without downtime.
+
+The service reads segments through the name video_segments, which becomes an
+alias of the current versioned collection. A migration:
+1. creates video_segments_v<N> with the current configuration (embedding
+   model, MRL dimension, sparse vectors, quantization and payload indexes),
+2. streams the segments of the current collection with paginated scrolls and
+   embeds their text again in large batches or, with --resegment, segments the
+   transcripts of the processed videos again, from the transcript cache,
+3. copies again the videos ingested while it ran,
+4. atomically points the alias to the new collection.
+
+Searches keep using the current collection until the switch. Progress is
+saved to a state file after every page, so an interrupted migration continues
+with --resume, and --max-rate throttles it to spare the CPU of a live server.
+
+Collections created before aliases were used hold the name themselves, so the
+first migration deletes the old collection just before creating the alias, and
+searches fail for that instant only. Later switches are atomic, and the old
+versioned collections are kept unless --drop-old is given, so a switch can be
+undone with --switch-to.
+
+When the embedding model changes, the service must use the new model from the
+switch on: migrate with --no-switch, then deploy the new configuration along
+with --switch-to <new collection>.
+
+Run with: python -m app.migrations.reembed [--resume] [--resegment] [--max-rate 500] [--no-switch]
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from qdrant_client.http import models
+
+from app.models.video import VideoSegment
+from app.services.qdrant_service import qdrant_client
+from app.services.video_service import (
+    COLLECTION_NAME,
+    PROCESSED_VIDEOS_COLLECTION,
+    create_segments_collection,
+    get_video_transcript,
+    normalize_transcript,
+    reset_segment_vectors,
+    resolve_collection_name,
+    segment_transcript,
+    store_segments,
+)
+
+# Migration defaults: segments read per scroll page, and texts per model call
+MIGRATION_PAGE_SIZE = int(os.getenv("MIGRATION_PAGE_SIZE", "1024"))
+MIGRATION_BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", "256"))
+
+
+class Throttle:
+    """Limit a loop to max_rate items per second on average (0 for unlimited)."""
+
+    def __init__(self, max_rate: float = 0):
+        self.max_rate = max_rate
+        self.started = time.monotonic()
+        self.count = 0
+
+    def wait(self, count: int) -> None:
+        self.count += count
+        if self.max_rate:
+            delay = self.count / self.max_rate - (time.monotonic() - self.started)
+            if delay > 0:
+                time.sleep(delay)
+
+
+def load_state(path: str) -> Optional[Dict[str, Any]]:
+    """Read the state of a migration, or None if there is none."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_state(path: str, state: Dict[str, Any]) -> None:
+    """Atomically replace the state of a migration."""
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def next_collection_name() -> str:
+    """Get the name of the next versioned segments collection."""
+    pattern = re.compile(rf"^{re.escape(COLLECTION_NAME)}_v(\d+)$")
+    versions = [
+        int(match.group(1))
+        for collection in qdrant_client.get_collections().collections
+        if (match := pattern.match(collection.name))
+    ]
+    return f"{COLLECTION_NAME}_v{max(versions, default=0) + 1}"
+
+
+def _store(segments: List[VideoSegment], target: str, batch_size: int) -> None:
+    """Store segments in the target collection, failing if any of them fails,
+    so a resumed migration retries the page."""
+    results = store_segments(segments, batch_size=batch_size, collection_name=target)
+    failed = [segment_id for segment_id, stored in results.items() if not stored]
+    if failed:
+        raise RuntimeError(f"Could not store {len(failed)} segments, such as {failed[0]}")
+
+
+def _resegment(video_id: str) -> List[VideoSegment]:
+    """Segment the transcript of a video again, with the current parameters."""
+    return segment_transcript(video_id, normalize_transcript(get_video_transcript(video_id)))
+
+
+def _video_filter(video_id: str) -> models.Filter:
+    return models.Filter(
+        must=[models.FieldCondition(key="video_id", match=models.MatchValue(value=video_id))]
+    )
+
+
+def _video_segments(source: str, video_id: str) -> List[VideoSegment]:
+    """Read all the segments of a video from a collection."""
+    segments, offset = [], None
+    while True:
+        points, offset = qdrant_client.scroll(
+            collection_name=source,
+            scroll_filter=_video_filter(video_id),
+            limit=MIGRATION_PAGE_SIZE,
+            offset=offset,
+            with_payload=True,
+            with_vectors=False,
+        )
+        segments.extend(VideoSegment(**point.payload) for point in points)
+        if offset is None:
+            return segments
+
+
+class Migration:
+    """A migration of the segments collection, resumable from its state file."""
+
+    def __init__(
+        self,
+        state: Dict[str, Any],
+        state_path: str,
+        page_size: int = MIGRATION_PAGE_SIZE,
+        batch_size: int = MIGRATION_BATCH_SIZE,
+        max_rate: float = 0,
+    ):
+        self.state = state
+        self.state_path = state_path
+        self.page_size = page_size
+        self.batch_size = batch_size
+        self.throttle = Throttle(max_rate)
+
+    def _progress(self, done: int, total: int, unit: str) -> None:
+        elapsed = time.monotonic() - self.throttle.started
+        rate = self.throttle.count / elapsed if elapsed else 0
+        eta = (total - done) / rate if rate else 0
+        print(f"{done}/{total} {unit} ({rate:.0f}/s, {eta:.0f}s left)", flush=True)
+
+    def copy(self) -> None:
+        """Copy every segment, or every video with --resegment, from the saved offset."""
+        state = self.state
+        resegment = state["resegment"]
+        collection = PROCESSED_VIDEOS_COLLECTION if resegment else state["source"]
+        total = qdrant_client.count(collection, exact=True).count
+
+        while not state["copied_all"]:
+            points, next_offset = qdrant_client.scroll(
+                collection_name=collection,
+                limit=self.page_size,
+                offset=state["offset"],
+                with_payload=["video_id"] if resegment else True,
+                with_vectors=False,
+            )
+            if resegment:
+                segments = []
+                for point in points:
+                    video_id = point.payload["video_id"]
+                    try:
+                        segments.extend(_resegment(video_id))
+                    except Exception as e:
+                        logging.error(f"Could not segment video {video_id} again: {str(e)}")
+                        state["failed"].append(video_id)
+            else:
+                segments = [VideoSegment(**point.payload) for point in points]
+            _store(segments, state["target"], self.batch_size)
+
+            state["offset"] = next_offset
+            state["copied"] += len(points)
+            state["copied_all"] = next_offset is None
+            save_state(self.state_path, state)
+            self.throttle.wait(len(segments))
+            self._progress(state["copied"], total, "videos" if resegment else "segments")
+
+    def catch_up(self) -> None:
+        """Copy again the videos ingested since the migration started, as the
+        copy may have missed their segments."""
+        state = self.state
+        since = state["started_at"]
+        offset = None
+        while True:
+            points, offset = qdrant_client.scroll(
+                collection_name=PROCESSED_VIDEOS_COLLECTION,
+                scroll_filter=models.Filter(
+                    must=[models.FieldCondition(key="created_at", range=models.Range(gte=since))]
+                ),
+                limit=self.page_size,
+                offset=offset,
+                with_payload=["video_id"],
+                with_vectors=False,
+            )
+            for point in points:
+                video_id = point.payload["video_id"]
+                logging.info(f"Copying video {video_id} again, it was ingested during the migration")
+                try:
+                    if state["resegment"]:
+                        segments = _resegment(video_id)
+                    else:
+                        segments = _video_segments(state["source"], video_id)
+                except Exception as e:
+                    logging.error(f"Could not copy video {video_id} again: {str(e)}")
+                    state["failed"].append(video_id)
+                    continue
+                qdrant_client.delete(
+                    collection_name=state["target"],
+                    points_selector=models.FilterSelector(filter=_video_filter(video_id)),
+                )
+                _store(segments, state["target"], self.batch_size)
+            if offset is None:
+                break
+        # Videos ingested from now on are left to the next catch up
+        state["started_at"] = int(datetime.utcnow().timestamp())
+        save_state(self.state_path, state)
+
+    def verify(self) -> List[str]:
+        """Check that the target collection holds all the segments."""
+        state = self.state
+        problems = []
+        target_count = qdrant_client.count(state["target"], exact=True).count
+        if state["resegment"]:
+            if state["failed"]:
+                problems.append(f"{len(state['failed'])} videos could not be segmented again")
+            if target_count == 0:
+                problems.append(f"{state['target']} has no segments")
+        else:
+            source_count = qdrant_client.count(state["source"], exact=True).count
+            if target_count < source_count:
+                problems.append(
+                    f"{state['target']} has {target_count} segments, "
+                    f"but {state['source']} has {source_count}"
+                )
+        return problems
+
+    def run(self) -> None:
+        self.copy()
+        self.catch_up()
+
+
+def switch_alias(target: str, drop_old: bool = False) -> Optional[str]:
+    """
+    Point the segments alias to the target collection, in a single atomic
+    operation when the name already is an alias.
+
+    Returns:
+        Optional[str]: The collection the alias pointed to before, if any
+    """
+    aliases = {alias.alias_name: alias.collection_name for alias in qdrant_client.get_aliases().aliases}
+    collections = {collection.name for collection in qdrant_client.get_collections().collections}
+    if target not in collections:
+        raise ValueError(f"Collection {target} does not exist")
+
+    previous = aliases.get(COLLECTION_NAME)
+    operations = []
+    if previous is not None:
+        operations.append(
+            models.DeleteAliasOperation(
+                delete_alias=models.DeleteAlias(alias_name=COLLECTION_NAME)
+            )
+        )
+    elif COLLECTION_NAME in collections:
+        # The collection holds the name the alias needs, and was copied to the target
+        logging.warning(f"Deleting collection {COLLECTION_NAME} to replace it with an alias")
+        qdrant_client.delete_collection(COLLECTION_NAME)
+    operations.append(
+        models.CreateAliasOperation(
+            create_alias=models.CreateAlias(collection_name=target, alias_name=COLLECTION_NAME)
+        )
+    )
+    qdrant_client.update_collection_aliases(change_aliases_operations=operations)
+    reset_segment_vectors()
+
+    if drop_old and previous is not None and previous != target:
+        logging.info(f"Deleting the previous collection {previous}")
+        qdrant_client.delete_collection(previous)
+    return previous
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--resume", action="store_true", help="Continue the interrupted migration")
+    parser.add_argument(
+        "--resegment",
+        action="store_true",
+        help="Segment the transcripts again instead of embedding the stored segments",
+    )
+    parser.add_argument("--no-switch", action="store_true", help="Do not switch to the new collection")
+    parser.add_argument("--switch-to", help="Only switch the alias to this collection")
+    parser.add_argument("--drop-old", action="store_true", help="Delete the previous collection")
+    parser.add_argument(
+        "--force", action="store_true", help="Switch even if the new collection looks incomplete"
+    )
+    parser.add_argument("--state", default="reembed.state.json", help="Migration state file")
+    parser.add_argument("--page-size", type=int, default=MIGRATION_PAGE_SIZE)
+    parser.add_argument("--batch-size", type=int, default=MIGRATION_BATCH_SIZE)
+    parser.add_argument(
+        "--max-rate", type=float, default=0, help="Maximum segments per second (0 for unlimited)"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    state = load_state(args.state)
+    if args.switch_to:
+        previous = switch_alias(args.switch_to, drop_old=args.drop_old)
+        if state is not None and state["target"] == args.switch_to:
+            state["switched"] = True
+            save_state(args.state, state)
+        print(f"{COLLECTION_NAME} now points to {args.switch_to} (was {previous or 'a collection'})")
+        return
+
+    if args.resume:
+        if state is None or state.get("switched"):
+            parser.error(f"no migration to resume in {args.state}")
+        print(f"Resuming the migration to {state['target']}")
+    else:
+        if state is not None and not state.get("switched"):
+            parser.error(
+                f"a migration to {state['target']} is in progress, continue it with --resume"
+            )
+        target = next_collection_name()
+        state = {
+            "source": resolve_collection_name(COLLECTION_NAME),
+            "target": target,
+            "resegment": args.resegment,
+            "started_at": int(datetime.utcnow().timestamp()),
+            "offset": None,
+            "copied": 0,
+            "copied_all": False,
+            "failed": [],
+            "switched": False,
+        }
+        create_segments_collection(target)
+        save_state(args.state, state)
+        print(f"Migrating {state['source']} to {target}")
+
+    migration = Migration(
+        state,
+        args.state,
+        page_size=args.page_size,
+        batch_size=args.batch_size,
+        max_rate=args.max_rate,
+    )
+    migration.run()
+
+    problems = migration.verify()
+    for problem in problems:
+        print(f"Problem: {problem}")
+    if args.no_switch:
+        print(f"{state['target']} is ready, switch with --switch-to {state['target']}")
+        return
+    if problems and not args.force:
+        print("Not switching, fix the problems or use --force")
+        return
+
+    # Videos ingested during the verification are copied right before switching
+    migration.catch_up()
+    previous = switch_alias(state["target"], drop_old=args.drop_old)
+    state["switched"] = True
+    save_state(args.state, state)
+    print(f"{COLLECTION_NAME} now points to {state['target']} (was {previous or 'a collection'})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+from pydantic import BaseModel, Field
+from typing import Dict, Optional
+from app.models.video import Video
+
+
+class IngestJob(BaseModel):
+    """Model for a background video ingestion job."""
+
+    job_id: str = Field(..., description="Unique identifier for the job")
+    video_id: str = Field(..., description="YouTube video ID being processed")
+    url: str = Field(..., description="URL or video ID submitted for processing")
+    status: str = Field(
+        "queued", description="Job status: queued, running, completed or failed"
+    )
+    stage: str = Field("queued", description="Current processing stage")
+    progress: float = Field(0.0, description="Percentage of the work done (0-100)")
+    error: Optional[str] = Field(None, description="Error message if the job failed")
+    video: Optional[Video] = Field(None, description="Processed video once completed")
+    timings: Optional[Dict[str, float]] = Field(
+        None, description="Milliseconds spent in each processing stage, once finished"
+    )
+    created_at: int = Field(
+        ..., description="Unix timestamp (seconds since epoch) when the job was submitted"
+    )
+    updated_at: int = Field(
+        ..., description="Unix timestamp (seconds since epoch) of the last job update"
+    )
@@ -23,6 +23,11 @@ class Video(BaseModel):
     created_at: Optional[int] = Field(
         None, description="Unix timestamp (seconds since epoch) when the video was processed"
     )
+    segment_count: Optional[int] = Field(None, description="Number of stored segments")
+    duration: Optional[float] = Field(None, description="Transcript duration in seconds")
+    ingest_seconds: Optional[float] = Field(
+        None, description="Time it took to process the video, in seconds"
+    )
 
 
 class SearchResult(BaseModel):
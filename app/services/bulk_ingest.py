@@ -0,0 +1,416 @@
+"""
+Bulk ingestion of many videos, from files of URLs or video IDs, or from
+YouTube playlists and channels.
+
+Transcripts and metadata are fetched in parallel on a thread pool, while the
+main thread segments, embeds and stores the videos together in large batches.
+At most --queue-size videos are fetched ahead of the embedding stage, so
+fetching pauses whenever embedding falls behind.
+
+Every finished video is appended to a checkpoint file. Videos found in it, or
+already registered as processed in Qdrant, are skipped, so an interrupted run
+resumes where it stopped.
+
+With --fixtures DIR, transcripts and metadata are read from DIR/<video_id>.json
+instead of YouTube, so runs work offline (see FixtureTranscriptSource for the
+format). Otherwise transcripts go through the on-disk transcript cache, so
+ingesting videos again does not fetch them again.
+
+Run with: python -m app.services.bulk_ingest urls.txt [--playlist URL] [--fixtures DIR]
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from app.models.video import Video, VideoSegment
+from app.services.qdrant_service import qdrant_client
+from app.services.transcript_service import FixtureTranscriptSource
+from app.services.video_service import (
+    PROCESSED_VIDEOS_COLLECTION,
+    acquire_ingest_lease,
+    ensure_collection_exists,
+    extract_video_id,
+    fetch_video_source,
+    find_processed_video,
+    register_ingested_video,
+    release_ingest_lease,
+    segment_transcript,
+    store_segments,
+    video_point_id,
+)
+
+# Bulk ingestion defaults: parallel transcript and metadata fetches, videos
+# fetched ahead of the embedding stage, segments embedded and stored together,
+# and texts per model call
+BULK_FETCH_WORKERS = int(os.getenv("BULK_FETCH_WORKERS", "8"))
+BULK_QUEUE_SIZE = int(os.getenv("BULK_QUEUE_SIZE", "32"))
+BULK_BATCH_SEGMENTS = int(os.getenv("BULK_BATCH_SEGMENTS", "2048"))
+BULK_EMBEDDING_BATCH_SIZE = int(os.getenv("BULK_EMBEDDING_BATCH_SIZE", "256"))
+
+
+@dataclass
+class FetchedVideo:
+    """A video whose transcript was fetched, waiting to be embedded and stored."""
+
+    video: Video
+    transcript: List[Dict[str, Any]]
+    lease_token: str
+    started: float
+    segments: Optional[List[VideoSegment]] = None
+
+
+class _AlreadyIngested(Exception):
+    """Raised when a video was ingested by another worker before its lease was taken."""
+
+
+class Checkpoint:
+    """
+    Record of the videos a bulk ingestion went through, as JSON lines.
+
+    Lines are appended and flushed as videos finish, so the record survives
+    interruptions. A video counts as done if its last line says so; failed
+    videos are retried by the next run.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: Set[str] = set()
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # The last line can be cut short by an interruption
+                        continue
+                    if entry.get("status") == "done":
+                        self.done.add(entry["video_id"])
+                    else:
+                        self.done.discard(entry["video_id"])
+        self._file = open(path, "a")
+
+    def record(self, video_id: str, status: str, **details: Any) -> None:
+        """Record the outcome of a video."""
+        self._file.write(json.dumps({"video_id": video_id, "status": status, **details}) + "\n")
+        self._file.flush()
+        if status == "done":
+            self.done.add(video_id)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def resolve_playlist(url: str) -> List[str]:
+    """Get the video IDs of a playlist or channel, without fetching each video."""
+    # yt-dlp takes long to import, so it is only loaded to resolve playlists
+    import yt_dlp
+
+    ydl_opts = {
+        "skip_download": True,
+        "quiet": True,
+        "no_warnings": True,
+        "extract_flat": "in_playlist",  # List the entries without resolving them
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+    return list(_playlist_video_ids(info))
+
+
+def _playlist_video_ids(info: Dict[str, Any]) -> Iterable[str]:
+    """Walk the entries of a flat playlist, recursing into the tabs of channels."""
+    for entry in info.get("entries") or []:
+        if not entry:
+            continue
+        if entry.get("entries") is not None:
+            yield from _playlist_video_ids(entry)
+        elif entry.get("ie_key") not in (None, "Youtube") and entry.get("url"):
+            # Channel pages list their tabs (videos, shorts, live) as playlists
+            yield from resolve_playlist(entry["url"])
+        elif entry.get("id"):
+            yield entry["id"]
+
+
+def read_video_list(path: str) -> List[str]:
+    """Read video IDs from a file of URLs or IDs, one per line. Blank lines
+    and lines starting with # are ignored."""
+    with open(path) as f:
+        lines = [line.strip() for line in f]
+    return [extract_video_id(line) for line in lines if line and not line.startswith("#")]
+
+
+def registered_video_ids(video_ids: List[str], chunk_size: int = 256) -> Set[str]:
+    """Find which of the videos are already registered as processed."""
+    registered = set()
+    for offset in range(0, len(video_ids), chunk_size):
+        points = qdrant_client.retrieve(
+            collection_name=PROCESSED_VIDEOS_COLLECTION,
+            ids=[video_point_id(video_id) for video_id in video_ids[offset : offset + chunk_size]],
+            with_payload=["video_id", "processed"],
+        )
+        registered.update(
+            point.payload["video_id"] for point in points if point.payload.get("processed")
+        )
+    return registered
+
+
+def _fetch(
+    video_id: str, fixtures: Optional[FixtureTranscriptSource], reingest: bool = False
+) -> Optional[FetchedVideo]:
+    """Take the ingest lease of a video and fetch its transcript and metadata.
+    Returns None if another worker is ingesting the video, and raises
+    _AlreadyIngested if another worker ingested it since the run started."""
+    lease_token = acquire_ingest_lease(video_id)
+    if lease_token is None:
+        return None
+    # The registry was checked before the run, but the lease may have been
+    # taken right after another worker finished the video
+    if not reingest and find_processed_video(video_id) is not None:
+        release_ingest_lease(video_id, lease_token)
+        raise _AlreadyIngested(video_id)
+
+    started = time.monotonic()
+    try:
+        if fixtures is not None:
+            video, transcript = fetch_video_source(
+                video_id,
+                transcript_loader=lambda video_id: fixtures.fetch(video_id).entries,
+                metadata_loader=fixtures.metadata,
+            )
+        else:
+            video, transcript = fetch_video_source(video_id)
+    except Exception:
+        release_ingest_lease(video_id, lease_token)
+        raise
+    return FetchedVideo(video, transcript, lease_token, started)
+
+
+class BulkIngester:
+    """Ingests many videos through a bounded fetch, embed and store pipeline."""
+
+    def __init__(
+        self,
+        checkpoint: Checkpoint,
+        fixtures: Optional[FixtureTranscriptSource] = None,
+        reingest: bool = False,
+        fetch_workers: int = BULK_FETCH_WORKERS,
+        queue_size: int = BULK_QUEUE_SIZE,
+        batch_segments: int = BULK_BATCH_SEGMENTS,
+        embedding_batch_size: int = BULK_EMBEDDING_BATCH_SIZE,
+    ):
+        self.checkpoint = checkpoint
+        self.fixtures = fixtures
+        self.reingest = reingest
+        self.fetch_workers = fetch_workers
+        self.queue_size = max(queue_size, fetch_workers)
+        self.batch_segments = batch_segments
+        self.embedding_batch_size = embedding_batch_size
+        self.counts = {"done": 0, "failed": 0, "busy": 0, "skipped": 0}
+        self._total = 0
+        self._started = 0.0
+
+    def run(self, video_ids: List[str]) -> Dict[str, int]:
+        """Ingest the videos, and count the ones done, failed, being ingested
+        elsewhere (busy), or already ingested elsewhere (skipped)."""
+        self._total = len(video_ids)
+        self._started = time.monotonic()
+        remaining = iter(video_ids)
+        in_flight: Dict[Future, str] = {}
+        batch: List[FetchedVideo] = []
+
+        with ThreadPoolExecutor(
+            max_workers=self.fetch_workers, thread_name_prefix="bulk-fetch"
+        ) as executor:
+
+            def refill():
+                # Fetched videos wait in the futures, so this bounds memory too
+                while len(in_flight) < self.queue_size:
+                    video_id = next(remaining, None)
+                    if video_id is None:
+                        return
+                    in_flight[executor.submit(
+                        _fetch, video_id, self.fixtures, self.reingest
+                    )] = video_id
+
+            try:
+                refill()
+                while in_flight:
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        video_id = in_flight.pop(future)
+                        fetched = self._collect(video_id, future)
+                        if fetched is not None:
+                            batch.append(fetched)
+
+                    if sum(len(item.segments) for item in batch) >= self.batch_segments:
+                        self._store(batch)
+                        batch = []
+                    refill()
+
+                self._store(batch)
+            except BaseException:
+                # Interrupted: free the videos not stored yet for the next run
+                self._abandon(in_flight, batch)
+                raise
+        return self.counts
+
+    def _abandon(self, in_flight: Dict[Future, str], batch: List[FetchedVideo]) -> None:
+        """Release the ingest leases of fetched videos that will not be stored."""
+        fetched = list(batch)
+        for future, video_id in in_flight.items():
+            if future.cancel():
+                continue
+            try:
+                if future.result() is not None:
+                    fetched.append(future.result())
+            except Exception:
+                pass  # Failed fetches already released their lease
+        for item in fetched:
+            release_ingest_lease(item.video.video_id, item.lease_token)
+
+    def _collect(self, video_id: str, future: Future) -> Optional[FetchedVideo]:
+        """Segment a fetched video, or record why it could not be fetched."""
+        try:
+            fetched = future.result()
+        except _AlreadyIngested:
+            logging.warning(f"Video {video_id} was ingested by another worker")
+            self._finish(video_id, "skipped")
+            return None
+        except Exception as e:
+            logging.error(f"Could not fetch video {video_id}: {str(e)}")
+            self._finish(video_id, "failed", error=str(e))
+            return None
+
+        if fetched is None:
+            logging.warning(f"Video {video_id} is being ingested by another worker")
+            self._finish(video_id, "busy")
+            return None
+
+        try:
+            fetched.segments = segment_transcript(video_id, fetched.transcript)
+        except Exception as e:
+            logging.error(f"Could not segment video {video_id}: {str(e)}")
+            self._finish(video_id, "failed", error=str(e))
+            release_ingest_lease(video_id, fetched.lease_token)
+            return None
+        return fetched
+
+    def _store(self, batch: List[FetchedVideo]) -> None:
+        """Embed and store the segments of many videos at once, then register them."""
+        if not batch:
+            return
+        segments = [segment for item in batch for segment in item.segments]
+        try:
+            results = store_segments(segments, batch_size=self.embedding_batch_size)
+        except Exception as e:
+            logging.error(f"Could not store a batch of {len(segments)} segments: {str(e)}")
+            results = {}
+
+        for item in batch:
+            video_id = item.video.video_id
+            try:
+                video_results = {
+                    segment.segment_id: results.get(segment.segment_id, False)
+                    for segment in item.segments
+                }
+                video = register_ingested_video(
+                    item.video, item.transcript, video_results, item.started
+                )
+                self._finish(video_id, "done", segments=video.segment_count)
+            except Exception as e:
+                logging.error(f"Could not ingest video {video_id}: {str(e)}")
+                self._finish(video_id, "failed", error=str(e))
+            finally:
+                release_ingest_lease(video_id, item.lease_token)
+
+    def _finish(self, video_id: str, status: str, **details: Any) -> None:
+        self.counts[status] += 1
+        # Videos ingested elsewhere are found in the registry by the next run
+        if status not in ("busy", "skipped"):
+            self.checkpoint.record(video_id, status, **details)
+
+        finished = sum(self.counts.values())
+        elapsed = time.monotonic() - self._started
+        print(
+            f"[{finished}/{self._total}] {video_id}: {status} "
+            f"({finished / elapsed if elapsed else 0:.1f} videos/s)",
+            flush=True,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("files", nargs="*", help="Files of video URLs or IDs, one per line")
+    parser.add_argument(
+        "--playlist",
+        action="append",
+        default=[],
+        help="Playlist or channel URL to ingest, can be repeated",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        default="bulk_ingest.checkpoint.jsonl",
+        help="File recording finished videos, to resume interrupted runs",
+    )
+    parser.add_argument("--fixtures", help="Directory of <video_id>.json transcript fixtures")
+    parser.add_argument(
+        "--reingest",
+        action="store_true",
+        help="Also ingest videos that are already registered or checkpointed",
+    )
+    parser.add_argument("--fetch-workers", type=int, default=BULK_FETCH_WORKERS)
+    parser.add_argument("--queue-size", type=int, default=BULK_QUEUE_SIZE)
+    parser.add_argument("--batch-segments", type=int, default=BULK_BATCH_SEGMENTS)
+    parser.add_argument("--embedding-batch-size", type=int, default=BULK_EMBEDDING_BATCH_SIZE)
+    parser.add_argument("--verbose", action="store_true", help="Log every processing step")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    video_ids = []
+    for path in args.files:
+        video_ids.extend(read_video_list(path))
+    for url in args.playlist:
+        playlist_ids = resolve_playlist(url)
+        print(f"Playlist {url}: {len(playlist_ids)} videos")
+        video_ids.extend(playlist_ids)
+    video_ids = list(dict.fromkeys(video_ids))
+    if not video_ids:
+        parser.error("no videos to ingest, give files of URLs or --playlist")
+
+    ensure_collection_exists()
+    checkpoint = Checkpoint(args.checkpoint)
+    if not args.reingest:
+        skipped = checkpoint.done | registered_video_ids(video_ids)
+        remaining = [video_id for video_id in video_ids if video_id not in skipped]
+        print(f"Skipping {len(video_ids) - len(remaining)} videos already ingested")
+        video_ids = remaining
+
+    ingester = BulkIngester(
+        checkpoint,
+        fixtures=FixtureTranscriptSource(args.fixtures) if args.fixtures else None,
+        reingest=args.reingest,
+        fetch_workers=args.fetch_workers,
+        queue_size=args.queue_size,
+        batch_segments=args.batch_segments,
+        embedding_batch_size=args.embedding_batch_size,
+    )
+    started = time.monotonic()
+    try:
+        counts = ingester.run(video_ids)
+    finally:
+        checkpoint.close()
+    print(
+        f"Ingested {counts['done']} videos in {time.monotonic() - started:.1f}s, "
+        f"{counts['failed']} failed, {counts['busy']} being ingested elsewhere, "
+        f"{counts['skipped']} ingested elsewhere meanwhile"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+from urllib.parse import quote
+
+from app.services.metrics import CACHE_EVICTIONS, count_cache_lookup
+
+# Sentinel returned by LRUCache.get on a miss, so None can be cached
+MISSING = object()
+
+
+class LRUCache:
+    """
+    A bounded, thread-safe least-recently-used cache with optional expiry.
+
+    Entries older than `ttl` seconds are treated as missing. A `ttl` of None
+    or 0 keeps entries until they are evicted to make room for new ones.
+    Besides the number of entries, the cache can be bounded by `max_bytes`,
+    with the size of every value estimated by `sizeof`. Lookups and evictions
+    of caches with a `name` are exported as metrics.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: Optional[float] = None,
+        name: Optional[str] = None,
+        max_bytes: int = 0,
+        sizeof: Optional[Callable[[Any], int]] = None,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl or None
+        self.name = name
+        self.max_bytes = max_bytes if sizeof is not None else 0
+        self.sizeof = sizeof
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """Get a cached value, marking it as recently used."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self._count(hit=False)
+                return default
+
+            value, expires_at, size = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self._bytes -= size
+                self.expirations += 1
+                self._count(hit=False)
+                return default
+
+            self._data.move_to_end(key)
+            self._count(hit=True)
+            return value
+
+    def _count(self, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        if self.name:
+            count_cache_lookup(self.name, hit)
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entries if full."""
+        if self.max_size <= 0:
+            return
+
+        size = self.sizeof(value) if self.max_bytes else 0
+        if size > self.max_bytes > 0:
+            # Caching the value would evict everything else
+            self.delete(key)
+            return
+
+        ttl = ttl or self.ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        evicted = 0
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[2]
+            self._data[key] = (value, expires_at, size)
+            self._bytes += size
+            while len(self._data) > self.max_size or (
+                self.max_bytes and self._bytes > self.max_bytes
+            ):
+                _, (_, _, evicted_size) = self._data.popitem(last=False)
+                self._bytes -= evicted_size
+                evicted += 1
+            self.evictions += evicted
+
+        if evicted and self.name:
+            CACHE_EVICTIONS.labels(cache=self.name).inc(evicted)
+
+    def delete(self, key: Hashable) -> None:
+        """Remove a value from the cache if present."""
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[2]
+
+    def clear(self) -> None:
+        """Remove all values from the cache."""
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        """Get the cache counters."""
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class CacheBackend:
+    """
+    Storage interface used by SearchResultCache.
+
+    Backends store values under string keys and keep integer generation
+    counters per namespace. Shared backends must only be given values that
+    can be serialized to JSON, while local backends may keep any object.
+    """
+
+    # Whether values live in this process and can be returned as-is
+    local = True
+
+    def get(self, key: str) -> Any:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def get_generation(self, namespace: str) -> int:
+        raise NotImplementedError
+
+    def bump_generation(self, namespace: str) -> int:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        return {}
+
+
+class InMemoryCacheBackend(CacheBackend):
+    """
+    Cache backend keeping values in a bounded LRU cache of this process.
+
+    The generation counters are kept in `generations_dir` if given, one small
+    file per namespace, so that all the processes of a node sharing the
+    directory see each other's invalidations. Otherwise they are kept in
+    memory, and other processes only see a change once their entries expire.
+    """
+
+    local = True
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: Optional[float] = None,
+        max_bytes: int = 0,
+        sizeof: Optional[Callable[[Any], int]] = None,
+        generations_dir: Optional[str] = None,
+    ):
+        self.values = LRUCache(max_size=max_size, ttl=ttl, max_bytes=max_bytes, sizeof=sizeof)
+        self.generations_dir = generations_dir or None
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        if self.generations_dir:
+            os.makedirs(self.generations_dir, exist_ok=True)
+
+    def get(self, key: str) -> Any:
+        return self.values.get(key)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.values.set(key, value, ttl)
+
+    def _generation_path(self, namespace: str) -> str:
+        return os.path.join(self.generations_dir, quote(namespace, safe=""))
+
+    def get_generation(self, namespace: str) -> int:
+        if not self.generations_dir:
+            with self._lock:
+                return self._generations.get(namespace, 0)
+        try:
+            with open(self._generation_path(namespace)) as f:
+                return int(f.read() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def bump_generation(self, namespace: str) -> int:
+        if not self.generations_dir:
+            with self._lock:
+                generation = self._generations.get(namespace, 0) + 1
+                self._generations[namespace] = generation
+                return generation
+
+        # A timestamp rather than a counter, so concurrent bumps by several
+        # processes never write back a generation that was already used
+        generation = max(time.time_ns(), self.get_generation(namespace) + 1)
+        path = self._generation_path(namespace)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(generation))
+        os.replace(tmp_path, path)
+        return generation
+
+    def stats(self) -> Dict[str, int]:
+        return self.values.stats()
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Cache backend storing JSON values in Redis, shared by all workers.
+
+    Requires the optional `redis` package.
+    """
+
+    local = False
+
+    def __init__(self, url: str, ttl: Optional[float] = None, prefix: str = "cache:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError(
+                "The redis cache backend requires the redis package: pip install redis"
+            ) from e
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl or None
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Any:
+        import json
+
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            self.misses += 1
+            return MISSING
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        import json
+
+        ttl = ttl or self.ttl
+        self.client.set(
+            self.prefix + key, json.dumps(value), ex=int(ttl) if ttl else None
+        )
+
+    def get_generation(self, namespace: str) -> int:
+        raw = self.client.get(f"{self.prefix}generation:{namespace}")
+        return int(raw) if raw is not None else 0
+
+    def bump_generation(self, namespace: str) -> int:
+        return int(self.client.incr(f"{self.prefix}generation:{namespace}"))
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+class SearchResultCache:
+    """
+    Cache of search results, invalidated per video.
+
+    Every video has a generation counter that is part of the cache keys of
+    the searches limited to it, and searches over all videos use a global
+    generation. Bumping the generations of a video when it is (re)ingested
+    makes all stale entries unreachable, and they age out of the backend.
+    """
+
+    GLOBAL_NAMESPACE = "*"
+
+    def __init__(self, backend: CacheBackend, model_name: str):
+        self.backend = backend
+        self.model_name = model_name
+
+    def _key(self, query: str, video_id: Optional[str], limit: int, **params: Any) -> str:
+        namespace = video_id or self.GLOBAL_NAMESPACE
+        generation = self.backend.get_generation(namespace)
+        extra = ",".join(f"{name}={params[name]}" for name in sorted(params))
+        return f"search:{self.model_name}:{namespace}:{generation}:{limit}:{extra}:{query}"
+
+    def get(self, query: str, video_id: Optional[str], limit: int, **params: Any) -> Any:
+        """Get cached results, or MISSING. Shared backends return plain dicts."""
+        results = self.backend.get(self._key(query, video_id, limit, **params))
+        count_cache_lookup("search", results is not MISSING)
+        return results
+
+    def set(
+        self, query: str, video_id: Optional[str], limit: int, results: Any, **params: Any
+    ) -> None:
+        """Cache results, which must be JSON-serializable for shared backends."""
+        self.backend.set(self._key(query, video_id, limit, **params), results)
+
+    def invalidate(self, video_id: str) -> None:
+        """Invalidate searches touching a video, including all global searches."""
+        self.backend.bump_generation(video_id)
+        self.backend.bump_generation(self.GLOBAL_NAMESPACE)
+
+    def stats(self) -> Dict[str, int]:
+        """Get the counters of the backend."""
+        return self.backend.stats()
+
+
+def create_cache_backend(
+    name: str,
+    max_size: int = 1024,
+    ttl: Optional[float] = None,
+    url: Optional[str] = None,
+    max_bytes: int = 0,
+    sizeof: Optional[Callable[[Any], int]] = None,
+    generations_dir: Optional[str] = None,
+) -> CacheBackend:
+    """Create a cache backend by name: "memory" or "redis"."""
+    if name == "memory":
+        return InMemoryCacheBackend(
+            max_size=max_size,
+            ttl=ttl,
+            max_bytes=max_bytes,
+            sizeof=sizeof,
+            generations_dir=generations_dir,
+        )
+    if name == "redis":
+        return RedisCacheBackend(url or "redis://localhost:6379/0", ttl=ttl)
+    raise ValueError(f"Unknown cache backend: {name}")
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into a single execution.
+
+    The first caller runs the function while the others wait for it and get
+    the same result, or the same exception.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, "_Call"] = {}
+
+    def do(self, key: Hashable, func, *args, **kwargs) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class _Call:
+    """An in-flight SingleFlight call."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
@@ -0,0 +1,152 @@
+"""
+Embedding server shared by all the application workers of a node.
+
+It loads the model once and serves the sidecar embedding mode over a Unix
+socket. Concurrent encode requests are collected into micro-batches, so
+many small requests from different workers share one model call.
+
+Run with: python -m app.services.embedding_server
+"""
+
+import asyncio
+import json
+import logging
+import os
+from typing import List, Tuple
+
+import numpy as np
+
+from app.services.embedding_service import EMBEDDING_SOCKET_PATH, create_local_encoder
+
+# Micro-batching configuration: the largest batch sent to the model, and how
+# long the first request of a batch may wait for others to join it
+EMBEDDING_SIDECAR_MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_SIDECAR_MAX_BATCH_SIZE", "256"))
+EMBEDDING_SIDECAR_MAX_WAIT_MS = float(os.getenv("EMBEDDING_SIDECAR_MAX_WAIT_MS", "5"))
+
+
+class MicroBatcher:
+    """Collect concurrent encode requests into batches for a single model call."""
+
+    def __init__(self, encoder, max_batch_size: int, max_wait: float):
+        self.encoder = encoder
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.queue: "asyncio.Queue[Tuple[List[str], asyncio.Future]]" = asyncio.Queue()
+
+    async def encode(self, texts: List[str]) -> np.ndarray:
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((texts, future))
+        return await future
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            size = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            texts = [text for item_texts, _ in batch for text in item_texts]
+            try:
+                vectors = await loop.run_in_executor(
+                    None, self.encoder.encode, texts, self.max_batch_size
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            offset = 0
+            for item_texts, future in batch:
+                if not future.done():
+                    future.set_result(vectors[offset : offset + len(item_texts)])
+                offset += len(item_texts)
+
+
+async def _send(writer: asyncio.StreamWriter, message: dict, payload: bytes = b"") -> None:
+    data = json.dumps(message).encode("utf-8")
+    writer.write(len(data).to_bytes(4, "big") + data + payload)
+    await writer.drain()
+
+
+async def _handle_connection(
+    encoder,
+    batcher: MicroBatcher,
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+) -> None:
+    try:
+        while True:
+            try:
+                size = int.from_bytes(await reader.readexactly(4), "big")
+                request = json.loads(await reader.readexactly(size))
+            except asyncio.IncompleteReadError:
+                break
+
+            try:
+                op = request.get("op")
+                if op == "encode":
+                    vectors = np.ascontiguousarray(
+                        await batcher.encode(request["texts"]), dtype=np.float32
+                    )
+                    payload = vectors.tobytes()
+                    await _send(
+                        writer,
+                        {"shape": list(vectors.shape), "nbytes": len(payload)},
+                        payload,
+                    )
+                elif op == "info":
+                    await _send(
+                        writer,
+                        {
+                            "dimension": encoder.dimension(),
+                            "max_seq_length": encoder.max_seq_length(),
+                        },
+                    )
+                elif op == "count_tokens":
+                    await _send(writer, {"counts": encoder.count_tokens(request["texts"])})
+                else:
+                    await _send(writer, {"error": f"Unknown operation: {op}"})
+            except Exception as e:
+                logging.error(f"Error handling embedding request: {str(e)}")
+                await _send(writer, {"error": str(e)})
+    finally:
+        writer.close()
+
+
+async def serve(socket_path: str = EMBEDDING_SOCKET_PATH) -> None:
+    """Load the model and serve embedding requests on a Unix socket."""
+    encoder = create_local_encoder()
+    batcher = MicroBatcher(
+        encoder,
+        max_batch_size=EMBEDDING_SIDECAR_MAX_BATCH_SIZE,
+        max_wait=EMBEDDING_SIDECAR_MAX_WAIT_MS / 1000,
+    )
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    server = await asyncio.start_unix_server(
+        lambda reader, writer: _handle_connection(encoder, batcher, reader, writer),
+        path=socket_path,
+    )
+    logging.info(f"Embedding server listening on {socket_path}")
+
+    batching_task = asyncio.create_task(batcher.run())
+    async with server:
+        await server.serve_forever()
+    batching_task.cancel()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(serve())
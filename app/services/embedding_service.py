@@ -0,0 +1,224 @@
+import json
+import os
+import socket
+import struct
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.metrics import EMBEDDING_ENCODE_SECONDS, EMBEDDING_TEXTS, timed
+
+# Embedding model configuration
+MODEL_NAME = "sentence-transformers/static-retrieval-mrl-en-v1"
+MODEL_CACHE_FOLDER = os.getenv("MODEL_CACHE_FOLDER", "/tmp")
+
+# How the model is served to the application workers:
+# - "local": every worker loads its own copy of the model
+# - "preload": the gunicorn master loads the model before forking the workers,
+#   which share its weights through copy-on-write memory
+# - "sidecar": a single embedding server process loads the model, and the
+#   workers call it over a Unix socket, which micro-batches their requests
+EMBEDDING_MODE = os.getenv("EMBEDDING_MODE", "local")
+# Implementation running the model: "sentence-transformers", or "numpy" for a
+# torch-free encoder that only supports static embedding models
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "sentence-transformers")
+EMBEDDING_SOCKET_PATH = os.getenv("EMBEDDING_SOCKET_PATH", "/tmp/embedding.sock")
+EMBEDDING_CONNECT_TIMEOUT = float(os.getenv("EMBEDDING_CONNECT_TIMEOUT", "60"))
+
+_HEADER = struct.Struct("!I")
+
+
+def load_model():
+    """Load the SentenceTransformer model."""
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(MODEL_NAME, cache_folder=MODEL_CACHE_FOLDER)
+
+
+class LocalEncoder:
+    """Encoder running the SentenceTransformer model in this process."""
+
+    def __init__(self, model):
+        self.model = model
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        return self.model.encode(texts, batch_size=batch_size)
+
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def max_seq_length(self) -> Optional[int]:
+        max_seq_length = self.model.max_seq_length
+        if not max_seq_length or max_seq_length == float("inf"):
+            return None
+        return int(max_seq_length)
+
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        tokenizer = self.model.tokenizer
+        if hasattr(tokenizer, "encode_batch"):
+            # Plain tokenizers.Tokenizer, as used by static embedding models
+            encodings = tokenizer.encode_batch(texts, add_special_tokens=False)
+            return [len(encoding.ids) for encoding in encodings]
+        return [
+            len(ids) for ids in tokenizer(texts, add_special_tokens=False)["input_ids"]
+        ]
+
+
+def send_message(sock: socket.socket, message: Dict[str, Any], payload: bytes = b"") -> None:
+    """Send a length-prefixed JSON message, optionally followed by a binary payload."""
+    data = json.dumps(message).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(data)) + data + payload)
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Embedding server closed the connection")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_message(sock: socket.socket) -> Tuple[Dict[str, Any], bytes]:
+    """Receive a message sent by send_message, with its binary payload if any."""
+    (size,) = _HEADER.unpack(_recv_exactly(sock, _HEADER.size))
+    message = json.loads(_recv_exactly(sock, size))
+    payload = _recv_exactly(sock, message.get("nbytes", 0))
+    return message, payload
+
+
+class SidecarEncoder:
+    """Encoder delegating to the embedding server over a Unix socket."""
+
+    def __init__(self, socket_path: str, connect_timeout: float = EMBEDDING_CONNECT_TIMEOUT):
+        self.socket_path = socket_path
+        self.connect_timeout = connect_timeout
+        self._local = threading.local()
+        self._info: Optional[Dict[str, Any]] = None
+
+    def _connect(self) -> socket.socket:
+        """Connect to the server, waiting for it to start if needed."""
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.socket_path)
+                return sock
+            except OSError:
+                sock.close()
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.5)
+
+    def _request(self, message: Dict[str, Any]) -> Tuple[Dict[str, Any], bytes]:
+        # Each thread keeps its own connection, and reconnects once if it broke
+        for attempt in range(2):
+            sock = getattr(self._local, "sock", None)
+            if sock is None:
+                sock = self._local.sock = self._connect()
+            try:
+                send_message(sock, message)
+                response, payload = recv_message(sock)
+                break
+            except (OSError, ConnectionError):
+                sock.close()
+                self._local.sock = None
+                if attempt:
+                    raise
+
+        if "error" in response:
+            raise RuntimeError(f"Embedding server error: {response['error']}")
+        return response, payload
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        response, payload = self._request(
+            {"op": "encode", "texts": texts, "batch_size": batch_size}
+        )
+        return np.frombuffer(payload, dtype=np.float32).reshape(response["shape"])
+
+    def _get_info(self) -> Dict[str, Any]:
+        if self._info is None:
+            self._info, _ = self._request({"op": "info"})
+        return self._info
+
+    def dimension(self) -> int:
+        return self._get_info()["dimension"]
+
+    def max_seq_length(self) -> Optional[int]:
+        return self._get_info()["max_seq_length"]
+
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        response, _ = self._request({"op": "count_tokens", "texts": texts})
+        return response["counts"]
+
+
+def create_local_encoder():
+    """Create an encoder running the model in this process with the configured backend."""
+    if EMBEDDING_BACKEND == "numpy":
+        from app.services.static_encoder import StaticEmbeddingEncoder
+
+        return StaticEmbeddingEncoder(MODEL_NAME, MODEL_CACHE_FOLDER)
+    if EMBEDDING_BACKEND == "sentence-transformers":
+        return LocalEncoder(load_model())
+    raise ValueError(f"Unknown embedding backend: {EMBEDDING_BACKEND}")
+
+
+def create_encoder():
+    """Create the encoder for the configured embedding mode."""
+    if EMBEDDING_MODE == "sidecar":
+        return SidecarEncoder(EMBEDDING_SOCKET_PATH)
+    if EMBEDDING_MODE in ("local", "preload"):
+        return create_local_encoder()
+    raise ValueError(f"Unknown embedding mode: {EMBEDDING_MODE}")
+
+
+_encoder = None
+_encoder_lock = threading.Lock()
+
+
+def get_encoder():
+    """Get the encoder, creating it on first use. In the preload mode the
+    gunicorn master calls this before forking, so the workers inherit it."""
+    global _encoder
+    if _encoder is None:
+        with _encoder_lock:
+            if _encoder is None:
+                _encoder = create_encoder()
+    return _encoder
+
+
+def get_embeddings(text: str) -> List[float]:
+    """Get embeddings for the given text using the configured encoder."""
+    encoder = get_encoder()
+    EMBEDDING_TEXTS.labels(call="single").inc()
+    with timed(EMBEDDING_ENCODE_SECONDS, call="single"):
+        return encoder.encode([text])[0].tolist()
+
+
+def get_embeddings_batch(texts: List[str], batch_size: int = 64) -> List[List[float]]:
+    """Get embeddings for many texts with a single vectorized encode call."""
+    if not texts:
+        return []
+    encoder = get_encoder()
+    EMBEDDING_TEXTS.labels(call="batch").inc(len(texts))
+    with timed(EMBEDDING_ENCODE_SECONDS, call="batch"):
+        return encoder.encode(texts, batch_size=batch_size).tolist()
+
+
+def get_embedding_dimension() -> int:
+    """Get the dimension of the embeddings produced by the model."""
+    return get_encoder().dimension()
+
+
+def get_max_seq_length() -> Optional[int]:
+    """Get the maximum number of tokens the model reads, or None if unbounded."""
+    return get_encoder().max_seq_length()
+
+
+def count_tokens(texts: List[str]) -> List[int]:
+    """Count the tokens the embedding model sees for each of the texts."""
+    return get_encoder().count_tokens(texts)
@@ -0,0 +1,36 @@
+import asyncio
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from app.services.metrics import BLOCKING_EXECUTOR_WAIT_SECONDS
+
+T = TypeVar("T")
+
+# Upper bound on blocking calls (model inference, YouTube requests) run at once
+BLOCKING_EXECUTOR_WORKERS = int(os.getenv("BLOCKING_EXECUTOR_WORKERS", "4"))
+
+_executor = ThreadPoolExecutor(
+    max_workers=BLOCKING_EXECUTOR_WORKERS, thread_name_prefix="blocking"
+)
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Run a blocking function on the bounded executor and await its result.
+
+    The current context is propagated, so context variables set by the caller
+    are visible inside the function. The time spent waiting for a free
+    thread is recorded in the blocking_executor_wait_seconds histogram.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    submitted = time.perf_counter()
+
+    def call() -> T:
+        BLOCKING_EXECUTOR_WAIT_SECONDS.observe(time.perf_counter() - submitted)
+        return context.run(func, *args, **kwargs)
+
+    return await loop.run_in_executor(_executor, call)
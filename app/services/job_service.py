@@ -0,0 +1,237 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional
+from app.models.job import IngestJob
+from app.services.metrics import INGEST_JOBS
+from app.services.tracing import SERVER_TIMING, trace
+from app.services.video_service import INGEST_LEASE_TTL, extract_video_id, process_video
+
+# Number of videos ingested concurrently by each application worker
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+# Number of finished jobs kept around for status queries
+JOB_HISTORY_SIZE = int(os.getenv("JOB_HISTORY_SIZE", "1000"))
+# Directory shared by all workers on a node, so any of them can report on a job
+JOBS_DIR = os.getenv("JOBS_DIR", "/tmp/ingest-jobs")
+# Active jobs are refreshed at this interval by their worker, whether they
+# are queued, waiting for the ingest lease of their video or in a long stage.
+# Jobs not refreshed for JOB_STALE_SECONDS are considered abandoned (e.g. the
+# worker died), which is no sooner than their ingest lease expires.
+JOB_HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "30"))
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", str(int(INGEST_LEASE_TTL))))
+
+ACTIVE_STATUSES = ("queued", "running")
+
+_executor = ThreadPoolExecutor(
+    max_workers=INGEST_WORKERS, thread_name_prefix="ingest-worker"
+)
+_lock = threading.Lock()
+_jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+_active_jobs_by_video: Dict[str, str] = {}
+_heartbeat_thread: Optional[threading.Thread] = None
+
+
+def _now() -> int:
+    return int(datetime.utcnow().timestamp())
+
+
+def _job_path(job_id: str) -> str:
+    return os.path.join(JOBS_DIR, f"job-{job_id}.json")
+
+
+def _video_path(video_id: str) -> str:
+    return os.path.join(JOBS_DIR, f"video-{video_id}.json")
+
+
+def _write_file(path: str, content: str) -> None:
+    """Atomically replace a file in the shared jobs directory."""
+    import logging
+
+    try:
+        os.makedirs(JOBS_DIR, exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logging.warning(f"Could not write job state to {path}: {str(e)}")
+
+
+def _persist_job(job: IngestJob) -> None:
+    """Share the job state with the other workers on this node."""
+    _write_file(_job_path(job.job_id), job.model_dump_json())
+    if job.status in ACTIVE_STATUSES:
+        _write_file(_video_path(job.video_id), job.job_id)
+
+
+def _load_job(job_id: str) -> Optional[IngestJob]:
+    """Read a job persisted by any worker on this node."""
+    try:
+        with open(_job_path(job_id)) as f:
+            return IngestJob.model_validate_json(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _find_active_job(video_id: str) -> Optional[IngestJob]:
+    """Find a queued or running job for a video, in this or another worker."""
+    active_job_id = _active_jobs_by_video.get(video_id)
+    if active_job_id is not None:
+        return _jobs[active_job_id]
+
+    try:
+        with open(_video_path(video_id)) as f:
+            job = _load_job(f.read().strip())
+    except OSError:
+        return None
+    if (
+        job is not None
+        and job.status in ACTIVE_STATUSES
+        and _now() - job.updated_at < JOB_STALE_SECONDS
+    ):
+        return job
+    return None
+
+
+def _update_job(job_id: str, **changes) -> None:
+    """Apply changes to a job and refresh its update timestamp."""
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None:
+            return
+        for key, value in changes.items():
+            setattr(job, key, value)
+        job.updated_at = _now()
+        if job.status not in ACTIVE_STATUSES:
+            _active_jobs_by_video.pop(job.video_id, None)
+        snapshot = job.model_copy()
+    _persist_job(snapshot)
+
+
+def _heartbeat() -> None:
+    """Refresh the update timestamp of the active jobs of this worker, forever."""
+    while True:
+        time.sleep(JOB_HEARTBEAT_INTERVAL)
+        with _lock:
+            active_job_ids = list(_active_jobs_by_video.values())
+        for job_id in active_job_ids:
+            _update_job(job_id)
+
+
+def _start_heartbeat() -> None:
+    """Start the heartbeat of the active jobs, in the worker submitting the
+    first job. Must be called with the lock held."""
+    global _heartbeat_thread
+    if _heartbeat_thread is None:
+        _heartbeat_thread = threading.Thread(
+            target=_heartbeat, name="ingest-job-heartbeat", daemon=True
+        )
+        _heartbeat_thread.start()
+
+
+def _prune_history() -> None:
+    """Drop the oldest finished jobs once the history grows over its limit."""
+    finished = [
+        job_id for job_id, job in _jobs.items() if job.status not in ACTIVE_STATUSES
+    ]
+    for job_id in finished[: max(0, len(_jobs) - JOB_HISTORY_SIZE)]:
+        del _jobs[job_id]
+        try:
+            os.remove(_job_path(job_id))
+        except OSError:
+            pass
+
+
+def _run_job(job_id: str) -> None:
+    """Run the ingestion of a single job on a worker thread."""
+    import logging
+    import traceback
+
+    job = get_job(job_id)
+    if job is None:
+        return
+
+    _update_job(job_id, status="running", stage="starting")
+    # The stages of the ingestion are timed as spans of a trace of the job
+    with trace("ingest") if SERVER_TIMING else nullcontext() as root:
+        try:
+            video = process_video(
+                job.url,
+                progress_callback=lambda stage, percent: _update_job(
+                    job_id, stage=stage, progress=round(percent, 1)
+                ),
+            )
+            _update_job(
+                job_id,
+                status="completed",
+                stage="done",
+                progress=100.0,
+                video=video,
+                timings=root.durations() if root else None,
+            )
+            INGEST_JOBS.labels(status="completed").inc()
+            logging.info(f"Ingestion job {job_id} for video {job.video_id} completed")
+        except Exception as e:
+            logging.error(f"Ingestion job {job_id} for video {job.video_id} failed: {str(e)}")
+            logging.error(traceback.format_exc())
+            _update_job(
+                job_id,
+                status="failed",
+                error=str(e),
+                timings=root.durations() if root else None,
+            )
+            INGEST_JOBS.labels(status="failed").inc()
+
+
+def submit_job(url: str) -> IngestJob:
+    """
+    Enqueue a video for background ingestion.
+
+    Submissions for a video that already has a queued or running job, in this
+    or another worker on the node, are coalesced and return the existing job
+    instead of creating a new one.
+    """
+    import logging
+
+    video_id = extract_video_id(url)
+
+    with _lock:
+        active_job = _find_active_job(video_id)
+        if active_job is not None:
+            logging.info(
+                f"Video {video_id} already has an active ingestion job {active_job.job_id}"
+            )
+            return active_job.model_copy()
+
+        current_time = _now()
+        job = IngestJob(
+            job_id=uuid.uuid4().hex,
+            video_id=video_id,
+            url=url,
+            created_at=current_time,
+            updated_at=current_time,
+        )
+        _jobs[job.job_id] = job
+        _active_jobs_by_video[video_id] = job.job_id
+        _prune_history()
+        _start_heartbeat()
+        snapshot = job.model_copy()
+
+    _persist_job(snapshot)
+    logging.info(f"Queued ingestion job {job.job_id} for video {video_id}")
+    _executor.submit(_run_job, job.job_id)
+    return snapshot
+
+
+def get_job(job_id: str) -> Optional[IngestJob]:
+    """Get a snapshot of a job by its ID, including jobs run by other workers."""
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is not None:
+            return job.model_copy()
+    return _load_job(job_id)
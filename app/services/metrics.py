@@ -0,0 +1,133 @@
+"""
+Prometheus metrics of the application.
+
+Metrics are exported by the /metrics endpoint. Under gunicorn, every worker
+writes its samples to PROMETHEUS_MULTIPROC_DIR (set up by gunicorn.conf.py)
+and the endpoint aggregates the files of all the workers, so whichever
+worker serves a scrape reports the totals of the whole server.
+"""
+
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator, Tuple
+
+import prometheus_client
+
+# Seconds between two checks of how late the event loop runs scheduled callbacks
+EVENT_LOOP_LAG_INTERVAL = float(os.getenv("EVENT_LOOP_LAG_INTERVAL", "0.5"))
+
+# Buckets in seconds, for fast in-process work and calls to Qdrant
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+# Buckets in seconds, for requests to YouTube
+FETCH_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+SEGMENT_COUNT_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def _histogram(name: str, documentation: str, labels=(), buckets=LATENCY_BUCKETS):
+    return prometheus_client.Histogram(name, documentation, labels, buckets=buckets)
+
+
+def _counter(name: str, documentation: str, labels=()):
+    return prometheus_client.Counter(name, documentation, labels)
+
+
+HTTP_REQUEST_SECONDS = _histogram(
+    "http_request_duration_seconds",
+    "Time to respond to HTTP requests, until the response starts",
+    ["method", "route", "status"],
+)
+EVENT_LOOP_LAG_SECONDS = _histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop runs scheduled callbacks, high when it is blocked",
+)
+BLOCKING_EXECUTOR_WAIT_SECONDS = _histogram(
+    "blocking_executor_wait_seconds",
+    "Time blocking calls wait for a free thread of the bounded executor",
+)
+EMBEDDING_ENCODE_SECONDS = _histogram(
+    "embedding_encode_seconds",
+    "Time to encode texts with the embedding model, per call",
+    ["call"],
+)
+EMBEDDING_TEXTS = _counter(
+    "embedding_texts", "Texts encoded with the embedding model", ["call"]
+)
+QDRANT_REQUEST_SECONDS = _histogram(
+    "qdrant_request_duration_seconds",
+    "Time of requests to Qdrant, per client method",
+    ["operation"],
+)
+QDRANT_ERRORS = _counter(
+    "qdrant_errors", "Requests to Qdrant that raised an error", ["operation"]
+)
+YOUTUBE_METADATA_SECONDS = _histogram(
+    "youtube_metadata_fetch_seconds",
+    "Time to fetch video metadata with yt-dlp",
+    buckets=FETCH_BUCKETS,
+)
+TRANSCRIPT_FETCH_SECONDS = _histogram(
+    "transcript_fetch_seconds",
+    "Time to get a video transcript, from its source or the transcript cache",
+    buckets=FETCH_BUCKETS,
+)
+FETCH_ERRORS = _counter(
+    "fetch_errors", "Failed fetches of video metadata or transcripts", ["source"]
+)
+SEGMENTS_PER_VIDEO = _histogram(
+    "segments_per_video",
+    "Segments stored per ingested video",
+    buckets=SEGMENT_COUNT_BUCKETS,
+)
+INGEST_SECONDS = _histogram(
+    "video_ingest_seconds",
+    "Time to ingest a video, from fetching it to registering it",
+    buckets=FETCH_BUCKETS,
+)
+INGEST_JOBS = _counter("ingest_jobs", "Finished ingestion jobs", ["status"])
+CACHE_REQUESTS = _counter("cache_requests", "Cache lookups", ["cache", "result"])
+CACHE_EVICTIONS = _counter(
+    "cache_evictions", "Entries evicted to make room in bounded caches", ["cache"]
+)
+
+
+@contextmanager
+def timed(histogram, **labels) -> Iterator[None]:
+    """Observe the duration of the block, whether or not it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metric = histogram.labels(**labels) if labels else histogram
+        metric.observe(time.perf_counter() - started)
+
+
+def count_cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+async def monitor_event_loop_lag(interval: float = EVENT_LOOP_LAG_INTERVAL) -> None:
+    """
+    Measure how late the event loop wakes up from regular sleeps, until
+    cancelled. Blocking calls made on the loop show up as lag.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG_SECONDS.observe(max(loop.time() - started - interval, 0.0))
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Render the metrics in the Prometheus text format, with their content type."""
+    registry = prometheus_client.REGISTRY
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        # Aggregate the samples written by all the worker processes
+        registry = prometheus_client.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
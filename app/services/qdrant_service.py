@@ -1,7 +1,50 @@
+import functools
+import inspect
 import os
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient, QdrantClient
 import logging
 
+from app.services.metrics import QDRANT_ERRORS, QDRANT_REQUEST_SECONDS, timed
+
+
+class InstrumentedClient:
+    """
+    Proxy of a sync or async Qdrant client recording the duration and the
+    errors of every call, labeled with the name of the client method.
+    """
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._client, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        if inspect.iscoroutinefunction(attr):
+
+            @functools.wraps(attr)
+            async def call_async(*args, **kwargs):
+                with timed(QDRANT_REQUEST_SECONDS, operation=name):
+                    try:
+                        return await attr(*args, **kwargs)
+                    except Exception:
+                        QDRANT_ERRORS.labels(operation=name).inc()
+                        raise
+
+            return call_async
+
+        @functools.wraps(attr)
+        def call(*args, **kwargs):
+            with timed(QDRANT_REQUEST_SECONDS, operation=name):
+                try:
+                    return attr(*args, **kwargs)
+                except Exception:
+                    QDRANT_ERRORS.labels(operation=name).inc()
+                    raise
+
+        return call
+
 
 def get_qdrant_client() -> QdrantClient:
     """
@@ -26,16 +69,27 @@ def get_qdrant_client() -> QdrantClient:
         client = QdrantClient(location=url)
         logging.info(f"Connecting to Qdrant at {url}")
 
-    # Test connection
-    try:
-        client.get_collections()
-        logging.info(f"Successfully connected to Qdrant at {url}")
-    except Exception as e:
-        logging.error(f"Failed to connect to Qdrant at {url}: {e}")
-        # Connection will be tested again when used
-
+    # The connection is checked by the application warm-up, not on import
     return client
 
 
-# Initialize global client instance
-qdrant_client = get_qdrant_client()
+def get_async_qdrant_client() -> AsyncQdrantClient:
+    """
+    Initialize an async Qdrant client using the same environment variables as
+    get_qdrant_client. It is used by the request handlers, so vector store I/O
+    does not block the event loop.
+
+    Returns:
+        AsyncQdrantClient: Configured async Qdrant client
+    """
+    url = os.getenv("QDRANT_URL", "http://localhost:6333")
+    api_key = os.getenv("QDRANT_API_KEY")
+
+    if api_key:
+        return AsyncQdrantClient(location=url, api_key=api_key)
+    return AsyncQdrantClient(location=url)
+
+
+# Initialize global client instances, timed per operation
+qdrant_client = InstrumentedClient(get_qdrant_client())
+async_qdrant_client = InstrumentedClient(get_async_qdrant_client())
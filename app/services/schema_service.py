@@ -0,0 +1,205 @@
+"""
+Startup verification of the Qdrant schema.
+
+ensure_collection_exists only creates missing collections, so collections
+created by older versions never get new payload indexes or settings. The
+reconciler compares every collection with the expected schema:
+- missing collections and payload indexes are created,
+- payload indexes with different parameters are recreated,
+- collection settings that differ from the configuration (vector sizes,
+  distance, MRL dimension, sparse vectors, quantization) are reported, as
+  changing them needs a migration.
+
+The reconciler runs once per deployment, from the gunicorn master before the
+workers start (see gunicorn.conf.py), or as a deploy step:
+
+    python -m app.services.schema_service [--verify]
+
+Workers only verify the schema on startup and report the drift, as workers
+recreating indexes at the same time would break the queries that need them.
+"""
+
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from qdrant_client.http import models
+
+from app.services.embedding_service import get_embedding_dimension
+from app.services.qdrant_service import qdrant_client
+from app.services.video_service import (
+    COLLECTION_NAME,
+    FULL_VECTOR_NAME,
+    MRL_DIMENSION,
+    MRL_VECTOR_NAME,
+    PAYLOAD_INDEXES,
+    SPARSE_VECTOR_NAME,
+    SPARSE_VECTORS,
+    create_payload_indexes,
+    ensure_collection_exists,
+    existing_collection_names,
+    quantization_config,
+    reset_segment_vectors,
+)
+
+# What is done with the schema on startup: "apply" makes the gunicorn master
+# create missing collections and indexes before the workers start, "verify"
+# only reports drift, "off" skips it. Workers never change the schema.
+SCHEMA_RECONCILE = os.getenv("SCHEMA_RECONCILE", "apply")
+
+
+def _index_matches(info: Optional[models.PayloadIndexInfo], expected: Any) -> bool:
+    """Check whether an existing payload index has the expected type and parameters."""
+    if info is None or info.data_type.value != expected.type.value:
+        return False
+
+    actual = info.params.model_dump() if info.params is not None else {}
+    for name, value in expected.model_dump(exclude_none=True).items():
+        if name == "type":
+            continue
+        # Flags left unset are reported as None, and mean False
+        if (actual.get(name) or False) != value:
+            return False
+    return True
+
+
+def check_payload_indexes(
+    collection_name: str, payload_schema: Dict[str, models.PayloadIndexInfo]
+) -> Dict[str, List[str]]:
+    """Find the expected payload indexes of a collection that are missing or differ."""
+    missing, drifted = [], []
+    for field_name, expected in PAYLOAD_INDEXES.get(collection_name, {}).items():
+        info = payload_schema.get(field_name)
+        if info is None:
+            missing.append(field_name)
+        elif not _index_matches(info, expected):
+            drifted.append(field_name)
+    return {"missing": missing, "drifted": drifted}
+
+
+def check_segment_settings(config: models.CollectionConfig) -> List[str]:
+    """Compare the settings of the segments collection with the configuration."""
+    drift = []
+    vectors = config.params.vectors
+    if not isinstance(vectors, dict):
+        vectors = {"": vectors}
+
+    full = vectors.get("") or vectors.get(FULL_VECTOR_NAME)
+    dimension = get_embedding_dimension()
+    if full is None:
+        drift.append(f"{COLLECTION_NAME} has no full-dimension vector")
+    else:
+        if full.size != dimension:
+            drift.append(
+                f"{COLLECTION_NAME} vectors have {full.size} dimensions, "
+                f"but the model produces {dimension}"
+            )
+        if full.distance != models.Distance.COSINE:
+            drift.append(f"{COLLECTION_NAME} uses {full.distance} distance instead of cosine")
+
+    mrl = vectors.get(MRL_VECTOR_NAME)
+    mrl_dimension = mrl.size if mrl is not None else 0
+    if mrl_dimension != MRL_DIMENSION and MRL_DIMENSION < dimension:
+        drift.append(
+            f"{COLLECTION_NAME} has MRL dimension {mrl_dimension or 'none'}, "
+            f"but MRL_DIMENSION is {MRL_DIMENSION or 'none'}; "
+            "migrate with python -m app.migrations.reembed to apply it"
+        )
+
+    has_sparse = SPARSE_VECTOR_NAME in (config.params.sparse_vectors or {})
+    if has_sparse != SPARSE_VECTORS:
+        drift.append(
+            f"{COLLECTION_NAME} {'has' if has_sparse else 'has no'} sparse vectors, "
+            f"but SPARSE_VECTORS is {'on' if SPARSE_VECTORS else 'off'}; "
+            "searches use what exists, migrate with python -m app.migrations.reembed to apply it"
+        )
+
+    if config.quantization_config != quantization_config():
+        drift.append(
+            f"{COLLECTION_NAME} quantization is {config.quantization_config}, "
+            f"but the configuration is {quantization_config()}; "
+            "run python -m app.migrations.quantization"
+        )
+    return drift
+
+
+def reconcile_schema(apply: bool = True) -> Dict[str, List[str]]:
+    """
+    Verify the schema of all collections, and fix what can be fixed in place.
+
+    Args:
+        apply: Whether to create missing collections and payload indexes and
+            recreate differing indexes, or only report them
+
+    Returns:
+        Dict[str, List[str]]: The drift left, and the changes applied
+    """
+    drift, applied = [], []
+    if apply:
+        ensure_collection_exists()
+
+    existing = set(existing_collection_names())
+    for collection_name in PAYLOAD_INDEXES:
+        if collection_name not in existing:
+            drift.append(f"Collection {collection_name} does not exist")
+            continue
+
+        info = qdrant_client.get_collection(collection_name)
+        indexes = check_payload_indexes(collection_name, info.payload_schema)
+        if apply:
+            # Qdrant keeps serving queries while the indexes are being built
+            for field_name in indexes["drifted"]:
+                qdrant_client.delete_payload_index(collection_name, field_name)
+            fields = indexes["missing"] + indexes["drifted"]
+            if fields:
+                create_payload_indexes(collection_name, fields)
+                applied.extend(f"indexed {collection_name}.{field_name}" for field_name in fields)
+        else:
+            drift.extend(
+                f"{collection_name} has no payload index on {field_name}"
+                for field_name in indexes["missing"]
+            )
+            drift.extend(
+                f"{collection_name} payload index on {field_name} differs from "
+                f"{PAYLOAD_INDEXES[collection_name][field_name]}"
+                for field_name in indexes["drifted"]
+            )
+
+        if collection_name == COLLECTION_NAME:
+            drift.extend(check_segment_settings(info.config))
+
+    if apply:
+        reset_segment_vectors()
+    return {"drift": drift, "applied": applied}
+
+
+def verify_schema_on_startup() -> None:
+    """Verify the schema unless SCHEMA_RECONCILE is off, logging the drift.
+    Errors are raised, for the application warm-up to retry it."""
+    if SCHEMA_RECONCILE == "off":
+        return
+
+    report = reconcile_schema(apply=False)
+
+    for change in report["applied"]:
+        logging.info(f"Schema: {change}")
+    for drift in report["drift"]:
+        logging.warning(f"Schema drift: {drift}")
+    if not report["drift"]:
+        logging.info("Qdrant schema is up to date")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Verify and reconcile the Qdrant schema.")
+    parser.add_argument("--verify", action="store_true", help="Only report the drift")
+    args = parser.parse_args()
+
+    report = reconcile_schema(apply=not args.verify)
+    for change in report["applied"]:
+        print(f"Applied: {change}")
+    for drift in report["drift"]:
+        print(f"Drift: {drift}")
+    if not report["drift"]:
+        print("Qdrant schema is up to date")
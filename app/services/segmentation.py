@@ -0,0 +1,103 @@
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+
+@dataclass
+class Window:
+    """A window over transcript entries, covering indexes [first, last)."""
+
+    first: int
+    last: int
+    start: float
+    end: float
+
+
+class TranscriptWindower:
+    """
+    Split transcript entries into overlapping windows in a single linear pass.
+
+    Each window starts at a transcript entry and spans all the entries that
+    start less than `window_seconds` after it. The next window starts at the
+    first entry at least `stride_seconds` later, which defaults to the window
+    length minus `overlap_seconds`. With `max_tokens` set, windows are also
+    cut before their total token count exceeds the budget, so they fit into
+    the sequence length of the embedding model.
+
+    Entries are expected to be sorted by start time.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float = 30.0,
+        overlap_seconds: float = 10.0,
+        stride_seconds: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+    ):
+        if stride_seconds is None:
+            stride_seconds = window_seconds - overlap_seconds
+        if window_seconds <= 0:
+            raise ValueError("Window length must be positive")
+        if stride_seconds <= 0:
+            raise ValueError("Window stride must be positive")
+
+        self.window_seconds = window_seconds
+        self.stride_seconds = stride_seconds
+        self.max_tokens = max_tokens or None
+
+    def windows(
+        self,
+        starts: Sequence[float],
+        durations: Sequence[float],
+        token_counts: Optional[Sequence[int]] = None,
+    ) -> List[Window]:
+        """Compute the windows over entries given as start/duration arrays."""
+        n = len(starts)
+        if n == 0:
+            return []
+
+        max_tokens = self.max_tokens if token_counts is not None else None
+        token_offsets = None
+        if max_tokens is not None:
+            # Prefix sums give the token count of any window in constant time
+            token_offsets = [0] * (n + 1)
+            for i, count in enumerate(token_counts):
+                token_offsets[i + 1] = token_offsets[i] + count
+
+        windows = []
+        first = 0
+        last = 0
+        next_first = 0
+        # Every pointer only moves forward, so the pass is linear
+        while first < n:
+            window_start = starts[first]
+
+            # Extend the window up to its length or token budget, keeping at least one entry
+            last = max(last, first + 1)
+            while last < n and starts[last] - window_start < self.window_seconds:
+                if (
+                    token_offsets is not None
+                    and token_offsets[last + 1] - token_offsets[first] > max_tokens
+                ):
+                    break
+                last += 1
+
+            windows.append(
+                Window(
+                    first=first,
+                    last=last,
+                    start=window_start,
+                    end=starts[last - 1] + durations[last - 1],
+                )
+            )
+
+            # The window reached the end of the transcript
+            if last >= n:
+                break
+
+            # Start the next window one stride later, without skipping entries
+            next_first = max(next_first, first + 1)
+            while next_first < n and starts[next_first] - window_start < self.stride_seconds:
+                next_first += 1
+            first = min(next_first, last)
+
+        return windows
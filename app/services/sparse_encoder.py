@@ -0,0 +1,89 @@
+import os
+import re
+import unicodedata
+import zlib
+from collections import Counter
+from typing import Dict, List
+
+from qdrant_client.http import models
+
+# BM25 configuration: term frequency saturation (k1), document length
+# normalization (b), and the average number of tokens of a segment, which is
+# fixed so that documents can be encoded without corpus statistics
+SPARSE_BM25_K1 = float(os.getenv("SPARSE_BM25_K1", "1.2"))
+SPARSE_BM25_B = float(os.getenv("SPARSE_BM25_B", "0.75"))
+SPARSE_AVG_DOC_LENGTH = float(os.getenv("SPARSE_AVG_DOC_LENGTH", "80"))
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+# Frequent English words that carry no meaning on their own
+STOP_WORDS = frozenset(
+    """
+    a about after all also am an and any are as at be because been before but by
+    can could did do does doing for from had has have having he her here him his
+    how i if in into is it its just me more most my no not now of on once only or
+    other our out over she so some such than that the their them then there these
+    they this those through to too under up very was we were what when where which
+    while who why will with would you your
+    """.split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens, without stop words. Tokens are
+    not stemmed, so identifiers, acronyms and names match exactly."""
+    tokens = _TOKEN_PATTERN.findall(unicodedata.normalize("NFKC", text).lower())
+    return [token for token in tokens if token not in STOP_WORDS]
+
+
+def token_index(token: str) -> int:
+    """Map a token to a sparse vector dimension, with a stable 32-bit hash."""
+    return zlib.crc32(token.encode("utf-8"))
+
+
+def _to_sparse_vector(weights: Dict[int, float]) -> models.SparseVector:
+    indices = sorted(weights)
+    return models.SparseVector(indices=indices, values=[weights[i] for i in indices])
+
+
+class BM25SparseEncoder:
+    """
+    BM25 sparse vectors computed locally, without any model.
+
+    Documents get the BM25 term frequency weight of each of their tokens, and
+    queries a weight of 1 per token. The inverse document frequency part of
+    BM25 is applied by Qdrant at search time, as the sparse vectors are
+    stored with the IDF modifier, so it always reflects the current corpus.
+    Tokens are hashed into the 32-bit index space, so no vocabulary is kept.
+    """
+
+    def __init__(
+        self,
+        k1: float = SPARSE_BM25_K1,
+        b: float = SPARSE_BM25_B,
+        avg_doc_length: float = SPARSE_AVG_DOC_LENGTH,
+    ):
+        self.k1 = k1
+        self.b = b
+        self.avg_doc_length = avg_doc_length
+
+    def encode_document(self, text: str) -> models.SparseVector:
+        """Encode a document into BM25 term frequency weights."""
+        tokens = tokenize(text)
+        length_norm = self.k1 * (1 - self.b + self.b * len(tokens) / self.avg_doc_length)
+
+        frequencies: Dict[int, int] = Counter(token_index(token) for token in tokens)
+        return _to_sparse_vector(
+            {
+                index: frequency * (self.k1 + 1) / (frequency + length_norm)
+                for index, frequency in frequencies.items()
+            }
+        )
+
+    def encode_documents(self, texts: List[str]) -> List[models.SparseVector]:
+        """Encode many documents into BM25 term frequency weights."""
+        return [self.encode_document(text) for text in texts]
+
+    def encode_query(self, text: str) -> models.SparseVector:
+        """Encode a query, giving each distinct token the same weight."""
+        return _to_sparse_vector({token_index(token): 1.0 for token in tokenize(text)})
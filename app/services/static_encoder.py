@@ -0,0 +1,134 @@
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Mapping of safetensors dtypes to NumPy dtypes that can be memory-mapped
+_SAFETENSORS_DTYPES = {
+    "F64": np.float64,
+    "F32": np.float32,
+    "F16": np.float16,
+}
+
+
+def _resolve_model_path(model_name: str, cache_folder: str) -> str:
+    """Get the local directory of a model, downloading its files if needed."""
+    if os.path.isdir(model_name):
+        return model_name
+
+    from huggingface_hub import snapshot_download
+
+    return snapshot_download(
+        model_name,
+        cache_dir=cache_folder,
+        allow_patterns=["modules.json", "*tokenizer.json", "*.safetensors", "*.npy"],
+    )
+
+
+def _memmap_safetensors(path: str, tensor_names: List[str]) -> np.ndarray:
+    """Memory-map a tensor from a safetensors file, without loading it."""
+    with open(path, "rb") as f:
+        header_size = int.from_bytes(f.read(8), "little")
+        header: Dict[str, Any] = json.loads(f.read(header_size))
+
+    for name in tensor_names:
+        if name in header:
+            info = header[name]
+            break
+    else:
+        raise ValueError(f"None of the tensors {tensor_names} found in {path}")
+
+    dtype = _SAFETENSORS_DTYPES.get(info["dtype"])
+    if dtype is None:
+        raise ValueError(f"Unsupported safetensors dtype: {info['dtype']}")
+
+    begin, _ = info["data_offsets"]
+    return np.memmap(
+        path,
+        dtype=dtype,
+        mode="r",
+        offset=8 + header_size + begin,
+        shape=tuple(info["shape"]),
+    )
+
+
+class StaticEmbeddingEncoder:
+    """
+    Torch-free encoder for static embedding models.
+
+    A static embedding model tokenizes the text, looks the token embeddings
+    up in a table and averages them. This encoder does the same with the
+    `tokenizers` package and vectorized NumPy, reading the embedding table
+    memory-mapped from the model's safetensors (or .npy) file.
+    """
+
+    def __init__(self, model_name: str, cache_folder: str = "/tmp"):
+        from tokenizers import Tokenizer
+
+        model_path = _resolve_model_path(model_name, cache_folder)
+        with open(os.path.join(model_path, "modules.json")) as f:
+            modules = json.load(f)
+
+        static_modules = [m for m in modules if m["type"].endswith("StaticEmbedding")]
+        if not static_modules:
+            raise ValueError(f"Model {model_name} is not a static embedding model")
+        module_path = os.path.join(model_path, static_modules[0]["path"])
+        self.normalize = any(m["type"].endswith("Normalize") for m in modules)
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(module_path, "tokenizer.json"))
+
+        npy_path = os.path.join(module_path, "embedding.npy")
+        if os.path.exists(npy_path):
+            self.embeddings = np.load(npy_path, mmap_mode="r")
+        else:
+            # "embeddings" is used by models converted from model2vec
+            self.embeddings = _memmap_safetensors(
+                os.path.join(module_path, "model.safetensors"),
+                ["embedding.weight", "embeddings"],
+            )
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        dimension = self.embeddings.shape[1]
+        result = np.empty((len(texts), dimension), dtype=np.float32)
+
+        for offset in range(0, len(texts), batch_size):
+            batch = texts[offset : offset + batch_size]
+            encodings = self.tokenizer.encode_batch(batch, add_special_tokens=False)
+            lengths = np.array([len(encoding.ids) for encoding in encodings])
+            token_ids = np.fromiter(
+                (token_id for encoding in encodings for token_id in encoding.ids),
+                dtype=np.int64,
+                count=int(lengths.sum()),
+            )
+
+            # Gather all the token embeddings at once, and average them per text
+            # with a single matrix product: row i of the pooling matrix holds
+            # 1 / length over the tokens of text i. Empty texts get zeros.
+            vectors = np.zeros((len(batch), dimension), dtype=np.float32)
+            if token_ids.size:
+                rows = np.asarray(self.embeddings.take(token_ids, axis=0), dtype=np.float32)
+                pooling = np.zeros((len(batch), token_ids.size), dtype=np.float32)
+                text_index = np.repeat(np.arange(len(batch)), lengths)
+                pooling[text_index, np.arange(token_ids.size)] = 1.0 / lengths[text_index]
+                vectors = pooling @ rows
+
+            if self.normalize:
+                norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+                vectors = vectors / np.maximum(norms, 1e-12)
+
+            result[offset : offset + len(batch)] = vectors
+
+        return result
+
+    def dimension(self) -> int:
+        return int(self.embeddings.shape[1])
+
+    def max_seq_length(self) -> Optional[int]:
+        truncation = self.tokenizer.truncation
+        return truncation["max_length"] if truncation else None
+
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        encodings = self.tokenizer.encode_batch(texts, add_special_tokens=False)
+        return [len(encoding.ids) for encoding in encodings]
+
@@ -0,0 +1,101 @@
+"""
+Lightweight timing spans of the work done for a request or an ingestion job.
+
+A trace is started with `trace()`, and `span(name)` blocks within it record
+their duration as children of the enclosing span. The current span is a
+context variable, so spans nest across function calls, and calls run with
+run_blocking attach their spans to the request that made them. Outside of a
+trace, `span()` returns a shared no-op context manager.
+
+The durations are reported per span name in the Server-Timing header, and
+the whole span tree can be returned as JSON for debugging.
+"""
+
+import contextvars
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, List, Optional
+
+# Whether all requests and ingestion jobs are traced, and requests answered
+# with a Server-Timing header. Off by default, as the header discloses the
+# internal stages of requests; requests with ?trace=true are always traced.
+SERVER_TIMING = os.getenv("SERVER_TIMING", "false").lower() == "true"
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+_NO_SPAN = nullcontext()
+
+
+class Span:
+    """A timed unit of work, with the spans started within it."""
+
+    __slots__ = ("name", "start", "end", "children", "_token")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.children: List["Span"] = []
+
+    @property
+    def duration(self) -> float:
+        """Duration in seconds, up to now if the span is not finished."""
+        return (self.end or time.perf_counter()) - self.start
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.end = time.perf_counter()
+        _current_span.reset(self._token)
+
+    def to_dict(self, origin: Optional[float] = None) -> Dict[str, Any]:
+        """The span tree, with start times in milliseconds since the root span."""
+        origin = self.start if origin is None else origin
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+            "children": [child.to_dict(origin) for child in self.children],
+        }
+
+    def durations(self) -> Dict[str, float]:
+        """Total milliseconds spent in the spans below this one, per name,
+        in the order the names first appear."""
+        totals: Dict[str, float] = {}
+        stack = list(reversed(self.children))
+        while stack:
+            current = stack.pop()
+            totals[current.name] = totals.get(current.name, 0.0) + current.duration * 1000
+            stack.extend(reversed(current.children))
+        return {name: round(total, 3) for name, total in totals.items()}
+
+
+def span(name: str):
+    """
+    Time a block as a child of the current span. Does nothing, at almost no
+    cost, when no trace is active.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return _NO_SPAN
+    child = Span(name)
+    parent.children.append(child)
+    return child
+
+
+@contextmanager
+def trace(name: str) -> Iterator[Span]:
+    """Start a trace, whose spans are recorded under the yielded root span."""
+    with Span(name) as root:
+        yield root
+
+
+def server_timing(root: Span) -> str:
+    """Format the durations of a trace as a Server-Timing header value."""
+    metrics = [f"{name};dur={duration}" for name, duration in root.durations().items()]
+    metrics.append(f"total;dur={round(root.duration * 1000, 3)}")
+    return ", ".join(metrics)
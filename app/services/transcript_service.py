@@ -0,0 +1,423 @@
+"""
+Sources of video transcripts.
+
+Transcripts come from YouTube, or from local JSON fixtures. Transcripts
+fetched from YouTube are kept in a compressed on-disk cache, so videos can be
+segmented and embedded again without fetching them again.
+"""
+
+import copy
+import gzip
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.metrics import count_cache_lookup
+
+# Where transcripts come from: "youtube", or "fixtures" to read them from
+# TRANSCRIPT_FIXTURES_DIR, which works offline
+TRANSCRIPT_SOURCE = os.getenv("TRANSCRIPT_SOURCE", "youtube")
+TRANSCRIPT_FIXTURES_DIR = os.getenv("TRANSCRIPT_FIXTURES_DIR", "fixtures")
+# Cache of fetched transcripts, shared by all workers on a node (empty to
+# disable it). Past the size limit (0 for unlimited), the least recently used
+# transcripts are evicted.
+TRANSCRIPT_CACHE_DIR = os.getenv("TRANSCRIPT_CACHE_DIR", "/tmp/transcript-cache")
+TRANSCRIPT_CACHE_MAX_MB = float(os.getenv("TRANSCRIPT_CACHE_MAX_MB", "1024"))
+# When a video has no English transcript, or it fails, this many of the
+# other candidate transcripts are fetched from YouTube at once. The whole
+# fetch of a transcript, listing included, gives up after the timeout
+# (seconds, 0 for none). Requests to YouTube run on a pool of threads shared
+# by all the fetches of the process.
+TRANSCRIPT_FETCH_CONCURRENCY = int(os.getenv("TRANSCRIPT_FETCH_CONCURRENCY", "3"))
+TRANSCRIPT_FETCH_TIMEOUT = float(os.getenv("TRANSCRIPT_FETCH_TIMEOUT", "60"))
+TRANSCRIPT_FETCH_WORKERS = int(os.getenv("TRANSCRIPT_FETCH_WORKERS", "8"))
+
+_fetch_executor = ThreadPoolExecutor(
+    max_workers=TRANSCRIPT_FETCH_WORKERS, thread_name_prefix="transcript-fetch"
+)
+
+
+@dataclass
+class Transcript:
+    """A transcript of a video, as a list of {"text", "start", "duration"} entries."""
+
+    video_id: str
+    language: str
+    translated: bool
+    entries: List[Dict[str, Any]]
+
+
+class TranscriptSource:
+    """A source of video transcripts."""
+
+    def fetch(self, video_id: str) -> Transcript:
+        """Get the transcript of a video, raising an error if it has none."""
+        raise NotImplementedError
+
+
+class YouTubeTranscriptSource(TranscriptSource):
+    """
+    Transcripts fetched from YouTube, through the Webshare proxy if configured.
+
+    Requests run on the threads of the fetch pool. Each thread reuses its own
+    client and HTTP session, since sessions are not thread-safe, and keeps its
+    connections to YouTube and the proxy alive from one video to the next.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _client(self):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            # Imported on first use, so application workers start faster
+            import requests
+            from youtube_transcript_api import YouTubeTranscriptApi
+            from youtube_transcript_api.proxies import WebshareProxyConfig
+
+            proxy_config = None
+            webshare_username = os.environ.get("WEBSHARE_USERNAME")
+            webshare_password = os.environ.get("WEBSHARE_PASSWORD")
+            if webshare_username and webshare_password:
+                proxy_config = WebshareProxyConfig(
+                    proxy_username=webshare_username,
+                    proxy_password=webshare_password,
+                )
+            session = requests.Session()
+            client = YouTubeTranscriptApi(proxy_config=proxy_config, http_client=session)
+            self._local.client = client
+            self._local.session = session
+        return client
+
+    def _session(self):
+        """The HTTP session of this thread's client, as set up for the proxy."""
+        self._client()
+        return self._local.session
+
+    @staticmethod
+    def _wait(future: Future, deadline: Optional[float]) -> Any:
+        """Get the result of a request, raising FutureTimeoutError past the deadline."""
+        return future.result(
+            timeout=None if deadline is None else max(0.0, deadline - time.monotonic())
+        )
+
+    @staticmethod
+    def _timed_out(video_id: str) -> ValueError:
+        return ValueError(
+            f"Timed out fetching the transcript of video {video_id} "
+            f"after {TRANSCRIPT_FETCH_TIMEOUT}s"
+        )
+
+    def fetch(self, video_id: str) -> Transcript:
+        """
+        Get the transcript of a video in any available language.
+        Will try to get transcripts in this priority:
+        1. English transcript (if available)
+        2. Any available transcript translated to English (if translatable)
+        3. Any available transcript in its original language
+
+        The English transcript is tried on its own, since it usually works.
+        The other candidates are then fetched up to TRANSCRIPT_FETCH_CONCURRENCY
+        at a time, and the first one in priority order that works is used.
+        """
+        import logging
+
+        deadline = time.monotonic() + TRANSCRIPT_FETCH_TIMEOUT if TRANSCRIPT_FETCH_TIMEOUT else None
+        listing = _fetch_executor.submit(lambda: self._client().list(video_id))
+        try:
+            transcript_list = self._wait(listing, deadline)
+        except FutureTimeoutError:
+            listing.cancel()
+            raise self._timed_out(video_id)
+
+        # First, look for English transcript
+        english_transcript = None
+        other_transcripts = []
+
+        # Categorize available transcripts
+        for transcript_item in transcript_list:
+            if transcript_item.language_code == "en":
+                english_transcript = transcript_item
+            else:
+                other_transcripts.append(transcript_item)
+
+        # 1. Try English first if available
+        if english_transcript:
+            logging.info("Found English transcript, using it directly")
+            transcript = self._first_fetched(
+                video_id, [(english_transcript, False)], deadline
+            )
+            if transcript is not None:
+                return transcript
+
+        # 2. Try translatable transcripts, then 3. any transcript in original language
+        candidates = [(t, True) for t in other_transcripts if t.is_translatable]
+        candidates += [(t, False) for t in other_transcripts]
+        transcript = self._first_fetched(video_id, candidates, deadline)
+        if transcript is not None:
+            return transcript
+
+        # If we get here, no transcripts worked
+        available_langs = [t.language_code for t in transcript_list]
+        raise ValueError(
+            f"No usable transcripts found for video {video_id}. Available languages: {available_langs}"
+        )
+
+    def _first_fetched(
+        self, video_id: str, candidates: List[Tuple[Any, bool]], deadline: Optional[float]
+    ) -> Optional[Transcript]:
+        """
+        Fetch candidate transcripts, each either translated to English or in
+        its own language, and return the first one in order that could be
+        fetched, or None if none could be.
+
+        Each fetch uses the HTTP session of the pool thread it runs on, not the
+        one of the client that listed the transcripts. Candidates still pending
+        once one is picked are cancelled.
+        """
+        import logging
+
+        def fetch_candidate(transcript_item, translate: bool) -> Transcript:
+            # youtube_transcript_api keeps the session of a transcript there
+            transcript_item = copy.copy(transcript_item)
+            transcript_item._http_client = self._session()
+            if translate:
+                logging.info(
+                    f"Trying to translate {transcript_item.language_code} transcript to English"
+                )
+                entries = transcript_item.translate("en").fetch().to_raw_data()
+                return Transcript(video_id, "en", True, entries)
+            logging.info(f"Using non-translated {transcript_item.language_code} transcript")
+            entries = transcript_item.fetch().to_raw_data()
+            return Transcript(video_id, transcript_item.language_code, False, entries)
+
+        # At most TRANSCRIPT_FETCH_CONCURRENCY candidates are in flight at once
+        window = max(1, TRANSCRIPT_FETCH_CONCURRENCY)
+        futures: List[Future] = []
+        try:
+            for index, (transcript_item, translate) in enumerate(candidates):
+                while len(futures) < min(index + window, len(candidates)):
+                    futures.append(_fetch_executor.submit(fetch_candidate, *candidates[len(futures)]))
+                try:
+                    return self._wait(futures[index], deadline)
+                except FutureTimeoutError:
+                    raise self._timed_out(video_id)
+                except Exception as e:
+                    action = "translate" if translate else "fetch"
+                    logging.warning(
+                        f"Failed to {action} {transcript_item.language_code} transcript: {str(e)}"
+                    )
+            return None
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+class FixtureTranscriptSource(TranscriptSource):
+    """
+    Transcripts read from local JSON files, one per video: DIR/<video_id>.json.
+
+    A fixture is either a list of transcript entries, or an object with a
+    "transcript" list and optional "language", "title", "description" and
+    "channel".
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _load(self, video_id: str) -> Dict[str, Any]:
+        path = os.path.join(self.directory, f"{video_id}.json")
+        if not os.path.exists(path):
+            raise ValueError(f"No transcript fixture for video {video_id} at {path}")
+        with open(path) as f:
+            fixture = json.load(f)
+        return {"transcript": fixture} if isinstance(fixture, list) else fixture
+
+    def fetch(self, video_id: str) -> Transcript:
+        fixture = self._load(video_id)
+        return Transcript(video_id, fixture.get("language", "en"), False, fixture["transcript"])
+
+    def metadata(self, video_id: str) -> Optional[Dict[str, Optional[str]]]:
+        """Get the metadata of a video from its fixture, or None if it has none."""
+        fixture = self._load(video_id)
+        metadata = {field: fixture.get(field) for field in ("title", "description", "channel")}
+        return metadata if any(metadata.values()) else None
+
+
+class TranscriptCache:
+    """
+    Compressed on-disk cache of transcripts, keyed by video, language and
+    whether they were translated.
+
+    Each transcript is a gzipped JSON file in a directory per video. Reads
+    refresh the modification time of the files, and once the cache grows past
+    max_bytes, the least recently used files are removed until it is back
+    under 90% of the limit. Files are replaced atomically, so the cache can be
+    shared by processes.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _path(self, video_id: str, language: str, translated: bool) -> str:
+        name = f"{language}.translated" if translated else language
+        return os.path.join(self.directory, video_id, f"{name}.json.gz")
+
+    def _read(self, path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+            os.utime(path)
+            return data
+        except (OSError, ValueError):
+            return None
+
+    def get(self, video_id: str, language: str, translated: bool) -> Optional[Transcript]:
+        """Get a cached transcript, or None if it is not cached."""
+        data = self._read(self._path(video_id, language, translated))
+        if data is None:
+            return None
+        return Transcript(video_id, language, translated, data["entries"])
+
+    def find(self, video_id: str) -> Optional[Transcript]:
+        """Get the cached transcript of a video that YouTubeTranscriptSource
+        would pick: English, then translated to English, then any language."""
+        try:
+            names = os.listdir(os.path.join(self.directory, video_id))
+        except OSError:
+            return None
+
+        keys: List[Tuple[str, bool]] = []
+        for name in names:
+            if not name.endswith(".json.gz"):
+                continue
+            language = name[: -len(".json.gz")]
+            translated = language.endswith(".translated")
+            keys.append((language[: -len(".translated")] if translated else language, translated))
+
+        # English first, then translated to English, then the other languages
+        keys.sort(key=lambda key: (key[0] != "en", key[1], key[0]))
+        for language, translated in keys:
+            transcript = self.get(video_id, language, translated)
+            if transcript is not None:
+                return transcript
+        return None
+
+    def put(self, transcript: Transcript) -> None:
+        """Store a transcript, evicting old transcripts if the cache is full."""
+        path = self._path(transcript.video_id, transcript.language, transcript.translated)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump({"video_id": transcript.video_id, "entries": transcript.entries}, f)
+        size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)
+
+        if not self.max_bytes:
+            return
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._files())
+            else:
+                self._size += size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _files(self) -> List[Tuple[float, int, str]]:
+        """List the cached files, with their modification time and size."""
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _evict(self) -> None:
+        """Remove the least recently used transcripts, down to 90% of the limit."""
+        import logging
+
+        # Other processes share the directory, so the actual size is rescanned
+        files = sorted(self._files())
+        self._size = sum(size for _, size, _ in files)
+        target = self.max_bytes * 0.9
+        removed = 0
+        for _, size, path in files:
+            if self._size <= target:
+                break
+            try:
+                os.remove(path)
+                self._size -= size
+                removed += 1
+                os.rmdir(os.path.dirname(path))
+            except OSError:
+                pass  # Directories with other transcripts are kept
+        logging.info(f"Evicted {removed} transcripts from the transcript cache")
+
+    def stats(self) -> Dict[str, int]:
+        files = self._files()
+        return {"files": len(files), "bytes": sum(size for _, size, _ in files)}
+
+
+class CachedTranscriptSource(TranscriptSource):
+    """A transcript source whose transcripts are kept in a TranscriptCache."""
+
+    def __init__(self, source: TranscriptSource, cache: TranscriptCache):
+        self.source = source
+        self.cache = cache
+
+    def fetch(self, video_id: str) -> Transcript:
+        import logging
+
+        transcript = self.cache.find(video_id)
+        count_cache_lookup("transcript", transcript is not None)
+        if transcript is not None:
+            logging.info(f"Using cached {transcript.language} transcript of video {video_id}")
+            return transcript
+
+        transcript = self.source.fetch(video_id)
+        try:
+            self.cache.put(transcript)
+        except OSError as e:
+            logging.warning(f"Could not cache the transcript of video {video_id}: {str(e)}")
+        return transcript
+
+
+_source: Optional[TranscriptSource] = None
+_source_lock = threading.Lock()
+
+
+def create_transcript_source() -> TranscriptSource:
+    """Create the transcript source selected by TRANSCRIPT_SOURCE."""
+    if TRANSCRIPT_SOURCE == "fixtures":
+        return FixtureTranscriptSource(TRANSCRIPT_FIXTURES_DIR)
+    if TRANSCRIPT_SOURCE != "youtube":
+        raise ValueError(f"Unknown TRANSCRIPT_SOURCE: {TRANSCRIPT_SOURCE}")
+
+    source: TranscriptSource = YouTubeTranscriptSource()
+    if TRANSCRIPT_CACHE_DIR:
+        cache = TranscriptCache(TRANSCRIPT_CACHE_DIR, int(TRANSCRIPT_CACHE_MAX_MB * 1024 * 1024))
+        source = CachedTranscriptSource(source, cache)
+    return source
+
+
+def get_transcript_source() -> TranscriptSource:
+    """Get the transcript source of this process, creating it on first use."""
+    global _source
+    if _source is None:
+        with _source_lock:
+            if _source is None:
+                _source = create_transcript_source()
+    return _source
@@ -1,30 +1,235 @@
+import contextvars
+import math
 import os
 import uuid
-from typing import List, Dict, Any, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import AsyncIterator, Callable, List, Dict, Any, Optional, Tuple, Union
 import re
+import threading
+import time
+import unicodedata
 from datetime import datetime
-from sentence_transformers import SentenceTransformer
 from qdrant_client.http import models
-from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_transcript_api.proxies import WebshareProxyConfig
-import yt_dlp
+from qdrant_client.http.exceptions import UnexpectedResponse
 from app.models.video import VideoSegment, Video, SearchResult
-from app.services.qdrant_service import qdrant_client
-
-# Initialize the sentence transformer model
-model = SentenceTransformer("sentence-transformers/static-retrieval-mrl-en-v1", cache_folder="/tmp")
+from app.services.cache import (
+    MISSING,
+    LRUCache,
+    SearchResultCache,
+    SingleFlight,
+    create_cache_backend,
+)
+from app.services.embedding_service import (
+    MODEL_NAME,
+    count_tokens,
+    get_embedding_dimension,
+    get_embeddings,
+    get_embeddings_batch,
+    get_max_seq_length,
+)
+from app.services.executor import run_blocking
+from app.services.metrics import (
+    FETCH_ERRORS,
+    INGEST_SECONDS,
+    SEGMENTS_PER_VIDEO,
+    TRANSCRIPT_FETCH_SECONDS,
+    YOUTUBE_METADATA_SECONDS,
+    timed,
+)
+from app.services.qdrant_service import async_qdrant_client, qdrant_client
+from app.services.segmentation import TranscriptWindower
+from app.services.sparse_encoder import BM25SparseEncoder
+from app.services.tracing import span
+from app.services.transcript_service import get_transcript_source
 
 # Collection names
 COLLECTION_NAME = "video_segments"
 PROCESSED_VIDEOS_COLLECTION = "processed_videos"
+INGEST_LEASES_COLLECTION = "ingest_leases"
+
+# Payload indexes of the collections, by field. Segments are almost always
+# filtered by video, so video_id is a tenant index, which makes Qdrant store
+# the points of each video together. start has a range index for time-window
+# queries and ordering by start time.
+PAYLOAD_INDEXES: Dict[str, Dict[str, Any]] = {
+    COLLECTION_NAME: {
+        "video_id": models.KeywordIndexParams(
+            type=models.KeywordIndexType.KEYWORD,
+            is_tenant=True,
+        ),
+        "start": models.FloatIndexParams(type=models.FloatIndexType.FLOAT),
+    },
+    PROCESSED_VIDEOS_COLLECTION: {
+        "video_id": models.KeywordIndexParams(type=models.KeywordIndexType.KEYWORD),
+        "created_at": models.IntegerIndexParams(
+            type=models.IntegerIndexType.INTEGER,
+            range=True,
+        ),
+    },
+}
+
+# Namespace of the deterministic point IDs, so re-ingesting a video overwrites its points
+POINT_ID_NAMESPACE = uuid.UUID("6f0b5c8e-3b1d-4f7a-9c2e-5d8a1e4b7c90")
+
+# Ingest lease configuration (in seconds). A lease left by a crashed worker
+# expires after its TTL, and waiting workers check the lease every poll interval.
+INGEST_LEASE_TTL = float(os.getenv("INGEST_LEASE_TTL", "900"))
+INGEST_LEASE_POLL_INTERVAL = float(os.getenv("INGEST_LEASE_POLL_INTERVAL", "2"))
+
+# Ingestion batching configuration
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "256"))
+UPSERT_PARALLEL = int(os.getenv("UPSERT_PARALLEL", "1"))
+
+# Transcript segmentation configuration (in seconds). The stride defaults to
+# the window length minus the overlap. SEGMENT_MAX_TOKENS caps the tokens per
+# segment: 0 disables the cap and "model" uses the model's max sequence length.
+SEGMENT_WINDOW_SECONDS = float(os.getenv("SEGMENT_WINDOW_SECONDS", "30"))
+SEGMENT_OVERLAP_SECONDS = float(os.getenv("SEGMENT_OVERLAP_SECONDS", "10"))
+SEGMENT_STRIDE_SECONDS = (
+    float(os.getenv("SEGMENT_STRIDE_SECONDS"))
+    if os.getenv("SEGMENT_STRIDE_SECONDS")
+    else None
+)
+SEGMENT_MAX_TOKENS = os.getenv("SEGMENT_MAX_TOKENS", "0")
+
+# Number of segments read from Qdrant per page when listing the segments of a video
+SEGMENT_PAGE_SIZE = int(os.getenv("SEGMENT_PAGE_SIZE", "200"))
+# Upper bound on the segments of a video sharing the same start time
+MAX_TIED_SEGMENTS = 10000
+
+# Matryoshka (MRL) configuration. The embedding model is MRL-trained, so the
+# first dimensions of its embeddings are an embedding on their own. With
+# MRL_DIMENSION set (e.g. 64, 128 or 256), new segment collections store a
+# truncated vector next to the full one. Searches prefetch MRL_OVERSAMPLING
+# times more candidates on the short vector, which is kept in RAM, and rescore
+# them on the full vector, kept on disk unless MRL_FULL_VECTOR_ON_DISK is off.
+# 0 keeps a single full-dimension vector.
+MRL_DIMENSION = int(os.getenv("MRL_DIMENSION", "0"))
+MRL_OVERSAMPLING = float(os.getenv("MRL_OVERSAMPLING", "4"))
+MRL_FULL_VECTOR_ON_DISK = os.getenv("MRL_FULL_VECTOR_ON_DISK", "true").lower() == "true"
+
+# Named vectors of segment collections created with MRL
+FULL_VECTOR_NAME = "full"
+MRL_VECTOR_NAME = "mrl"
+
+# Hybrid search configuration. With SPARSE_VECTORS on, new segment collections
+# store a BM25 sparse vector next to the dense ones, computed locally. SEARCH_MODE
+# is the default search mode: "hybrid" fuses dense and lexical results with
+# reciprocal rank fusion (RRF), "dense" only uses the embeddings, and "lexical"
+# only the sparse vectors, without running the embedding model. Each branch of
+# a hybrid search prefetches HYBRID_OVERSAMPLING times the limit.
+SPARSE_VECTORS = os.getenv("SPARSE_VECTORS", "true").lower() == "true"
+SEARCH_MODE = os.getenv("SEARCH_MODE", "hybrid")
+HYBRID_OVERSAMPLING = float(os.getenv("HYBRID_OVERSAMPLING", "4"))
+SEARCH_MODES = ("hybrid", "dense", "lexical")
+
+# Sparse vector of segment collections created with SPARSE_VECTORS
+SPARSE_VECTOR_NAME = "bm25"
+
+# Vector quantization of the segments collection: "none", "scalar" (int8, 4x
+# smaller) or "binary" (32x smaller). Quantized vectors are kept in RAM and
+# the original vectors move to disk, where they are only read for rescoring.
+# Existing collections are updated with: python -m app.migrations.quantization
+QUANTIZATION = os.getenv("QUANTIZATION", "none")
+SCALAR_QUANTIZATION_QUANTILE = float(os.getenv("SCALAR_QUANTIZATION_QUANTILE", "0.99"))
+
+# Default search parameters, each of which can be overridden per request.
+# SEARCH_HNSW_EF of 0 uses the collection's default. Oversampling and
+# rescoring only apply to quantized collections, and exact search skips the
+# index entirely.
+SEARCH_HNSW_EF = int(os.getenv("SEARCH_HNSW_EF", "0"))
+SEARCH_OVERSAMPLING = float(os.getenv("SEARCH_OVERSAMPLING", "2"))
+SEARCH_RESCORE = os.getenv("SEARCH_RESCORE", "true").lower() == "true"
+SEARCH_EXACT = os.getenv("SEARCH_EXACT", "false").lower() == "true"
+
+# Maximum number of queries of a single batch search request
+SEARCH_BATCH_MAX_QUERIES = int(os.getenv("SEARCH_BATCH_MAX_QUERIES", "100"))
+
+# Query embedding cache configuration (TTL in seconds, 0 disables expiry)
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))
+QUERY_EMBEDDING_CACHE_TTL = float(os.getenv("QUERY_EMBEDDING_CACHE_TTL", "3600"))
+
+query_embedding_cache = LRUCache(
+    max_size=QUERY_EMBEDDING_CACHE_SIZE, ttl=QUERY_EMBEDDING_CACHE_TTL, name="query_embedding"
+)
+
+# Search result cache configuration: "memory" (per process), "redis" (shared
+# by all workers, requires the redis package) or "none". Ingesting a video
+# invalidates the cached searches through generation counters. With the
+# memory backend, they are shared by the workers of a node through files in
+# SEARCH_CACHE_GENERATIONS_DIR; without it, or on other nodes, stale results
+# are served for up to SEARCH_CACHE_TTL seconds after an ingestion, so use
+# the redis backend for deployments of several nodes.
+SEARCH_CACHE_BACKEND = os.getenv("SEARCH_CACHE_BACKEND", "memory")
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "2048"))
+SEARCH_CACHE_MAX_MB = float(os.getenv("SEARCH_CACHE_MAX_MB", "64"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "60"))
+SEARCH_CACHE_GENERATIONS_DIR = os.getenv(
+    "SEARCH_CACHE_GENERATIONS_DIR", "/tmp/search-cache-generations"
+)
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Video metadata cache configuration (TTLs in seconds). Failed or unknown
+# lookups are cached for the shorter negative TTL.
+METADATA_CACHE_SIZE = int(os.getenv("METADATA_CACHE_SIZE", "4096"))
+METADATA_CACHE_TTL = float(os.getenv("METADATA_CACHE_TTL", "86400"))
+METADATA_NEGATIVE_CACHE_TTL = float(os.getenv("METADATA_NEGATIVE_CACHE_TTL", "300"))
+# Video metadata is fetched while the transcript is, on a bounded executor.
+# Past the timeout (seconds, 0 for none), ingestion goes on without it.
+METADATA_FETCH_TIMEOUT = float(os.getenv("METADATA_FETCH_TIMEOUT", "20"))
+METADATA_FETCH_WORKERS = int(os.getenv("METADATA_FETCH_WORKERS", "8"))
+
+# Recently processed videos cache (TTL in seconds). Ingests and metadata
+# updates invalidate it in their own process, and the TTL bounds how long
+# other workers can serve a stale list.
+RECENT_VIDEOS_CACHE_TTL = float(os.getenv("RECENT_VIDEOS_CACHE_TTL", "30"))
+
+sparse_encoder = BM25SparseEncoder()
+
+metadata_cache = LRUCache(
+    max_size=METADATA_CACHE_SIZE, ttl=METADATA_CACHE_TTL, name="metadata"
+)
+recent_videos_cache = LRUCache(max_size=64, ttl=RECENT_VIDEOS_CACHE_TTL, name="recent_videos")
+_metadata_flight = SingleFlight()
+_metadata_executor = ThreadPoolExecutor(
+    max_workers=METADATA_FETCH_WORKERS, thread_name_prefix="metadata-fetch"
+)
+
+
+def _search_results_size(results: List[SearchResult]) -> int:
+    """Estimate the memory taken by cached search results, in bytes."""
+    # The strings of every result, plus the overhead of its objects
+    return sum(
+        len(result.segment.text) + len(result.segment.segment_id) + 600 for result in results
+    )
 
 
-def _fetch_youtube_metadata(video_id: str, video: Optional[Video] = None) -> Video:
-    """Helper function to fetch video metadata from YouTube using yt-dlp."""
+search_result_cache = (
+    SearchResultCache(
+        create_cache_backend(
+            SEARCH_CACHE_BACKEND,
+            max_size=SEARCH_CACHE_SIZE,
+            ttl=SEARCH_CACHE_TTL,
+            url=REDIS_URL,
+            max_bytes=int(SEARCH_CACHE_MAX_MB * 1024 * 1024),
+            sizeof=_search_results_size,
+            generations_dir=SEARCH_CACHE_GENERATIONS_DIR,
+        ),
+        MODEL_NAME,
+    )
+    if SEARCH_CACHE_BACKEND != "none"
+    else None
+)
+
+
+def _download_youtube_metadata(video_id: str) -> Optional[Dict[str, Optional[str]]]:
+    """Fetch video metadata from YouTube using yt-dlp. Returns None if it fails."""
     import logging
 
-    if not video:
-        video = Video(video_id=video_id)
+    # yt-dlp takes long to import, so workers only load it when they need it
+    import yt_dlp
 
     try:
         logging.info(f"Fetching metadata for video {video_id} from YouTube")
@@ -36,35 +241,595 @@ def _fetch_youtube_metadata(video_id: str, video: Optional[Video] = None) -> Vid
             "no_warnings": True,  # Don't print warnings
             "extract_flat": True,  # Don't extract videos in playlists
             "format": "best",  # Best quality (doesn't matter since we're not downloading)
+            "socket_timeout": METADATA_FETCH_TIMEOUT or None,  # Don't hang on a stalled connection
         }
 
         # Use yt-dlp to extract video info
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        with timed(YOUTUBE_METADATA_SECONDS), yt_dlp.YoutubeDL(ydl_opts) as ydl:
             info = ydl.extract_info(
                 f"https://www.youtube.com/watch?v={video_id}", download=False
             )
 
-            # Set video properties if available
-            if info.get("title"):
-                video.title = info.get("title")
-
-            if info.get("description"):
-                video.description = info.get("description")
-
-            if info.get("uploader"):
-                video.channel = info.get("uploader")
-
+        metadata = {
+            "title": info.get("title") or None,
+            "description": info.get("description") or None,
+            "channel": info.get("uploader") or None,
+        }
         logging.info(
-            f"Successfully retrieved video metadata: title='{video.title}', channel='{video.channel}'"
+            f"Successfully retrieved video metadata: title='{metadata['title']}', channel='{metadata['channel']}'"
         )
+        return metadata
     except Exception as meta_error:
+        FETCH_ERRORS.labels(source="metadata").inc()
         logging.warning(f"Could not fetch metadata from YouTube: {str(meta_error)}")
-        if not video.title:
-            video.title = f"Video {video_id}"
+        return None
+
+
+def _load_youtube_metadata(video_id: str) -> Optional[Dict[str, Optional[str]]]:
+    """Fetch video metadata from YouTube and cache the outcome, even a failure."""
+    metadata = _download_youtube_metadata(video_id)
+    metadata_cache.set(
+        video_id,
+        metadata,
+        ttl=METADATA_CACHE_TTL if metadata else METADATA_NEGATIVE_CACHE_TTL,
+    )
+    return metadata
 
+
+def get_youtube_metadata(video_id: str) -> Optional[Dict[str, Optional[str]]]:
+    """
+    Get video metadata from YouTube, or None if it could not be fetched.
+
+    Results are cached, failures for a shorter time, and concurrent lookups
+    of the same video share a single fetch.
+    """
+    metadata = metadata_cache.get(video_id)
+    if metadata is MISSING:
+        metadata = _metadata_flight.do(video_id, _load_youtube_metadata, video_id)
+    return metadata
+
+
+def _apply_youtube_metadata(
+    video: Video, metadata: Optional[Dict[str, Optional[str]]]
+) -> Video:
+    """Set the fetched metadata on a video, with a placeholder title as fallback."""
+    if metadata:
+        # Set video properties if available
+        if metadata.get("title"):
+            video.title = metadata["title"]
+        if metadata.get("description"):
+            video.description = metadata["description"]
+        if metadata.get("channel"):
+            video.channel = metadata["channel"]
+    elif not video.title:
+        video.title = f"Video {video.video_id}"
     return video
 
 
+def _fetch_youtube_metadata(video_id: str, video: Optional[Video] = None) -> Video:
+    """Helper function to fetch video metadata from YouTube using yt-dlp."""
+    if not video:
+        video = Video(video_id=video_id)
+    return _apply_youtube_metadata(video, get_youtube_metadata(video_id))
+
+
+def _has_title(video: Video) -> bool:
+    """Check if a video has a real title rather than a placeholder."""
+    return bool(video.title) and video.title != f"Video {video.video_id}"
+
+
+def _metadata_payload(video: Video) -> Dict[str, Any]:
+    """Get the metadata fields of a video to write back into the registry."""
+    return {
+        "title": video.title,
+        "description": video.description,
+        "channel": video.channel,
+    }
+
+
+def _write_back_metadata(video: Video) -> None:
+    """Store fetched metadata of a processed video in the registry."""
+    import logging
+
+    try:
+        qdrant_client.set_payload(
+            collection_name=PROCESSED_VIDEOS_COLLECTION,
+            payload=_metadata_payload(video),
+            points=_video_id_filter(video.video_id),
+        )
+        invalidate_recent_videos()
+    except Exception as e:
+        logging.warning(f"Could not write back metadata of video {video.video_id}: {str(e)}")
+
+
+async def _async_write_back_metadata(video: Video) -> None:
+    """Store fetched metadata of a processed video in the registry without blocking."""
+    import logging
+
+    try:
+        await async_qdrant_client.set_payload(
+            collection_name=PROCESSED_VIDEOS_COLLECTION,
+            payload=_metadata_payload(video),
+            points=_video_id_filter(video.video_id),
+        )
+        invalidate_recent_videos()
+    except Exception as e:
+        logging.warning(f"Could not write back metadata of video {video.video_id}: {str(e)}")
+
+
+def segment_point_id(segment_id: str) -> str:
+    """Get the deterministic point ID of a video segment."""
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, f"segment:{segment_id}"))
+
+
+def video_point_id(video_id: str) -> str:
+    """Get the deterministic point ID of a processed video."""
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, f"video:{video_id}"))
+
+
+def _lease_point_id(video_id: str) -> str:
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, f"lease:{video_id}"))
+
+
+def _read_ingest_lease(video_id: str) -> Optional[Dict[str, Any]]:
+    """Get the current lease on a video, or None if there is no live lease."""
+    points = qdrant_client.retrieve(
+        collection_name=INGEST_LEASES_COLLECTION,
+        ids=[_lease_point_id(video_id)],
+        with_payload=True,
+    )
+    if not points or points[0].payload.get("expires_at", 0) <= datetime.utcnow().timestamp():
+        return None
+    return points[0].payload
+
+
+def acquire_ingest_lease(video_id: str, ttl: float = INGEST_LEASE_TTL) -> Optional[str]:
+    """
+    Try to take the lease on ingesting a video, shared by all workers through Qdrant.
+
+    The lease is written only if no live lease exists and then read back, so
+    the last writer wins. This is not a strict lock, since Qdrant offers no
+    compare-and-set, but it makes concurrent ingestion of a video very unlikely,
+    and deterministic point IDs keep it harmless when it happens.
+
+    Returns:
+        Optional[str]: The lease token, or None if another worker holds the lease
+    """
+    if _read_ingest_lease(video_id) is not None:
+        return None
+
+    token = uuid.uuid4().hex
+    qdrant_client.upsert(
+        collection_name=INGEST_LEASES_COLLECTION,
+        points=[
+            models.PointStruct(
+                id=_lease_point_id(video_id),
+                vector=[1.0],
+                payload={
+                    "video_id": video_id,
+                    "owner": token,
+                    "expires_at": datetime.utcnow().timestamp() + ttl,
+                },
+            ),
+        ],
+        wait=True,
+    )
+
+    lease = _read_ingest_lease(video_id)
+    if lease is None or lease.get("owner") != token:
+        return None
+    return token
+
+
+def release_ingest_lease(video_id: str, token: str) -> None:
+    """Release the lease on a video if it is still held with the given token."""
+    import logging
+
+    try:
+        lease = _read_ingest_lease(video_id)
+        if lease is not None and lease.get("owner") == token:
+            qdrant_client.delete(
+                collection_name=INGEST_LEASES_COLLECTION,
+                points_selector=models.PointIdsList(points=[_lease_point_id(video_id)]),
+            )
+    except Exception as e:
+        logging.warning(f"Could not release ingest lease of video {video_id}: {str(e)}")
+
+
+def _acquire_or_wait_for_ingest_lease(
+    video_id: str, report: Callable[[str, float], None]
+) -> Tuple[Optional[str], Optional[Video]]:
+    """
+    Take the lease on ingesting a video, or wait for the worker holding it.
+
+    Returns:
+        Tuple of the lease token, or the video ingested by another worker
+    """
+    import logging
+
+    while True:
+        token = acquire_ingest_lease(video_id)
+        if token is not None:
+            # Another worker may have finished the video right before we took the lease
+            video = find_processed_video(video_id)
+            if video is not None:
+                release_ingest_lease(video_id, token)
+                return None, video
+            return token, None
+
+        logging.info(f"Video {video_id} is being ingested by another worker, waiting")
+        report("waiting", 0)
+        while _read_ingest_lease(video_id) is not None:
+            time.sleep(INGEST_LEASE_POLL_INTERVAL)
+
+        # The other worker finished, either with the video or with an error
+        video = find_processed_video(video_id)
+        if video is not None:
+            return None, video
+
+
+def _delete_stale_segments(video_id: str, keep_point_ids: List[str]) -> None:
+    """Delete the segments of a video except the ones with the given point IDs."""
+    import logging
+
+    try:
+        qdrant_client.delete(
+            collection_name=COLLECTION_NAME,
+            points_selector=models.FilterSelector(
+                filter=models.Filter(
+                    must=_video_id_filter(video_id).must,
+                    must_not=[models.HasIdCondition(has_id=keep_point_ids)],
+                )
+            ),
+        )
+    except Exception as e:
+        logging.warning(f"Could not delete stale segments of video {video_id}: {str(e)}")
+
+
+def _segment_vectors_config(
+    vector_size: int,
+) -> Union[models.VectorParams, Dict[str, models.VectorParams]]:
+    """Build the dense vectors configuration of a new segments collection."""
+    import logging
+
+    # Quantized collections search the in-RAM quantized vectors, so the
+    # originals can live on disk
+    on_disk = quantization_config() is not None
+
+    use_mrl = bool(MRL_DIMENSION)
+    if use_mrl and MRL_DIMENSION >= vector_size:
+        logging.warning(
+            f"MRL_DIMENSION {MRL_DIMENSION} is not below the vector size {vector_size}, "
+            "storing full-dimension vectors only"
+        )
+        use_mrl = False
+
+    full = models.VectorParams(
+        size=vector_size,
+        distance=models.Distance.COSINE,
+        on_disk=on_disk or (use_mrl and MRL_FULL_VECTOR_ON_DISK),
+    )
+    if not use_mrl and not SPARSE_VECTORS:
+        return full
+
+    vectors = {FULL_VECTOR_NAME: full}
+    if use_mrl:
+        vectors[MRL_VECTOR_NAME] = models.VectorParams(
+            size=MRL_DIMENSION,
+            distance=models.Distance.COSINE,
+            on_disk=on_disk,
+        )
+    return vectors
+
+
+def _segment_sparse_vectors_config() -> Optional[Dict[str, models.SparseVectorParams]]:
+    """Build the sparse vectors configuration of a new segments collection.
+    The IDF modifier makes Qdrant weight the BM25 term frequencies by IDF."""
+    if not SPARSE_VECTORS:
+        return None
+    return {SPARSE_VECTOR_NAME: models.SparseVectorParams(modifier=models.Modifier.IDF)}
+
+
+def quantization_config(
+    quantization: Optional[str] = None,
+) -> Optional[models.QuantizationConfig]:
+    """Build the quantization configuration of the segments collection, or
+    None if it is not quantized. Defaults to the QUANTIZATION setting."""
+    quantization = quantization or QUANTIZATION
+    if quantization == "none":
+        return None
+    if quantization == "scalar":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=SCALAR_QUANTIZATION_QUANTILE,
+                always_ram=True,
+            )
+        )
+    if quantization == "binary":
+        return models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(always_ram=True)
+        )
+    raise ValueError(f"Unknown quantization: {quantization}")
+
+
+# Vector sizes of the segments collection by name, read from Qdrant on first use
+# and again after SEGMENT_LAYOUT_TTL seconds, so workers pick up a collection
+# switched by a migration. The single vector of older collections is keyed by
+# "", and sparse vectors have a size of 0.
+SEGMENT_LAYOUT_TTL = float(os.getenv("SEGMENT_LAYOUT_TTL", "60"))
+_segment_vectors: Optional[Dict[str, int]] = None
+_segment_vectors_expire_at = 0.0
+_segment_vectors_lock = threading.Lock()
+
+
+def read_segment_vectors(collection_name: str) -> Dict[str, int]:
+    """Read the vector sizes of a segments collection from Qdrant, by name."""
+    collection_params = qdrant_client.get_collection(collection_name).config.params
+    vectors = collection_params.vectors
+    if isinstance(vectors, dict):
+        layout = {name: params.size for name, params in vectors.items()}
+    else:
+        layout = {"": vectors.size}
+    for name in collection_params.sparse_vectors or {}:
+        layout[name] = 0
+    return layout
+
+
+def segment_vectors_loaded() -> bool:
+    """Check whether the segments collection layout is cached and fresh."""
+    return _segment_vectors is not None and time.monotonic() < _segment_vectors_expire_at
+
+
+def get_segment_vectors() -> Dict[str, int]:
+    """
+    Get the vectors of the segments collection as it exists in Qdrant.
+
+    Points are written and searched according to the collection rather than
+    the MRL configuration, so collections created before MRL_DIMENSION was
+    changed keep working until they are migrated.
+    """
+    import logging
+
+    global _segment_vectors, _segment_vectors_expire_at
+    if not segment_vectors_loaded():
+        with _segment_vectors_lock:
+            if not segment_vectors_loaded():
+                layout = read_segment_vectors(COLLECTION_NAME)
+
+                configured = MRL_DIMENSION or None
+                if layout != _segment_vectors and layout.get(MRL_VECTOR_NAME) != configured:
+                    logging.warning(
+                        f"Collection {COLLECTION_NAME} has MRL dimension "
+                        f"{layout.get(MRL_VECTOR_NAME)}, but MRL_DIMENSION is "
+                        f"{configured}; using the collection layout"
+                    )
+                _segment_vectors = layout
+                _segment_vectors_expire_at = time.monotonic() + SEGMENT_LAYOUT_TTL
+    return _segment_vectors
+
+
+def reset_segment_vectors() -> None:
+    """Forget the cached segments collection layout, after it was (re)created."""
+    global _segment_vectors
+    with _segment_vectors_lock:
+        _segment_vectors = None
+
+
+def _segment_point_vector(
+    vector: List[float],
+    sparse_vector: Optional[models.SparseVector] = None,
+    layout: Optional[Dict[str, int]] = None,
+) -> Union[List[float], Dict[str, Any]]:
+    """Build the vectors of a segment point from its full-dimension embedding
+    and its BM25 sparse vector, for the given collection layout (defaults to
+    the segments collection)."""
+    layout = layout or get_segment_vectors()
+    if "" in layout:
+        return vector
+
+    vectors: Dict[str, Any] = {FULL_VECTOR_NAME: vector}
+    if MRL_VECTOR_NAME in layout:
+        vectors[MRL_VECTOR_NAME] = vector[: layout[MRL_VECTOR_NAME]]
+    if SPARSE_VECTOR_NAME in layout and sparse_vector is not None:
+        vectors[SPARSE_VECTOR_NAME] = sparse_vector
+    return vectors
+
+
+def resolve_search_params(
+    hnsw_ef: Optional[int] = None,
+    oversampling: Optional[float] = None,
+    rescore: Optional[bool] = None,
+    exact: Optional[bool] = None,
+    mode: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Fill in the search parameters that were not given from the configuration.
+
+    Collections without sparse vectors only support dense search, so the
+    other modes fall back to it.
+    """
+    mode = mode or SEARCH_MODE
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode: {mode}")
+    if mode != "dense" and SPARSE_VECTOR_NAME not in get_segment_vectors():
+        mode = "dense"
+
+    return {
+        "hnsw_ef": hnsw_ef if hnsw_ef is not None else SEARCH_HNSW_EF or None,
+        "oversampling": oversampling if oversampling is not None else SEARCH_OVERSAMPLING,
+        "rescore": rescore if rescore is not None else SEARCH_RESCORE,
+        "exact": exact if exact is not None else SEARCH_EXACT,
+        "mode": mode,
+    }
+
+
+def _search_params(params: Dict[str, Any]) -> models.SearchParams:
+    """Convert resolved search parameters into Qdrant search params."""
+    return models.SearchParams(
+        hnsw_ef=params["hnsw_ef"],
+        exact=params["exact"],
+        quantization=models.QuantizationSearchParams(
+            rescore=params["rescore"],
+            oversampling=params["oversampling"],
+        ),
+    )
+
+
+def _dense_prefetch(
+    query_vector: List[float],
+    query_filter: Optional[models.Filter],
+    search_params: models.SearchParams,
+    limit: int,
+) -> models.Prefetch:
+    """
+    Build the dense search of a segment query.
+
+    With an MRL vector, candidates are prefetched on the truncated query
+    vector and rescored with the full one.
+    """
+    layout = get_segment_vectors()
+    if MRL_VECTOR_NAME not in layout:
+        return models.Prefetch(
+            query=query_vector,
+            using=None if "" in layout else FULL_VECTOR_NAME,
+            filter=query_filter,
+            params=search_params,
+            limit=limit,
+        )
+
+    return models.Prefetch(
+        prefetch=models.Prefetch(
+            query=query_vector[: layout[MRL_VECTOR_NAME]],
+            using=MRL_VECTOR_NAME,
+            filter=query_filter,
+            params=search_params,
+            limit=max(limit, int(limit * MRL_OVERSAMPLING)),
+        ),
+        query=query_vector,
+        using=FULL_VECTOR_NAME,
+        filter=query_filter,
+        params=search_params,
+        limit=limit,
+    )
+
+
+def _sparse_prefetch(
+    sparse_vector: models.SparseVector, query_filter: Optional[models.Filter], limit: int
+) -> models.Prefetch:
+    """Build the lexical search of a segment query."""
+    return models.Prefetch(
+        query=sparse_vector,
+        using=SPARSE_VECTOR_NAME,
+        filter=query_filter,
+        limit=limit,
+    )
+
+
+def _segment_query(
+    query_vector: Optional[List[float]],
+    sparse_vector: Optional[models.SparseVector],
+    video_id: Optional[str],
+    limit: int,
+    params: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Build the Query API arguments of a segment search, for a single request.
+
+    With both a dense and a sparse query vector, each of them prefetches
+    candidates, which are fused with reciprocal rank fusion. Otherwise the
+    search only uses the given one.
+    """
+    query_filter = _video_id_filter(video_id)
+    search_params = _search_params(params or resolve_search_params(mode="dense"))
+
+    if query_vector is not None and sparse_vector is not None:
+        candidates = max(limit, int(limit * HYBRID_OVERSAMPLING))
+        return {
+            "prefetch": [
+                _dense_prefetch(query_vector, query_filter, search_params, candidates),
+                _sparse_prefetch(sparse_vector, query_filter, candidates),
+            ],
+            "query": models.FusionQuery(fusion=models.Fusion.RRF),
+            "limit": limit,
+        }
+
+    if query_vector is not None:
+        search = _dense_prefetch(query_vector, query_filter, search_params, limit)
+    else:
+        search = _sparse_prefetch(sparse_vector, query_filter, limit)
+    return {
+        "prefetch": search.prefetch,
+        "query": search.query,
+        "using": search.using,
+        "query_filter": search.filter,
+        "search_params": search.params,
+        "limit": limit,
+    }
+
+
+def _segment_query_request(
+    query_vector: Optional[List[float]],
+    sparse_vector: Optional[models.SparseVector],
+    video_id: Optional[str],
+    limit: int,
+    params: Dict[str, Any],
+) -> models.QueryRequest:
+    """Build a segment search as one of the requests of a batch query."""
+    query = _segment_query(query_vector, sparse_vector, video_id, limit, params)
+    return models.QueryRequest(
+        prefetch=query["prefetch"],
+        query=query["query"],
+        using=query.get("using"),
+        filter=query.get("query_filter"),
+        params=query.get("search_params"),
+        limit=limit,
+        with_payload=True,
+    )
+
+
+def create_payload_indexes(
+    collection_name: str, fields: Optional[List[str]] = None, schema: Optional[str] = None
+) -> None:
+    """Create the payload indexes of a collection, or only those of the given
+    fields. Versioned collections take the indexes of the schema they implement."""
+    for field_name, field_schema in PAYLOAD_INDEXES.get(schema or collection_name, {}).items():
+        if fields is None or field_name in fields:
+            qdrant_client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=field_schema,
+            )
+
+
+def existing_collection_names() -> List[str]:
+    """Get the names of the collections, and of the aliases pointing to them."""
+    names = [collection.name for collection in qdrant_client.get_collections().collections]
+    names.extend(alias.alias_name for alias in qdrant_client.get_aliases().aliases)
+    return names
+
+
+def resolve_collection_name(name: str) -> str:
+    """Get the collection an alias points to, or the name itself if it is not an alias."""
+    for alias in qdrant_client.get_aliases().aliases:
+        if alias.alias_name == name:
+            return alias.collection_name
+    return name
+
+
+def create_segments_collection(collection_name: str = COLLECTION_NAME) -> None:
+    """Create a segments collection with the configured vectors, quantization
+    and payload indexes. Migrations create versioned ones under other names."""
+    vector_size = get_embedding_dimension()
+    qdrant_client.create_collection(
+        collection_name=collection_name,
+        vectors_config=_segment_vectors_config(vector_size),
+        sparse_vectors_config=_segment_sparse_vectors_config(),
+        quantization_config=quantization_config(),
+    )
+    create_payload_indexes(collection_name, schema=COLLECTION_NAME)
+
+
 # Ensure collections exist
 def ensure_collection_exists():
     """Ensure the required collections exist in Qdrant."""
@@ -72,51 +837,35 @@ def ensure_collection_exists():
 
     try:
         logging.info("Checking Qdrant collections")
-        collections = qdrant_client.get_collections().collections
-        collection_names = [collection.name for collection in collections]
+        collection_names = existing_collection_names()
         logging.info(f"Existing collections: {collection_names}")
 
-        # Create video segments collection if it doesn't exist
+        # Create video segments collection if it doesn't exist. It is an
+        # alias to a versioned collection once it has been migrated.
         if COLLECTION_NAME not in collection_names:
             logging.info(f"Creating collection: {COLLECTION_NAME}")
-            vector_size = model.get_sentence_embedding_dimension()
-            qdrant_client.create_collection(
-                collection_name=COLLECTION_NAME,
-                vectors_config=models.VectorParams(
-                    size=vector_size,
-                    distance=models.Distance.COSINE,
-                ),
-            )
-            logging.info(
-                f"Successfully created {COLLECTION_NAME} collection with vector size {vector_size}"
-            )
+            create_segments_collection()
+            reset_segment_vectors()
+            logging.info(f"Successfully created {COLLECTION_NAME} collection")
 
         # Create processed videos collection if it doesn't exist
         if PROCESSED_VIDEOS_COLLECTION not in collection_names:
             logging.info(f"Creating collection: {PROCESSED_VIDEOS_COLLECTION}")
-            vector_size = model.get_sentence_embedding_dimension()
+            # The registry is only read by ID and creation time, so its points have no vectors
             qdrant_client.create_collection(
                 collection_name=PROCESSED_VIDEOS_COLLECTION,
-                vectors_config=models.VectorParams(
-                    size=vector_size,
-                    distance=models.Distance.COSINE,
-                ),
-            )
-            qdrant_client.create_payload_index(
-                collection_name=PROCESSED_VIDEOS_COLLECTION,
-                field_name="video_id",
-                field_schema=models.PayloadSchemaType.KEYWORD,
-            )
-            qdrant_client.create_payload_index(
-                collection_name=PROCESSED_VIDEOS_COLLECTION,
-                field_name="created_at",
-                field_schema=models.IntegerIndexParams(
-                    type=models.IntegerIndexType.INTEGER,
-                    range=True,
-                ),
+                vectors_config={},
             )
-            logging.info(
-                f"Successfully created {PROCESSED_VIDEOS_COLLECTION} collection with vector size {vector_size}"
+            create_payload_indexes(PROCESSED_VIDEOS_COLLECTION)
+            reset_registry_vector()
+            logging.info(f"Successfully created {PROCESSED_VIDEOS_COLLECTION} collection")
+
+        # Create ingest leases collection if it doesn't exist
+        if INGEST_LEASES_COLLECTION not in collection_names:
+            logging.info(f"Creating collection: {INGEST_LEASES_COLLECTION}")
+            qdrant_client.create_collection(
+                collection_name=INGEST_LEASES_COLLECTION,
+                vectors_config=models.VectorParams(size=1, distance=models.Distance.DOT),
             )
     except Exception as e:
         import traceback
@@ -126,9 +875,54 @@ def ensure_collection_exists():
         raise
 
 
-def get_embeddings(text: str) -> List[float]:
-    """Get embeddings for the given text using SentenceTransformer."""
-    return model.encode(text).tolist()
+def normalize_query(query: str) -> str:
+    """Normalize a search query so equivalent spellings share cache entries."""
+    return " ".join(unicodedata.normalize("NFKC", query).split())
+
+
+def _encode_query(normalized_query: str) -> List[float]:
+    """Encode a normalized search query and cache its embeddings."""
+    vector = get_embeddings(normalized_query)
+    query_embedding_cache.set((MODEL_NAME, normalized_query), vector)
+    return vector
+
+
+def get_query_embedding(query: str) -> List[float]:
+    """Get embeddings for a search query, reusing cached results when possible."""
+    normalized = normalize_query(query)
+    vector = query_embedding_cache.get((MODEL_NAME, normalized))
+    if vector is MISSING:
+        vector = _encode_query(normalized)
+    return vector
+
+
+def _encode_queries(normalized_queries: List[str]) -> List[List[float]]:
+    """Encode normalized search queries with a single model call and cache their embeddings."""
+    vectors = get_embeddings_batch(normalized_queries, batch_size=EMBEDDING_BATCH_SIZE)
+    for normalized, vector in zip(normalized_queries, vectors):
+        query_embedding_cache.set((MODEL_NAME, normalized), vector)
+    return vectors
+
+
+def _cached_query_embeddings(normalized_queries: List[str]) -> Dict[str, List[float]]:
+    """Get the cached embeddings of the given normalized queries, by query."""
+    vectors = {}
+    for normalized in normalized_queries:
+        vector = query_embedding_cache.get((MODEL_NAME, normalized))
+        if vector is not MISSING:
+            vectors[normalized] = vector
+    return vectors
+
+
+def get_query_embeddings(queries: List[str]) -> List[List[float]]:
+    """Get embeddings for many search queries. Cached queries are reused, and
+    the others are encoded together, each distinct query once."""
+    normalized = [normalize_query(query) for query in queries]
+    vectors = _cached_query_embeddings(normalized)
+    missing = [query for query in dict.fromkeys(normalized) if query not in vectors]
+    if missing:
+        vectors.update(zip(missing, _encode_queries(missing)))
+    return [vectors[query] for query in normalized]
 
 
 def extract_video_id(youtube_url: str) -> str:
@@ -167,145 +961,246 @@ def get_video_transcript(video_id: str) -> List[Dict[str, Any]]:
     1. English transcript (if available)
     2. Any available transcript translated to English (if translatable)
     3. Any available transcript in its original language
+
+    Transcripts come from the configured source (see transcript_service), and
+    fetched ones are served from the on-disk transcript cache afterwards.
     """
     import logging
     import traceback
 
     try:
-        # Try to get available transcript languages
-        webshare_username = os.environ.get("WEBSHARE_USERNAME")
-        webshare_password = os.environ.get("WEBSHARE_PASSWORD")
-        if webshare_username and webshare_password:
-            yt_transcript_api = YouTubeTranscriptApi(
-                proxy_config=WebshareProxyConfig(
-                    proxy_username=webshare_username,
-                    proxy_password=webshare_password,
-                )
-            )
-        else:
-            yt_transcript_api = YouTubeTranscriptApi()
-        transcript_list = yt_transcript_api.list(video_id)
-
-        # First, look for English transcript
-        english_transcript = None
-        other_transcripts = []
-
-        # Categorize available transcripts
-        for transcript_item in transcript_list:
-            if transcript_item.language_code == "en":
-                english_transcript = transcript_item
-            else:
-                other_transcripts.append(transcript_item)
-
-        # 1. Try English first if available
-        if english_transcript:
-            try:
-                logging.info("Found English transcript, using it directly")
-                return english_transcript.fetch()
-            except Exception as e:
-                logging.warning(f"Failed to fetch English transcript: {str(e)}")
-
-        # 2. Try translatable transcripts
-        translatable_transcripts = [t for t in other_transcripts if t.is_translatable]
-        for transcript_item in translatable_transcripts:
-            try:
-                logging.info(
-                    f"Trying to translate {transcript_item.language_code} transcript to English"
-                )
-                translated = transcript_item.translate("en").fetch()
-                logging.info(
-                    f"Successfully translated {transcript_item.language_code} transcript to English"
-                )
-                return translated
-            except Exception as e:
-                logging.warning(
-                    f"Failed to translate {transcript_item.language_code} transcript: {str(e)}"
-                )
-
-        # 3. Try any transcript in original language
-        for transcript_item in other_transcripts:
-            try:
-                logging.info(
-                    f"Using non-translated {transcript_item.language_code} transcript"
-                )
-                return transcript_item.fetch()
-            except Exception as e:
-                logging.warning(
-                    f"Failed to fetch {transcript_item.language_code} transcript: {str(e)}"
-                )
-
-        # If we get here, no transcripts worked
-        available_langs = [t.language_code for t in transcript_list]
-        raise ValueError(
-            f"No usable transcripts found for video {video_id}. Available languages: {available_langs}"
-        )
-
+        with timed(TRANSCRIPT_FETCH_SECONDS):
+            return get_transcript_source().fetch(video_id).entries
     except Exception as e:
+        FETCH_ERRORS.labels(source="transcript").inc()
         logging.error(f"Transcript API error for video {video_id}: {str(e)}")
         logging.error(traceback.format_exc())
         raise ValueError(f"Could not get transcript for video {video_id}: {str(e)}")
 
 
-def store_processed_video(video: Video) -> bool:
-    """Store a processed video in Qdrant."""
-    try:
-        # Get a simple embedding for the video ID
-        vector = get_embeddings(f"video_{video.video_id}")
+# Vector of the processed video points, read from the registry layout on first
+# use and again after SEGMENT_LAYOUT_TTL seconds, like the segments layout
+_registry_vector: Optional[Union[List[float], Dict[str, Any]]] = None
+_registry_vector_expire_at = 0.0
+_registry_vector_lock = threading.Lock()
+
+
+def _registry_vector_loaded() -> bool:
+    return _registry_vector is not None and time.monotonic() < _registry_vector_expire_at
+
+
+def _registry_point_vector() -> Union[List[float], Dict[str, Any]]:
+    """
+    Get the vector of a processed video point.
 
-        # Prepare payload
-        payload = video.model_dump()
+    Registries created by older versions have an unnamed vector of the model
+    dimension, which gets a fixed unit vector rather than an embedding. Newer
+    registries have no vectors at all.
+    """
+    global _registry_vector, _registry_vector_expire_at
+    if not _registry_vector_loaded():
+        with _registry_vector_lock:
+            if not _registry_vector_loaded():
+                vectors = qdrant_client.get_collection(
+                    PROCESSED_VIDEOS_COLLECTION
+                ).config.params.vectors
+                if isinstance(vectors, dict):
+                    _registry_vector = {}
+                else:
+                    _registry_vector = [1.0] + [0.0] * (vectors.size - 1)
+                _registry_vector_expire_at = time.monotonic() + SEGMENT_LAYOUT_TTL
+    return _registry_vector
+
+
+def reset_registry_vector() -> None:
+    """Forget the cached registry layout, after the registry was (re)created."""
+    global _registry_vector
+    with _registry_vector_lock:
+        _registry_vector = None
 
-        # Store in Qdrant
+
+def store_processed_video(video: Video) -> bool:
+    """Store a processed video in Qdrant, replacing any earlier version of it."""
+    try:
         qdrant_client.upsert(
             collection_name=PROCESSED_VIDEOS_COLLECTION,
             points=[
                 models.PointStruct(
-                    id=uuid.uuid4().hex,
-                    vector=vector,
-                    payload=payload,
+                    id=video_point_id(video.video_id),
+                    vector=_registry_point_vector(),
+                    payload=video.model_dump(),
                 ),
             ],
         )
+        invalidate_recent_videos()
         return True
     except Exception as e:
         print(f"Error storing processed video: {e}")
         return False
 
 
+def invalidate_recent_videos() -> None:
+    """Forget the cached lists of recently processed videos, after a change."""
+    recent_videos_cache.clear()
+
+
+def _recent_videos_scroll(limit: int) -> Dict[str, Any]:
+    """Build the scroll arguments of the most recently processed videos."""
+    return {
+        "collection_name": PROCESSED_VIDEOS_COLLECTION,
+        "limit": limit,
+        "with_payload": True,
+        "with_vectors": False,
+        "order_by": models.OrderBy(key="created_at", direction=models.Direction.DESC),
+    }
+
+
 def get_processed_videos(limit: int = 10) -> List[Video]:
     """Get recently processed videos ordered by creation time."""
+    cached = recent_videos_cache.get(limit)
+    if cached is not MISSING:
+        return list(cached)
+
     try:
-        # Scroll through the processed videos collection
-        scroll_result = qdrant_client.scroll(
-            collection_name=PROCESSED_VIDEOS_COLLECTION,
-            limit=limit,
-            with_payload=True,
-            order_by=models.OrderBy(key="created_at", direction=models.Direction.DESC),
-        )
+        # Qdrant returns the videos already ordered by the created_at index
+        points, _ = qdrant_client.scroll(**_recent_videos_scroll(limit))
+        videos = [Video(**point.payload) for point in points]
+        recent_videos_cache.set(limit, videos)
+        return list(videos)
+    except Exception as e:
+        print(f"Error getting processed videos: {e}")
+        return []
 
-        # Extract videos from the result
-        videos = []
-        for point in scroll_result[0]:
-            # Convert payload to Video
-            video = Video(**point.payload)
-            videos.append(video)
 
-        # Sort by created_at timestamp (most recent first)
-        videos.sort(key=lambda x: x.created_at or "", reverse=True)
+async def async_get_processed_videos(limit: int = 10) -> List[Video]:
+    """Get recently processed videos without blocking the event loop.
+    Cached lists are returned without any I/O."""
+    cached = recent_videos_cache.get(limit)
+    if cached is not MISSING:
+        return list(cached)
 
-        return videos[:limit]
+    try:
+        points, _ = await async_qdrant_client.scroll(**_recent_videos_scroll(limit))
+        videos = [Video(**point.payload) for point in points]
+        recent_videos_cache.set(limit, videos)
+        return list(videos)
     except Exception as e:
         print(f"Error getting processed videos: {e}")
         return []
 
 
-def process_video(youtube_url: str) -> Video:
-    """Process a YouTube video to extract and store transcript segments."""
+def normalize_transcript(transcript: List[Any]) -> List[Dict[str, Any]]:
+    """Normalize transcript entries of any supported format to dictionaries
+    with text, start and duration, sorted by start time."""
+    import logging
+
+    normalized_transcript = []
+    for idx, item in enumerate(transcript):
+        if (
+            isinstance(item, dict)
+            and "text" in item
+            and "start" in item
+            and "duration" in item
+        ):
+            # Original dictionary format
+            normalized_transcript.append(
+                {
+                    "text": item["text"],
+                    "start": item["start"],
+                    "duration": item["duration"],
+                }
+            )
+        elif (
+            hasattr(item, "text")
+            and hasattr(item, "start")
+            and hasattr(item, "duration")
+        ):
+            # Object with attributes
+            normalized_transcript.append(
+                {"text": item.text, "start": item.start, "duration": item.duration}
+            )
+        else:
+            # Unknown format, try to extract what we can
+            logging.warning(f"Encountered unknown transcript item format: {type(item)}")
+            try:
+                # Convert to string and use the index as a timestamp approximation
+                normalized_transcript.append(
+                    {
+                        "text": str(item),
+                        "start": float(idx * 5),  # Approximate 5 seconds per item
+                        "duration": 5.0,
+                    }
+                )
+            except Exception as e:
+                logging.error(f"Failed to normalize transcript item: {str(e)}")
+                continue
+
+    # Windowing relies on the entries being ordered, which they almost always are
+    if any(
+        previous["start"] > current["start"]
+        for previous, current in zip(normalized_transcript, normalized_transcript[1:])
+    ):
+        normalized_transcript.sort(key=lambda entry: entry["start"])
+
+    return normalized_transcript
+
+
+def _segment_token_budget() -> Optional[int]:
+    """Get the token budget of a segment, if the token budget mode is enabled."""
+    if SEGMENT_MAX_TOKENS == "model":
+        return get_max_seq_length()
+    return int(SEGMENT_MAX_TOKENS) or None
+
+
+def segment_transcript(
+    video_id: str, normalized_transcript: List[Dict[str, Any]]
+) -> List[VideoSegment]:
+    """Split a normalized transcript into overlapping video segments."""
+    max_tokens = _segment_token_budget()
+    windower = TranscriptWindower(
+        window_seconds=SEGMENT_WINDOW_SECONDS,
+        overlap_seconds=SEGMENT_OVERLAP_SECONDS,
+        stride_seconds=SEGMENT_STRIDE_SECONDS,
+        max_tokens=max_tokens,
+    )
+
+    texts = [entry["text"] for entry in normalized_transcript]
+    windows = windower.windows(
+        [entry["start"] for entry in normalized_transcript],
+        [entry["duration"] for entry in normalized_transcript],
+        token_counts=count_tokens(texts) if max_tokens else None,
+    )
+
+    return [
+        VideoSegment(
+            text=" ".join(texts[window.first : window.last]),
+            start=window.start,
+            end=window.end,
+            segment_id=f"{video_id}_{window.first}",
+            video_id=video_id,
+        )
+        for window in windows
+    ]
+
+
+def process_video(
+    youtube_url: str,
+    progress_callback: Optional[Callable[[str, float], None]] = None,
+) -> Video:
+    """
+    Process a YouTube video to extract and store transcript segments.
+
+    If `progress_callback` is given, it is called with the current stage name
+    and the overall percentage done as the processing advances.
+    """
     import logging
     import traceback
 
+    def report(stage: str, percent: float):
+        if progress_callback:
+            progress_callback(stage, percent)
+
     logging.info(f"Processing video URL: {youtube_url}")
-    transcript = None
     video_id = None
 
     # Extract video ID and get transcript
@@ -314,34 +1209,103 @@ def process_video(youtube_url: str) -> Video:
         video_id = extract_video_id(youtube_url)
         logging.info(f"Successfully extracted video ID: {video_id}")
 
-        # Check if video has already been processed
-        existing_video = get_video_by_id(video_id)
-        if existing_video and existing_video.processed:
+        # Only one worker at a time ingests a video, the others wait for its
+        # result. Whether the video is already processed is checked once the
+        # lease is taken, which also covers videos processed before this call.
+        with span("lease"):
+            ensure_collection_exists()
+            lease_token, ingested_video = _acquire_or_wait_for_ingest_lease(video_id, report)
+        if ingested_video is not None:
             logging.info(
                 f"Video {video_id} has already been processed. Skipping processing."
             )
-            return existing_video
+            return ingested_video
+    except Exception as e:
+        logging.error(f"Error in initial video processing: {str(e)}")
+        logging.error(traceback.format_exc())
+        raise
+
+    try:
+        return _ingest_video(video_id, report)
+    finally:
+        release_ingest_lease(video_id, lease_token)
+
+
+def _submit_metadata_fetch(
+    metadata_loader: Callable[[str], Optional[Dict[str, Optional[str]]]], video_id: str
+) -> "Future[Optional[Dict[str, Optional[str]]]]":
+    """Fetch video metadata on the metadata executor, in the current context
+    so that its span is part of the caller's trace."""
+
+    def load() -> Optional[Dict[str, Optional[str]]]:
+        with span("metadata"):
+            return metadata_loader(video_id)
+
+    return _metadata_executor.submit(contextvars.copy_context().run, load)
+
+
+def fetch_video_source(
+    video_id: str,
+    report: Optional[Callable[[str, float], None]] = None,
+    transcript_loader: Optional[Callable[[str], List[Any]]] = None,
+    metadata_loader: Optional[Callable[[str], Optional[Dict[str, Optional[str]]]]] = None,
+) -> Tuple[Video, List[Dict[str, Any]]]:
+    """
+    Fetch the metadata and the normalized transcript of a video to ingest.
+
+    Transcripts and metadata come from YouTube, unless other loaders are
+    given, such as local fixtures. The metadata is fetched in the background
+    while the transcript is, and left out if it takes longer than
+    METADATA_FETCH_TIMEOUT.
+    """
+    import logging
+    import traceback
 
+    transcript_loader = transcript_loader or get_video_transcript
+    metadata_loader = metadata_loader or get_youtube_metadata
+
+    try:
         # Create basic video object with current timestamp
         current_time = int(datetime.utcnow().timestamp())
         video = Video(video_id=video_id, created_at=current_time)
 
-        # Get video metadata from YouTube using the helper function
-        try:
-            video = _fetch_youtube_metadata(video_id, video)
-        except Exception as meta_error:
-            logging.warning(
-                f"Error fetching YouTube metadata during processing: {str(meta_error)}"
-            )
-            # Continue with processing even if metadata fetch fails
+        # Start fetching the video metadata, which the transcript does not depend on
+        if report:
+            report("fetching", 5)
+        metadata_started = time.monotonic()
+        metadata_future = _submit_metadata_fetch(metadata_loader, video_id)
 
         # Get transcript
         logging.info(f"Fetching transcript for video ID: {video_id}")
-        transcript = get_video_transcript(video_id)
+        try:
+            with span("transcript"):
+                transcript = transcript_loader(video_id)
+        except BaseException:
+            metadata_future.cancel()
+            raise
         logging.info(
             f"Successfully retrieved transcript with {len(transcript)} entries"
         )
 
+        if report:
+            report("metadata", 15)
+        try:
+            timeout = None
+            if METADATA_FETCH_TIMEOUT:
+                timeout = max(
+                    0.0, METADATA_FETCH_TIMEOUT - (time.monotonic() - metadata_started)
+                )
+            video = _apply_youtube_metadata(video, metadata_future.result(timeout=timeout))
+        except FutureTimeoutError:
+            logging.warning(
+                f"Timed out fetching YouTube metadata of video {video_id}, continuing without it"
+            )
+        except Exception as meta_error:
+            logging.warning(
+                f"Error fetching YouTube metadata during processing: {str(meta_error)}"
+            )
+            # Continue with processing even if metadata fetch fails
+
         # If we couldn't get metadata and have a transcript, try to extract a title from transcript
         if (
             (not video.title or video.title == f"Video {video_id}")
@@ -365,120 +1329,60 @@ def process_video(youtube_url: str) -> Video:
                 logging.warning(
                     f"Could not set title from transcript: {str(title_error)}"
                 )
+
+        logging.info(f"Normalizing {len(transcript)} transcript entries")
+        with span("normalize"):
+            return video, normalize_transcript(transcript)
     except Exception as e:
         logging.error(f"Error in initial video processing: {str(e)}")
         logging.error(traceback.format_exc())
         raise
 
-    # Process transcript into segments
-    try:
-        # Process transcript into overlapping 30-second segments with 10-second overlap
-        logging.info(f"Processing {len(transcript)} transcript entries into segments")
-        segments = []
-
-        # First, normalize the transcript to a standard format
-        normalized_transcript = []
-        for item in transcript:
-            if (
-                isinstance(item, dict)
-                and "text" in item
-                and "start" in item
-                and "duration" in item
-            ):
-                # Original dictionary format
-                normalized_transcript.append(
-                    {
-                        "text": item["text"],
-                        "start": item["start"],
-                        "duration": item["duration"],
-                    }
-                )
-            elif (
-                hasattr(item, "text")
-                and hasattr(item, "start")
-                and hasattr(item, "duration")
-            ):
-                # Object with attributes
-                normalized_transcript.append(
-                    {"text": item.text, "start": item.start, "duration": item.duration}
-                )
-            else:
-                # Unknown format, try to extract what we can
-                logging.warning(
-                    f"Encountered unknown transcript item format: {type(item)}"
-                )
-                try:
-                    # Convert to string if we can't determine the structure
-                    text = str(item)
-                    # Use index as a timestamp approximation
-                    idx = transcript.index(item)
-                    normalized_transcript.append(
-                        {
-                            "text": text,
-                            "start": float(idx * 5),  # Approximate 5 seconds per item
-                            "duration": 5.0,
-                        }
-                    )
-                except Exception as e:
-                    logging.error(f"Failed to normalize transcript item: {str(e)}")
-                    continue
-
-        # Use the normalized transcript for segment processing
-        for i in range(len(normalized_transcript)):
-            # Find segments that form approximately 30 seconds
-            segment_text = []
-            start_time = normalized_transcript[i]["start"]
-            end_time = start_time
-            current_index = i
-
-            while (
-                current_index < len(normalized_transcript)
-                and end_time - start_time < 30
-            ):
-                segment_text.append(normalized_transcript[current_index]["text"])
-                end_time = (
-                    normalized_transcript[current_index]["start"]
-                    + normalized_transcript[current_index]["duration"]
-                )
-                current_index += 1
-
-            if segment_text:  # Only create segment if we have text
-                segment_id = f"{video_id}_{i}"
-                text = " ".join(segment_text)
-
-                # Create VideoSegment
-                segment = VideoSegment(
-                    text=text,
-                    start=start_time,
-                    end=end_time,
-                    segment_id=segment_id,
-                    video_id=video_id,
-                )
-
-                segments.append(segment)
 
-            # Skip forward with 10-second overlap (if we're not at the end)
-            if (
-                i + 1 < len(normalized_transcript)
-                and normalized_transcript[i + 1]["start"] < end_time - 10
-            ):
-                # Find the next segment that starts at least 20 seconds after our current start
-                while (
-                    i + 1 < len(normalized_transcript)
-                    and normalized_transcript[i + 1]["start"] < start_time + 20
-                ):
-                    i += 1
+def register_ingested_video(
+    video: Video,
+    normalized_transcript: List[Dict[str, Any]],
+    store_results: Dict[str, bool],
+    ingest_started: float,
+) -> Video:
+    """
+    Finish the ingestion of a video whose segments were stored: remove the
+    segments of an earlier ingestion, invalidate cached searches, and mark
+    the video as processed in the registry, with its counters.
+
+    If any segment could not be stored, or there were none, the segments of
+    an earlier ingestion are kept, the video is not marked as processed and
+    a ValueError is raised, so a failed re-ingestion never empties the index
+    of a video.
+
+    Args:
+        video: The video, with its metadata
+        normalized_transcript: The transcript the segments were made from
+        store_results: Whether each segment of the video, keyed by segment_id, was stored
+        ingest_started: time.monotonic() when the ingestion started
+    """
+    import logging
+    import traceback
 
-        logging.info(f"Created {len(segments)} segments from transcript")
+    video_id = video.video_id
+    failed = [sid for sid, stored in store_results.items() if not stored]
+    if not store_results:
+        raise ValueError(f"No segments to store for video {video_id}")
+    if failed:
+        # Stored segments replaced their earlier copies, so cached searches are stale anyway
+        if len(failed) < len(store_results):
+            invalidate_search_cache(video_id)
+        raise ValueError(
+            f"Failed to store {len(failed)} of {len(store_results)} segments for video {video_id}"
+        )
 
-        # Store segments in Qdrant
-        logging.info("Ensuring Qdrant collections exist")
-        ensure_collection_exists()
+    try:
+        # Remove segments of an earlier ingestion that were not overwritten
+        with span("cleanup"):
+            _delete_stale_segments(video_id, [segment_point_id(sid) for sid in store_results])
 
-        # Store each segment
-        logging.info(f"Storing {len(segments)} segments in Qdrant")
-        for segment in segments:
-            store_segment(segment)
+        # Cached searches no longer reflect the stored segments
+        invalidate_search_cache(video_id)
     except Exception as e:
         logging.error(f"Error processing transcript segments: {str(e)}")
         logging.error(traceback.format_exc())
@@ -488,10 +1392,18 @@ def process_video(youtube_url: str) -> Video:
     try:
         logging.info(f"Marking video {video_id} as processed")
         video.processed = True
+        video.segment_count = len(store_results)
+        if normalized_transcript:
+            last_entry = normalized_transcript[-1]
+            video.duration = last_entry["start"] + last_entry["duration"]
+        video.ingest_seconds = round(time.monotonic() - ingest_started, 3)
+        SEGMENTS_PER_VIDEO.observe(video.segment_count)
+        INGEST_SECONDS.observe(video.ingest_seconds)
 
         # Store the processed video in Qdrant
         logging.info("Storing processed video in Qdrant")
-        store_result = store_processed_video(video)
+        with span("registry"):
+            store_result = store_processed_video(video)
         if store_result:
             logging.info(f"Successfully stored processed video: {video_id}")
         else:
@@ -504,89 +1416,170 @@ def process_video(youtube_url: str) -> Video:
         raise
 
 
-def store_segment(segment: VideoSegment) -> bool:
-    """Store a video segment in Qdrant."""
+def _ingest_video(video_id: str, report: Callable[[str, float], None]) -> Video:
+    """Fetch, segment, embed and store a video. The caller must hold its ingest lease."""
     import logging
+    import traceback
+
+    ingest_started = time.monotonic()
+    video, normalized_transcript = fetch_video_source(video_id, report)
 
+    # Process transcript into segments
     try:
-        # Get embeddings
-        logging.debug(f"Getting embeddings for segment {segment.segment_id}")
-        vector = get_embeddings(segment.text)
+        # Process transcript into overlapping windows (30-second segments with 10-second overlap by default)
+        report("segmenting", 25)
+        logging.info(f"Processing {len(normalized_transcript)} transcript entries into segments")
+        with span("segment"):
+            segments = segment_transcript(video_id, normalized_transcript)
 
-        # Prepare payload
-        payload = segment.model_dump()
+        logging.info(f"Created {len(segments)} segments from transcript")
 
-        # Store in Qdrant
-        point_id = uuid.uuid4().hex
-        logging.debug(
-            f"Storing segment {segment.segment_id} in Qdrant with point ID {point_id}"
-        )
-        qdrant_client.upsert(
-            collection_name=COLLECTION_NAME,
-            points=[
-                models.PointStruct(
-                    id=point_id,
-                    vector=vector,
-                    payload=payload,
-                ),
-            ],
+        # Store all segments with batched embeddings and bulk upserts
+        logging.info(f"Storing {len(segments)} segments in Qdrant")
+        report("storing", 30)
+        store_results = store_segments(
+            segments,
+            progress_callback=lambda fraction: report("storing", 30 + 65 * fraction),
         )
-        return True
     except Exception as e:
-        import traceback
-
-        logging.error(f"Error storing segment {segment.segment_id}: {str(e)}")
+        logging.error(f"Error processing transcript segments: {str(e)}")
         logging.error(traceback.format_exc())
-        return False
+        raise
 
+    report("registering", 95)
+    return register_ingested_video(video, normalized_transcript, store_results, ingest_started)
 
-def search_video_segments(
-    query: str, video_id: Optional[str] = None, limit: int = 5
-) -> List[SearchResult]:
-    """Search for video segments based on the provided query."""
-    # Get query embeddings
-    query_vector = get_embeddings(query)
-
-    # Prepare filter if video_id is provided
-    filter_param = None
-    if video_id:
-        filter_param = models.Filter(
-            must=[
-                models.FieldCondition(
-                    key="video_id",
-                    match=models.MatchValue(value=video_id),
-                ),
-            ],
-        )
 
-    # Search in Qdrant
-    search_result = qdrant_client.search(
-        collection_name=COLLECTION_NAME,
-        query_vector=query_vector,
-        limit=limit,
-        query_filter=filter_param,
-    )
+def store_segment(segment: VideoSegment) -> bool:
+    """Store a video segment in Qdrant."""
+    return store_segments([segment]).get(segment.segment_id, False)
 
-    # Format results
-    results = []
-    for scored_point in search_result:
-        # Convert payload to VideoSegment
-        segment = VideoSegment(**scored_point.payload)
 
-        # Create SearchResult
-        result = SearchResult(
-            score=scored_point.score,
-            segment=segment,
-        )
-        results.append(result)
+def store_segments(
+    segments: List[VideoSegment],
+    batch_size: Optional[int] = None,
+    upsert_batch_size: Optional[int] = None,
+    parallel: Optional[int] = None,
+    progress_callback: Optional[Callable[[float], None]] = None,
+    collection_name: Optional[str] = None,
+) -> Dict[str, bool]:
+    """
+    Store many video segments in Qdrant, in the segments collection or in the
+    given one, such as the target collection of a migration.
+
+    Embeddings, and BM25 sparse vectors if the collection stores them, are
+    computed in batches of `batch_size` texts and the points are
+    written with chunked bulk upserts of `upsert_batch_size` points, optionally
+    running `parallel` upserts at once. If `progress_callback` is given, it is
+    called with the fraction of the work done after every batch and chunk.
+
+    Returns:
+        Dict[str, bool]: Whether each segment, keyed by segment_id, was stored
+    """
+    import logging
+    import traceback
+
+    batch_size = batch_size or EMBEDDING_BATCH_SIZE
+    upsert_batch_size = upsert_batch_size or UPSERT_BATCH_SIZE
+    parallel = parallel or UPSERT_PARALLEL
+    if collection_name is None:
+        collection_name, layout = COLLECTION_NAME, get_segment_vectors()
+    else:
+        layout = read_segment_vectors(collection_name)
+
+    results = {segment.segment_id: False for segment in segments}
+    if not segments:
+        return results
+
+    # Encoding and upserting are each counted as half of the work
+    progress_lock = threading.Lock()
+    progress = {"encoded": 0, "upserted": 0}
+
+    def advance(key: str, count: int):
+        if not progress_callback:
+            return
+        with progress_lock:
+            progress[key] += count
+            fraction = (progress["encoded"] + progress["upserted"]) / (2 * len(segments))
+        progress_callback(min(fraction, 1.0))
+
+    # Encode in batches, falling back to single encodes to isolate failing segments
+    points = []
+    for offset in range(0, len(segments), batch_size):
+        batch = segments[offset : offset + batch_size]
+        logging.debug(f"Getting embeddings for {len(batch)} segments")
+        with span("embed"):
+            try:
+                vectors = get_embeddings_batch([segment.text for segment in batch], batch_size)
+            except Exception as e:
+                logging.warning(f"Batch embedding failed, encoding one by one: {str(e)}")
+                vectors = []
+                for segment in batch:
+                    try:
+                        vectors.append(get_embeddings(segment.text))
+                    except Exception as segment_error:
+                        logging.error(
+                            f"Error embedding segment {segment.segment_id}: {str(segment_error)}"
+                        )
+                        vectors.append(None)
+        # Sparse vectors are computed in the same pass, when the collection has them
+        sparse_vectors = [None] * len(batch)
+        if SPARSE_VECTOR_NAME in layout:
+            with span("sparse"):
+                sparse_vectors = sparse_encoder.encode_documents(
+                    [segment.text for segment in batch]
+                )
+        advance("encoded", len(batch))
+
+        for segment, vector, sparse_vector in zip(batch, vectors, sparse_vectors):
+            if vector is None:
+                continue
+            points.append(
+                (
+                    segment.segment_id,
+                    models.PointStruct(
+                        id=segment_point_id(segment.segment_id),
+                        vector=_segment_point_vector(vector, sparse_vector, layout),
+                        payload=segment.model_dump(),
+                    ),
+                )
+            )
+
+    def upsert_chunk(chunk):
+        try:
+            qdrant_client.upsert(
+                collection_name=collection_name,
+                points=[point for _, point in chunk],
+            )
+            for segment_id, _ in chunk:
+                results[segment_id] = True
+        except Exception as e:
+            for segment_id, _ in chunk:
+                logging.error(f"Error storing segment {segment_id}: {str(e)}")
+            logging.error(traceback.format_exc())
+        advance("upserted", len(chunk))
+
+    chunks = [
+        points[offset : offset + upsert_batch_size]
+        for offset in range(0, len(points), upsert_batch_size)
+    ]
+    logging.debug(f"Upserting {len(points)} points in {len(chunks)} chunks")
+    with span("upsert"):
+        if parallel > 1 and len(chunks) > 1:
+            with ThreadPoolExecutor(max_workers=parallel) as executor:
+                list(executor.map(upsert_chunk, chunks))
+        else:
+            for chunk in chunks:
+                upsert_chunk(chunk)
 
     return results
 
 
-def get_all_segments(video_id: str) -> List[VideoSegment]:
-    """Get all segments for a specific video, ordered by start time."""
-    # Prepare filter for the video_id
-    filter_param = models.Filter(
+def _video_id_filter(video_id: Optional[str]) -> Optional[models.Filter]:
+    """Build a filter matching points of a single video, or None for all videos."""
+    if not video_id:
+        return None
+    return models.Filter(
         must=[
             models.FieldCondition(
                 key="video_id",
@@ -595,45 +1588,582 @@ def get_all_segments(video_id: str) -> List[VideoSegment]:
         ],
     )
 
-    # Search in Qdrant without vector, just to get all segments
-    scroll_result = qdrant_client.scroll(
-        collection_name=COLLECTION_NAME,
-        scroll_filter=filter_param,
-        limit=10000,  # Adjust based on expected maximum segments
+
+def _to_search_results(scored_points) -> List[SearchResult]:
+    """Convert scored Qdrant points into search results."""
+    return [
+        SearchResult(
+            score=scored_point.score,
+            segment=VideoSegment(**scored_point.payload),
+        )
+        for scored_point in scored_points
+    ]
+
+
+def _segments_scroll(
+    video_id: str,
+    start: Optional[float],
+    end: Optional[float],
+    cursor: Optional[float],
+    limit: int,
+) -> Dict[str, Any]:
+    """
+    Build the scroll arguments of a page of segments ordered by start time.
+
+    Segments starting in [start, end) are selected with a range filter, from
+    the cursor on, and one extra segment is requested to know whether there
+    is a next page.
+    """
+    lower_bounds = [value for value in (start, cursor) if value is not None]
+    lower = max(lower_bounds) if lower_bounds else None
+    query_filter = _video_id_filter(video_id)
+    if lower is not None or end is not None:
+        query_filter.must.append(
+            models.FieldCondition(key="start", range=models.Range(gte=lower, lt=end))
+        )
+
+    return {
+        "collection_name": COLLECTION_NAME,
+        "scroll_filter": query_filter,
+        "order_by": models.OrderBy(key="start", direction=models.Direction.ASC),
+        "limit": limit + 1,
+        "with_vectors": False,
+    }
+
+
+def _to_segment_page(points, limit: int) -> Tuple[List[VideoSegment], Optional[float]]:
+    """
+    Convert a scrolled page of points into segments and the next cursor.
+
+    The cursor is the start time the next page begins at. Segments sharing
+    that start time are left to the next page, so none is skipped. If all of
+    them share it, the page is empty, and the caller has to read them all.
+    """
+    segments = [VideoSegment(**point.payload) for point in points]
+    if len(segments) <= limit:
+        return segments, None
+
+    next_start = segments[limit].start
+    return [segment for segment in segments[:limit] if segment.start < next_start], next_start
+
+
+def _tied_segments_scroll(video_id: str, start: float) -> Dict[str, Any]:
+    """Build the scroll arguments of all the segments of a video starting at a time."""
+    return _segments_scroll(
+        video_id, start, math.nextafter(start, math.inf), None, MAX_TIED_SEGMENTS
     )
 
-    # Format results
+
+def _is_missing_start_index(error: Exception) -> bool:
+    """Check whether a scroll failed because the start field has no range index,
+    which ordering by start time requires."""
+    return (
+        isinstance(error, UnexpectedResponse)
+        and error.status_code == 400
+        and "order_by" in str(error)
+    )
+
+
+def _unordered_segments_scroll(
+    video_id: str, start: Optional[float], end: Optional[float], cursor: Optional[float]
+) -> Dict[str, Any]:
+    """Build the scroll arguments of all the segments of a video from the
+    cursor on, in no particular order, as a fallback when there is no index
+    to order them by start time."""
+    scroll = _segments_scroll(video_id, start, end, cursor, SEGMENT_PAGE_SIZE)
+    del scroll["order_by"]
+    return scroll
+
+
+def _sorted_segment_page(points, limit: int) -> Tuple[List[VideoSegment], Optional[float]]:
+    """Get a page from all the remaining segments, sorted here by start time."""
+    segments = sorted((VideoSegment(**point.payload) for point in points), key=lambda s: s.start)
+    if len(segments) <= limit:
+        return segments, None
+
+    next_start = segments[limit].start
+    page = [segment for segment in segments[:limit] if segment.start < next_start]
+    if not page:
+        # More than a page of segments start at the same time
+        page = [segment for segment in segments if segment.start == next_start]
+        next_start = math.nextafter(next_start, math.inf)
+    return page, next_start
+
+
+def _warn_missing_start_index() -> None:
+    import logging
+
+    logging.warning(
+        f"{COLLECTION_NAME} has no range index on start, reading segments unordered; "
+        "run python -m app.services.schema_service to create it"
+    )
+
+
+def get_segments_page(
+    video_id: str,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    cursor: Optional[float] = None,
+    limit: int = SEGMENT_PAGE_SIZE,
+) -> Tuple[List[VideoSegment], Optional[float]]:
+    """
+    Get a page of the segments of a video starting in [start, end), ordered by
+    start time.
+
+    Returns:
+        Tuple[List[VideoSegment], Optional[float]]: The segments, and the
+        cursor of the next page, or None if this is the last one
+    """
+    try:
+        points, _ = qdrant_client.scroll(**_segments_scroll(video_id, start, end, cursor, limit))
+    except Exception as e:
+        if not _is_missing_start_index(e):
+            raise
+        _warn_missing_start_index()
+        points, offset = [], None
+        while True:
+            page, offset = qdrant_client.scroll(
+                **_unordered_segments_scroll(video_id, start, end, cursor), offset=offset
+            )
+            points.extend(page)
+            if offset is None:
+                return _sorted_segment_page(points, limit)
+    segments, next_cursor = _to_segment_page(points, limit)
+    if not segments and next_cursor is not None:
+        # More than a page of segments start at the same time
+        points, _ = qdrant_client.scroll(**_tied_segments_scroll(video_id, next_cursor))
+        segments = [VideoSegment(**point.payload) for point in points]
+        next_cursor = math.nextafter(next_cursor, math.inf)
+    return segments, next_cursor
+
+
+async def async_get_segments_page(
+    video_id: str,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    cursor: Optional[float] = None,
+    limit: int = SEGMENT_PAGE_SIZE,
+) -> Tuple[List[VideoSegment], Optional[float]]:
+    """Get a page of the segments of a video without blocking the event loop."""
+    try:
+        points, _ = await async_qdrant_client.scroll(
+            **_segments_scroll(video_id, start, end, cursor, limit)
+        )
+    except Exception as e:
+        if not _is_missing_start_index(e):
+            raise
+        _warn_missing_start_index()
+        points, offset = [], None
+        while True:
+            page, offset = await async_qdrant_client.scroll(
+                **_unordered_segments_scroll(video_id, start, end, cursor), offset=offset
+            )
+            points.extend(page)
+            if offset is None:
+                return _sorted_segment_page(points, limit)
+    segments, next_cursor = _to_segment_page(points, limit)
+    if not segments and next_cursor is not None:
+        points, _ = await async_qdrant_client.scroll(
+            **_tied_segments_scroll(video_id, next_cursor)
+        )
+        segments = [VideoSegment(**point.payload) for point in points]
+        next_cursor = math.nextafter(next_cursor, math.inf)
+    return segments, next_cursor
+
+
+async def async_iter_segments(
+    video_id: str,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    page_size: int = SEGMENT_PAGE_SIZE,
+) -> AsyncIterator[VideoSegment]:
+    """Iterate over the segments of a video in start time order, page by page."""
+    cursor = None
+    while True:
+        segments, cursor = await async_get_segments_page(
+            video_id, start, end, cursor, page_size
+        )
+        for segment in segments:
+            yield segment
+        if cursor is None:
+            break
+
+
+def _get_cached_search(
+    query: str, video_id: Optional[str], limit: int, params: Dict[str, Any]
+) -> Optional[List[SearchResult]]:
+    """Get cached search results, or None if they are not cached."""
+    if search_result_cache is None:
+        return None
+    cached = search_result_cache.get(normalize_query(query), video_id, limit, **params)
+    if cached is MISSING:
+        return None
+    if search_result_cache.backend.local:
+        return list(cached)
+    return [SearchResult.model_validate(result) for result in cached]
+
+
+def _cache_search(
+    query: str,
+    video_id: Optional[str],
+    limit: int,
+    params: Dict[str, Any],
+    results: List[SearchResult],
+) -> None:
+    """Cache search results. Empty results are not cached, as they are usually
+    requested while the video is still being ingested."""
+    if search_result_cache is None or not results:
+        return
+    if not search_result_cache.backend.local:
+        results = [result.model_dump() for result in results]
+    search_result_cache.set(normalize_query(query), video_id, limit, results, **params)
+
+
+def invalidate_search_cache(video_id: str) -> None:
+    """Invalidate cached searches affected by a change to the given video."""
+    if search_result_cache is not None:
+        search_result_cache.invalidate(video_id)
+
+
+def _sparse_query(normalized_query: str, mode: str) -> Optional[models.SparseVector]:
+    """Encode the lexical part of a search, or None if it has no lexical part.
+    Queries made only of stop words have none either."""
+    if mode == "dense":
+        return None
+    sparse_vector = sparse_encoder.encode_query(normalized_query)
+    return sparse_vector if sparse_vector.indices else None
+
+
+def search_video_segments(
+    query: str,
+    video_id: Optional[str] = None,
+    limit: int = 5,
+    hnsw_ef: Optional[int] = None,
+    oversampling: Optional[float] = None,
+    rescore: Optional[bool] = None,
+    exact: Optional[bool] = None,
+    mode: Optional[str] = None,
+) -> List[SearchResult]:
+    """
+    Search for video segments based on the provided query.
+
+    The search mode is "hybrid", "dense" or "lexical", and the parameters
+    that are not given default to the SEARCH_* configuration. Hybrid result
+    scores come from rank fusion, so they only order the results.
+    """
+    params = resolve_search_params(hnsw_ef, oversampling, rescore, exact, mode)
+    with span("cache"):
+        cached = _get_cached_search(query, video_id, limit, params)
+    if cached is not None:
+        return cached
+
+    normalized = normalize_query(query)
+    with span("sparse"):
+        sparse_vector = _sparse_query(normalized, params["mode"])
+    if params["mode"] == "lexical" and sparse_vector is None:
+        return []
+
+    # Lexical searches do not need the embedding model
+    query_vector = None
+    if params["mode"] != "lexical":
+        with span("encode"):
+            query_vector = get_query_embedding(query)
+
+    # Search in Qdrant
+    with span("search"):
+        search_result = qdrant_client.query_points(
+            collection_name=COLLECTION_NAME,
+            **_segment_query(query_vector, sparse_vector, video_id, limit, params),
+        )
+
+    with span("results"):
+        results = _to_search_results(search_result.points)
+    _cache_search(query, video_id, limit, params, results)
+    return results
+
+
+async def async_search_video_segments(
+    query: str,
+    video_id: Optional[str] = None,
+    limit: int = 5,
+    hnsw_ef: Optional[int] = None,
+    oversampling: Optional[float] = None,
+    rescore: Optional[bool] = None,
+    exact: Optional[bool] = None,
+    mode: Optional[str] = None,
+) -> List[SearchResult]:
+    """Search for video segments without blocking the event loop."""
+    # The collection layout is read from Qdrant once, outside of the event loop
+    if not segment_vectors_loaded():
+        await run_blocking(get_segment_vectors)
+
+    params = resolve_search_params(hnsw_ef, oversampling, rescore, exact, mode)
+    # Shared cache backends do network I/O, so only local ones are read inline
+    with span("cache"):
+        if search_result_cache is None or search_result_cache.backend.local:
+            cached = _get_cached_search(query, video_id, limit, params)
+        else:
+            cached = await run_blocking(_get_cached_search, query, video_id, limit, params)
+    if cached is not None:
+        return cached
+
+    normalized = normalize_query(query)
+    with span("sparse"):
+        sparse_vector = _sparse_query(normalized, params["mode"])
+    if params["mode"] == "lexical" and sparse_vector is None:
+        return []
+
+    # Only cache misses need the model, so hits skip the executor entirely,
+    # and lexical searches never use it
+    query_vector = None
+    if params["mode"] != "lexical":
+        with span("encode"):
+            query_vector = query_embedding_cache.get((MODEL_NAME, normalized))
+            if query_vector is MISSING:
+                query_vector = await run_blocking(_encode_query, normalized)
+
+    with span("search"):
+        search_result = await async_qdrant_client.query_points(
+            collection_name=COLLECTION_NAME,
+            **_segment_query(query_vector, sparse_vector, video_id, limit, params),
+        )
+
+    with span("results"):
+        results = _to_search_results(search_result.points)
+    if search_result_cache is None or search_result_cache.backend.local:
+        _cache_search(query, video_id, limit, params, results)
+    else:
+        await run_blocking(_cache_search, query, video_id, limit, params, results)
+    return results
+
+
+def _get_cached_searches(
+    searches: List[Tuple[str, Optional[str], int]], params: Dict[str, Any]
+) -> List[Optional[List[SearchResult]]]:
+    """Get the cached results of each search, or None for those that are not cached."""
+    return [
+        _get_cached_search(query, video_id, limit, params)
+        for query, video_id, limit in searches
+    ]
+
+
+def _cache_searches(
+    searches: List[Tuple[str, Optional[str], int]],
+    params: Dict[str, Any],
+    results: Dict[int, List[SearchResult]],
+) -> None:
+    """Cache the results of the searches of a batch, by position in the batch."""
+    for position, search_results in results.items():
+        query, video_id, limit = searches[position]
+        _cache_search(query, video_id, limit, params, search_results)
+
+
+def _pending_searches(
+    searches: List[Tuple[str, Optional[str], int]],
+    params: Dict[str, Any],
+    results: List[Optional[List[SearchResult]]],
+) -> Tuple[List[int], List[Optional[models.SparseVector]]]:
+    """
+    Find the searches of a batch that still need a query, with their lexical
+    query vectors. Lexical searches without any lexical part get no results.
+    """
+    pending, sparse_vectors = [], []
+    for position, (query, _, _) in enumerate(searches):
+        if results[position] is not None:
+            continue
+        sparse_vector = _sparse_query(normalize_query(query), params["mode"])
+        if params["mode"] == "lexical" and sparse_vector is None:
+            results[position] = []
+            continue
+        pending.append(position)
+        sparse_vectors.append(sparse_vector)
+    return pending, sparse_vectors
+
+
+def _batch_requests(
+    searches: List[Tuple[str, Optional[str], int]],
+    params: Dict[str, Any],
+    pending: List[int],
+    query_vectors: List[Optional[List[float]]],
+    sparse_vectors: List[Optional[models.SparseVector]],
+) -> List[models.QueryRequest]:
+    """Build the Qdrant requests of the pending searches of a batch."""
+    return [
+        _segment_query_request(
+            query_vector, sparse_vector, searches[position][1], searches[position][2], params
+        )
+        for position, query_vector, sparse_vector in zip(pending, query_vectors, sparse_vectors)
+    ]
+
+
+def search_video_segments_batch(
+    searches: List[Tuple[str, Optional[str], int]],
+    hnsw_ef: Optional[int] = None,
+    oversampling: Optional[float] = None,
+    rescore: Optional[bool] = None,
+    exact: Optional[bool] = None,
+    mode: Optional[str] = None,
+) -> List[List[SearchResult]]:
+    """
+    Run many searches at once, with the same search parameters.
+
+    Each search is a (query, video_id, limit) tuple, and its results are
+    returned at the same position. The queries that are not cached are
+    encoded with a single model call and searched with a single Qdrant
+    request, instead of one of each per query.
+    """
+    params = resolve_search_params(hnsw_ef, oversampling, rescore, exact, mode)
+    with span("cache"):
+        results = _get_cached_searches(searches, params)
+    with span("sparse"):
+        pending, sparse_vectors = _pending_searches(searches, params, results)
+    if not pending:
+        return results
+
+    query_vectors = [None] * len(pending)
+    if params["mode"] != "lexical":
+        with span("encode"):
+            query_vectors = get_query_embeddings(
+                [searches[position][0] for position in pending]
+            )
+
+    with span("search"):
+        responses = qdrant_client.query_batch_points(
+            collection_name=COLLECTION_NAME,
+            requests=_batch_requests(searches, params, pending, query_vectors, sparse_vectors),
+        )
+
+    with span("results"):
+        found = {
+            position: _to_search_results(response.points)
+            for position, response in zip(pending, responses)
+        }
+    results = [found.get(position, cached) for position, cached in enumerate(results)]
+    _cache_searches(searches, params, found)
+    return results
+
+
+async def async_search_video_segments_batch(
+    searches: List[Tuple[str, Optional[str], int]],
+    hnsw_ef: Optional[int] = None,
+    oversampling: Optional[float] = None,
+    rescore: Optional[bool] = None,
+    exact: Optional[bool] = None,
+    mode: Optional[str] = None,
+) -> List[List[SearchResult]]:
+    """Run many searches at once without blocking the event loop."""
+    if not segment_vectors_loaded():
+        await run_blocking(get_segment_vectors)
+
+    params = resolve_search_params(hnsw_ef, oversampling, rescore, exact, mode)
+    local_cache = search_result_cache is None or search_result_cache.backend.local
+    with span("cache"):
+        if local_cache:
+            results = _get_cached_searches(searches, params)
+        else:
+            results = await run_blocking(_get_cached_searches, searches, params)
+    with span("sparse"):
+        pending, sparse_vectors = _pending_searches(searches, params, results)
+    if not pending:
+        return results
+
+    query_vectors = [None] * len(pending)
+    if params["mode"] != "lexical":
+        with span("encode"):
+            normalized = [normalize_query(searches[position][0]) for position in pending]
+            vectors = _cached_query_embeddings(normalized)
+            missing = [query for query in dict.fromkeys(normalized) if query not in vectors]
+            if missing:
+                vectors.update(zip(missing, await run_blocking(_encode_queries, missing)))
+            query_vectors = [vectors[query] for query in normalized]
+
+    with span("search"):
+        responses = await async_qdrant_client.query_batch_points(
+            collection_name=COLLECTION_NAME,
+            requests=_batch_requests(searches, params, pending, query_vectors, sparse_vectors),
+        )
+
+    with span("results"):
+        found = {
+            position: _to_search_results(response.points)
+            for position, response in zip(pending, responses)
+        }
+    results = [found.get(position, cached) for position, cached in enumerate(results)]
+    if local_cache:
+        _cache_searches(searches, params, found)
+    else:
+        await run_blocking(_cache_searches, searches, params, found)
+    return results
+
+
+def get_all_segments(video_id: str) -> List[VideoSegment]:
+    """Get all segments for a specific video, ordered by start time."""
     segments = []
-    for point in scroll_result[0]:
-        # Convert payload to VideoSegment
-        segment = VideoSegment(**point.payload)
-        segments.append(segment)
+    cursor = None
+    while True:
+        page, cursor = get_segments_page(video_id, cursor=cursor)
+        segments.extend(page)
+        if cursor is None:
+            return segments
 
-    # Sort by start time
-    segments.sort(key=lambda x: x.start)
 
-    return segments
+async def async_get_all_segments(video_id: str) -> List[VideoSegment]:
+    """Get all segments for a specific video without blocking the event loop."""
+    return [segment async for segment in async_iter_segments(video_id)]
 
 
-def get_video_by_id(video_id: str) -> Optional[Video]:
-    """Get a specific video by its video_id. If not found in database, attempt to fetch from YouTube."""
+def find_processed_video(video_id: str) -> Optional[Video]:
+    """
+    Get a video from the registry if it has been processed, or None.
+
+    Unlike get_video_by_id, this never contacts YouTube, so it is the check
+    to use before ingesting a video.
+    """
     import logging
 
     try:
-        # Create filter for the video_id
-        filter_param = models.Filter(
-            must=[
-                models.FieldCondition(
-                    key="video_id",
-                    match=models.MatchValue(value=video_id),
-                ),
-            ],
+        points, _ = qdrant_client.scroll(
+            collection_name=PROCESSED_VIDEOS_COLLECTION,
+            scroll_filter=_video_id_filter(video_id),
+            limit=1,
+            with_payload=True,
+        )
+    except Exception as e:
+        logging.error(f"Error looking up video {video_id} in the registry: {str(e)}")
+        return None
+    if points and points[0].payload.get("processed"):
+        return Video(**points[0].payload)
+    return None
+
+
+async def async_find_processed_video(video_id: str) -> Optional[Video]:
+    """Get a video from the registry if it has been processed, without blocking."""
+    import logging
+
+    try:
+        points, _ = await async_qdrant_client.scroll(
+            collection_name=PROCESSED_VIDEOS_COLLECTION,
+            scroll_filter=_video_id_filter(video_id),
+            limit=1,
+            with_payload=True,
         )
+    except Exception as e:
+        logging.error(f"Error looking up video {video_id} in the registry: {str(e)}")
+        return None
+    if points and points[0].payload.get("processed"):
+        return Video(**points[0].payload)
+    return None
 
+
+def get_video_by_id(video_id: str) -> Optional[Video]:
+    """Get a specific video by its video_id. If not found in database, attempt to fetch from YouTube."""
+    import logging
+
+    try:
         # Search in the processed_videos collection
         scroll_result = qdrant_client.scroll(
             collection_name=PROCESSED_VIDEOS_COLLECTION,
-            scroll_filter=filter_param,
+            scroll_filter=_video_id_filter(video_id),
             limit=1,  # We only need one result
             with_payload=True,
         )
@@ -644,9 +2174,13 @@ def get_video_by_id(video_id: str) -> Optional[Video]:
             video = Video(**scroll_result[0][0].payload)
 
             # If video exists but doesn't have title, try to fetch it from YouTube
-            if not video.title or video.title == f"Video {video_id}":
+            if not _has_title(video):
                 video = _fetch_youtube_metadata(video_id, video)
 
+                # Write the fetched title back, so it is never fetched again
+                if _has_title(video):
+                    _write_back_metadata(video)
+
             return video
 
         # If video not found in database, fetch basic metadata from YouTube
@@ -658,3 +2192,39 @@ def get_video_by_id(video_id: str) -> Optional[Video]:
         logging.error(f"Error getting video by ID {video_id}: {str(e)}")
         # Return a basic video object with just the ID
         return Video(video_id=video_id, title=f"Video {video_id}")
+
+
+async def _async_fetch_youtube_metadata(video_id: str, video: Video) -> Video:
+    """Fetch video metadata without blocking, answering cache hits inline."""
+    metadata = metadata_cache.get(video_id)
+    if metadata is MISSING:
+        metadata = await run_blocking(get_youtube_metadata, video_id)
+    return _apply_youtube_metadata(video, metadata)
+
+
+async def async_get_video_by_id(video_id: str) -> Optional[Video]:
+    """Get a specific video by its video_id without blocking the event loop."""
+    import logging
+
+    try:
+        scroll_result = await async_qdrant_client.scroll(
+            collection_name=PROCESSED_VIDEOS_COLLECTION,
+            scroll_filter=_video_id_filter(video_id),
+            limit=1,  # We only need one result
+            with_payload=True,
+        )
+
+        if scroll_result[0]:
+            video = Video(**scroll_result[0][0].payload)
+            if not _has_title(video):
+                video = await _async_fetch_youtube_metadata(video_id, video)
+                if _has_title(video):
+                    await _async_write_back_metadata(video)
+            return video
+
+        logging.info(f"Video {video_id} not found in database, fetching from YouTube")
+        return await _async_fetch_youtube_metadata(video_id, Video(video_id=video_id))
+
+    except Exception as e:
+        logging.error(f"Error getting video by ID {video_id}: {str(e)}")
+        return Video(video_id=video_id, title=f"Video {video_id}")
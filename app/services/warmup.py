@@ -0,0 +1,111 @@
+"""
+Warm-up of an application worker, and the readiness it reports.
+
+Importing the application only defines things: the model is loaded, Qdrant
+is contacted and the schema verified by the warm-up steps, which the
+application runs on startup. The model is loaded before the worker accepts
+requests, so recycled workers never serve their first searches cold. If a
+step fails, such as when Qdrant cannot be reached, the worker starts anyway
+and retries it in the background, with a growing delay, until it succeeds.
+
+/healthz only tells that the worker is alive, while /readyz reports the
+state of every warm-up step and whether Qdrant answers.
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, List
+
+from app.services.embedding_service import get_embedding_dimension, get_embeddings_batch
+from app.services.executor import run_blocking
+from app.services.qdrant_service import async_qdrant_client, qdrant_client
+from app.services.schema_service import verify_schema_on_startup
+
+# Encode a text once the model is loaded, so lazy initialization of the
+# model does not slow the first search down
+WARMUP_ENCODE = os.getenv("WARMUP_ENCODE", "true").lower() == "true"
+# Delays between attempts of failed warm-up steps, doubling up to the maximum
+WARMUP_RETRY_INTERVAL = float(os.getenv("WARMUP_RETRY_INTERVAL", "2"))
+WARMUP_MAX_RETRY_INTERVAL = float(os.getenv("WARMUP_MAX_RETRY_INTERVAL", "60"))
+
+# State of every warm-up step: "pending", "done" or "failed", with the
+# duration of the last attempt and its error
+_steps: Dict[str, Dict[str, Any]] = {
+    "model": {"status": "pending"},
+    "qdrant": {"status": "pending"},
+}
+_retry_tasks: List[asyncio.Task] = []
+
+
+def warm_up_model() -> None:
+    """Load the embedding model, or connect to the embedding server."""
+    get_embedding_dimension()
+    if WARMUP_ENCODE:
+        get_embeddings_batch(["warm up"])
+
+
+def warm_up_qdrant() -> None:
+    """Check that Qdrant answers and verify the schema."""
+    qdrant_client.get_collections()
+    verify_schema_on_startup()
+
+
+async def _run_step(name: str, step) -> bool:
+    import logging
+
+    started = time.perf_counter()
+    try:
+        await run_blocking(step)
+    except Exception as e:
+        _steps[name] = {
+            "status": "failed",
+            "seconds": round(time.perf_counter() - started, 3),
+            "error": str(e),
+        }
+        logging.error(f"Warm-up of {name} failed: {str(e)}")
+        return False
+
+    _steps[name] = {"status": "done", "seconds": round(time.perf_counter() - started, 3)}
+    logging.info(f"Warm-up of {name} done in {_steps[name]['seconds']}s")
+    return True
+
+
+async def _retry_step(name: str, step) -> None:
+    interval = WARMUP_RETRY_INTERVAL
+    while True:
+        await asyncio.sleep(interval)
+        if await _run_step(name, step):
+            return
+        interval = min(interval * 2, WARMUP_MAX_RETRY_INTERVAL)
+
+
+async def start_warmup() -> None:
+    """Run the warm-up steps in order, leaving the failed ones to be retried
+    in the background."""
+    # The schema verification needs the embedding dimension, so the model comes first
+    for name, step in (("model", warm_up_model), ("qdrant", warm_up_qdrant)):
+        if not await _run_step(name, step):
+            _retry_tasks.append(asyncio.create_task(_retry_step(name, step)))
+
+
+def stop_warmup() -> None:
+    """Stop retrying the failed warm-up steps."""
+    for task in _retry_tasks:
+        task.cancel()
+
+
+async def readiness() -> Dict[str, Any]:
+    """Whether the worker is warmed up and Qdrant answers, with the details."""
+    warmed_up = all(step["status"] == "done" for step in _steps.values())
+    try:
+        await async_qdrant_client.get_collections()
+        qdrant: Dict[str, Any] = {"status": "up"}
+    except Exception as e:
+        qdrant = {"status": "down", "error": str(e)}
+
+    return {
+        "ready": warmed_up and qdrant["status"] == "up",
+        "warmup": _steps,
+        "qdrant": qdrant,
+    }
@@ -87,34 +87,16 @@ document.addEventListener('DOMContentLoaded', () => {
                 throw new Error('Invalid response: Missing video ID');
             }
             
-            // Get video title (for display)
-            const videoTitle = data.video ? data.video.title : (data.title || `Video ${videoId}`);
-            
             // Log for debugging
             console.log('Process response:', {videoId, isNewlyProcessed, data});
             
-            // Show success message
-            processStatus.innerHTML = `
-                <div role="alert" class="alert alert-success">
-                    <svg xmlns="http://www.w3.org/2000/svg" class="stroke-current shrink-0 h-6 w-6" fill="none" viewBox="0 0 24 24">
-                        <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M9 12l2 2 4-4m6 2a9 9 0 11-18 0 9 9 0 0118 0z" />
-                    </svg>
-                    <span>${isNewlyProcessed ? 'Video processed successfully!' : 'Video was already processed!'}</span>
-                    <div>
-                        <a href="/video/${videoId}" class="btn btn-sm btn-primary">
-                            <svg xmlns="http://www.w3.org/2000/svg" class="h-4 w-4 mr-1" fill="none" viewBox="0 0 24 24" stroke="currentColor">
-                                <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M14.752 11.168l-3.197-2.132A1 1 0 0010 9.87v4.263a1 1 0 001.555.832l3.197-2.132a1 1 0 000-1.664z" />
-                                <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M21 12a9 9 0 11-18 0 9 9 0 0118 0z" />
-                            </svg>
-                            Open Video
-                        </a>
-                    </div>
-                </div>
-            `;
+            // Newly submitted videos are processed in the background, so follow the job
+            if (data.job && data.job.status !== 'completed') {
+                waitForJob(data.job, videoId);
+                return;
+            }
             
-            // Update recent videos lists
-            displayRecentVideos();
-            loadFooterRecentVideos(); // Update footer videos as well
+            showProcessSuccess(videoId, isNewlyProcessed);
         })
         .catch(error => {
             // Clear timeout for long-running process
@@ -126,6 +108,77 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
     
+    // Show success message with a link to the processed video
+    function showProcessSuccess(videoId, isNewlyProcessed) {
+        processStatus.innerHTML = `
+            <div role="alert" class="alert alert-success">
+                <svg xmlns="http://www.w3.org/2000/svg" class="stroke-current shrink-0 h-6 w-6" fill="none" viewBox="0 0 24 24">
+                    <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M9 12l2 2 4-4m6 2a9 9 0 11-18 0 9 9 0 0118 0z" />
+                </svg>
+                <span>${isNewlyProcessed ? 'Video processed successfully!' : 'Video was already processed!'}</span>
+                <div>
+                    <a href="/video/${videoId}" class="btn btn-sm btn-primary">
+                        <svg xmlns="http://www.w3.org/2000/svg" class="h-4 w-4 mr-1" fill="none" viewBox="0 0 24 24" stroke="currentColor">
+                            <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M14.752 11.168l-3.197-2.132A1 1 0 0010 9.87v4.263a1 1 0 001.555.832l3.197-2.132a1 1 0 000-1.664z" />
+                            <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M21 12a9 9 0 11-18 0 9 9 0 0118 0z" />
+                        </svg>
+                        Open Video
+                    </a>
+                </div>
+            </div>
+        `;
+        
+        // Update recent videos lists
+        displayRecentVideos();
+        loadFooterRecentVideos(); // Update footer videos as well
+    }
+    
+    // Show the stage and progress of a background processing job
+    function showJobProgress(job) {
+        const progress = Math.round(job.progress || 0);
+        processStatus.innerHTML = `
+            <div class="flex flex-col items-center my-4">
+                <div class="flex items-center">
+                    <span class="loading loading-spinner loading-md text-primary"></span>
+                    <span class="ml-2">Processing video (${job.stage})... ${progress}%</span>
+                </div>
+                <progress class="progress progress-primary w-56 mt-2" value="${progress}" max="100"></progress>
+                <a href="/video/${job.video_id}?job=${job.job_id}" class="link link-primary text-sm mt-2">Open video while processing</a>
+            </div>
+        `;
+    }
+    
+    // Poll a background processing job until it finishes
+    function waitForJob(job, videoId) {
+        showJobProgress(job);
+        
+        const jobInterval = setInterval(() => {
+            fetch(`/api/video/jobs/${job.job_id}`)
+                .then(response => {
+                    if (!response.ok) {
+                        throw new Error('Failed to check processing status');
+                    }
+                    return response.json();
+                })
+                .then(currentJob => {
+                    if (currentJob.status === 'completed') {
+                        clearInterval(jobInterval);
+                        showProcessSuccess(videoId, true);
+                    } else if (currentJob.status === 'failed') {
+                        clearInterval(jobInterval);
+                        processStatus.innerHTML = handleError(new Error(currentJob.error || 'Failed to process video'));
+                    } else {
+                        showJobProgress(currentJob);
+                    }
+                })
+                .catch(error => {
+                    clearInterval(jobInterval);
+                    console.error('Job status error:', error);
+                    processStatus.innerHTML = handleError(error);
+                });
+        }, 1500);
+    }
+    
     // Display recently processed videos
     function displayRecentVideos() {
         // Show loading state
@@ -7,14 +7,21 @@ document.addEventListener('DOMContentLoaded', () => {
     const loadingIndicator = document.getElementById('loading');
     const toggleTranscriptButton = document.getElementById('toggle-transcript');
     
+    // The transcript is loaded page by page, as the viewer scrolls or plays the video
+    const TRANSCRIPT_PAGE_SIZE = 100;
+    const PRELOAD_AHEAD_SECONDS = 120;
+    
     let transcriptSegments = [];
+    let nextCursor = null;
+    let isLoadingMore = false;
+    let isFiltered = false;
     let ytPlayer = null;
     let isProcessingUrl = false;
     
     // Check if there's a search query in the URL
     const urlParams = new URLSearchParams(window.location.search);
     const searchQuery = urlParams.get('q');
-    const processingUrl = urlParams.get('processing');
+    const processingJobId = urlParams.get('job');
     
     // Format time to display as HH:MM:SS
     function formatTime(seconds) {
@@ -67,8 +74,83 @@ document.addEventListener('DOMContentLoaded', () => {
     // When player is ready
     function onPlayerReady(event) {
         console.log('Player ready');
+        
+        // Load the transcript ahead of the playback position
+        setInterval(() => {
+            if (!ytPlayer || typeof ytPlayer.getCurrentTime !== 'function') {
+                return;
+            }
+            ensureLoadedUntil(ytPlayer.getCurrentTime() + PRELOAD_AHEAD_SECONDS);
+        }, 2000);
     }
     
+    // Fetch a page of transcript segments, with the cursor of the next page
+    function fetchSegmentsPage(cursor) {
+        const params = new URLSearchParams({ limit: TRANSCRIPT_PAGE_SIZE });
+        if (cursor !== null) {
+            params.set('cursor', cursor);
+        }
+        
+        return fetch(`/api/video/segments/${videoId}?${params}`)
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error('Failed to load transcript: ' + response.status);
+                }
+                const cursorHeader = response.headers.get('X-Next-Cursor');
+                return response.json().then(segments => ({
+                    segments: segments,
+                    nextCursor: cursorHeader !== null ? cursorHeader : null
+                }));
+            });
+    }
+    
+    // Load the next page of the transcript, if any. Resolves to whether a page was loaded.
+    function loadMoreSegments() {
+        if (nextCursor === null || isLoadingMore) {
+            return Promise.resolve(false);
+        }
+        
+        isLoadingMore = true;
+        return fetchSegmentsPage(nextCursor)
+            .then(page => {
+                const offset = transcriptSegments.length;
+                transcriptSegments = transcriptSegments.concat(page.segments);
+                nextCursor = page.nextCursor;
+                if (!isFiltered) {
+                    appendTranscript(page.segments, offset);
+                }
+                return true;
+            })
+            .catch(error => {
+                console.error('Error loading more transcript:', error);
+                return false;
+            })
+            .finally(() => {
+                isLoadingMore = false;
+            });
+    }
+    
+    // Load pages until the transcript covers the given time
+    function ensureLoadedUntil(seconds) {
+        const last = transcriptSegments[transcriptSegments.length - 1];
+        if (nextCursor === null || (last && last.start >= seconds)) {
+            return;
+        }
+        loadMoreSegments().then(loaded => {
+            if (loaded) {
+                ensureLoadedUntil(seconds);
+            }
+        });
+    }
+    
+    // Load more of the transcript when scrolling near its end
+    transcriptContainer.addEventListener('scroll', () => {
+        const remaining = transcriptContainer.scrollHeight - transcriptContainer.scrollTop - transcriptContainer.clientHeight;
+        if (!isFiltered && remaining < 200) {
+            loadMoreSegments();
+        }
+    });
+    
     // Load transcript segments
     function loadTranscript() {
         transcriptContainer.innerHTML = '<div class="flex justify-center my-4"><span class="loading loading-spinner loading-md"></span><span class="ml-2">Loading transcript...</span></div>';
@@ -86,15 +168,11 @@ document.addEventListener('DOMContentLoaded', () => {
             return;
         }
         
-        fetch(`/api/video/segments/${videoId}`)
-            .then(response => {
-                if (!response.ok) {
-                    throw new Error('Failed to load transcript: ' + response.status);
-                }
-                return response.json();
-            })
-            .then(segments => {
+        fetchSegmentsPage(null)
+            .then(page => {
+                const segments = page.segments;
                 transcriptSegments = segments;
+                nextCursor = page.nextCursor;
                 
                 if (!segments || segments.length === 0) {
                     transcriptContainer.innerHTML = `
@@ -129,23 +207,23 @@ document.addEventListener('DOMContentLoaded', () => {
             });
     }
     
-    // Display transcript segments
-    function displayTranscript(segments) {
-        const html = segments.map((segment, index) => {
+    // Render transcript segments, numbered from the given index
+    function renderSegments(segments, offset) {
+        return segments.map((segment, index) => {
             const formattedTime = formatTime(segment.start);
             
             return `
-                <div class="transcript-segment" data-start="${segment.start}" data-end="${segment.end}" data-index="${index}">
+                <div class="transcript-segment" data-start="${segment.start}" data-end="${segment.end}" data-index="${offset + index}">
                     <span class="timestamp">${formattedTime}</span>
                     <span class="segment-text">${segment.text}</span>
                 </div>
             `;
         }).join('');
-        
-        transcriptContainer.innerHTML = html;
-        
-        // Add click handlers to segments
-        document.querySelectorAll('.transcript-segment').forEach(segment => {
+    }
+    
+    // Add click handlers to segment elements
+    function addSegmentClickHandlers(elements) {
+        elements.forEach(segment => {
             segment.addEventListener('click', () => {
                 const startTime = parseFloat(segment.dataset.start);
                 seekToTime(startTime);
@@ -153,6 +231,20 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     }
     
+    // Display transcript segments
+    function displayTranscript(segments) {
+        transcriptContainer.innerHTML = renderSegments(segments, 0);
+        addSegmentClickHandlers(transcriptContainer.querySelectorAll('.transcript-segment'));
+    }
+    
+    // Append a newly loaded page of segments to the displayed transcript
+    function appendTranscript(segments, offset) {
+        const template = document.createElement('template');
+        template.innerHTML = renderSegments(segments, offset);
+        addSegmentClickHandlers(template.content.querySelectorAll('.transcript-segment'));
+        transcriptContainer.appendChild(template.content);
+    }
+    
     // Seek to specific time in the video
     function seekToTime(seconds) {
         console.log('Seeking to time:', seconds);
@@ -258,6 +350,7 @@ document.addEventListener('DOMContentLoaded', () => {
             .then(results => {
                 // Hide loading indicator
                 loadingIndicator.classList.add('hidden');
+                isFiltered = true;
                 
                 if (results.length === 0) {
                     // Show "no results" message in transcript container
@@ -311,18 +404,22 @@ document.addEventListener('DOMContentLoaded', () => {
     
     // Filter transcript to show only matching segments
     function filterTranscript(results) {
+        // Hybrid search scores come from rank fusion and only order the results,
+        // so relevance is shown relative to the best result
+        const topScore = results[0].score || 1;
+        
         // Create a highlighted version of the transcript with only matching segments
         const html = results.map(result => {
             const segment = result.segment;
             const formattedTime = formatTime(segment.start);
-            const score = (result.score * 100).toFixed(0);
+            const score = (result.score / topScore * 100).toFixed(0);
             const index = transcriptSegments.findIndex(s => s.segment_id === segment.segment_id);
             
             return `
                 <div class="transcript-segment search-result" data-start="${segment.start}" data-end="${segment.end}" data-index="${index}">
                     <div class="flex justify-between items-center">
                         <span class="timestamp">${formattedTime}</span>
-                        <div class="badge badge-primary">${score}% match</div>
+                        <div class="badge badge-primary">${score}% relevance</div>
                     </div>
                     <span class="segment-text mt-1">${segment.text}</span>
                 </div>
@@ -346,11 +443,12 @@ document.addEventListener('DOMContentLoaded', () => {
     // Reset transcript filter to show all segments
     function resetTranscriptFilter() {
         searchInput.value = '';
+        isFiltered = false;
     }
     
-    // Show processing indicator if URL was just processed
+    // Show processing indicator if the video is still being processed by a background job
     function showProcessingIndicator() {
-        if (processingUrl === 'true') {
+        if (processingJobId) {
             isProcessingUrl = true;
             transcriptContainer.innerHTML = `
                 <div class="flex items-center justify-center my-4">
@@ -359,57 +457,43 @@ document.addEventListener('DOMContentLoaded', () => {
                 </div>
             `;
             
-            // Check for segments every second
+            // Check the job status every two seconds
             const processingInterval = setInterval(() => {
-                // Validate video ID before making API call
-                if (!videoId || videoId === 'undefined' || videoId === 'null') {
-                    clearInterval(processingInterval);
-                    transcriptContainer.innerHTML = `
-                        <div class="alert alert-error">
-                            <div>
-                                <svg xmlns="http://www.w3.org/2000/svg" class="stroke-current shrink-0 h-6 w-6" fill="none" viewBox="0 0 24 24"><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M10 14l2-2m0 0l2-2m-2 2l-2-2m2 2l2 2m7-2a9 9 0 11-18 0 9 9 0 0118 0z" /></svg>
-                                <span>Invalid video ID. Please return to the home page and select a valid video.</span>
-                            </div>
-                        </div>
-                    `;
-                    return;
-                }
-                
-                fetch(`/api/video/segments/${videoId}`)
+                fetch(`/api/video/jobs/${processingJobId}`)
                     .then(response => {
                         if (!response.ok) {
                             return null;
                         }
                         return response.json();
                     })
-                    .then(segments => {
-                        if (segments && segments.length > 0) {
+                    .then(job => {
+                        if (!job) {
+                            // Unknown job, the video may already be processed
                             clearInterval(processingInterval);
                             isProcessingUrl = false;
                             loadTranscript();
+                        } else if (job.status === 'completed') {
+                            clearInterval(processingInterval);
+                            isProcessingUrl = false;
+                            loadTranscript();
+                        } else if (job.status === 'failed') {
+                            clearInterval(processingInterval);
+                            isProcessingUrl = false;
+                            transcriptContainer.innerHTML = handleError(new Error(job.error || 'Failed to process video'));
+                        } else {
+                            transcriptContainer.innerHTML = `
+                                <div class="flex items-center justify-center my-4">
+                                    <span class="loading loading-spinner loading-md text-primary"></span>
+                                    <span class="ml-2">Processing video (${job.stage})... ${Math.round(job.progress || 0)}%</span>
+                                </div>
+                            `;
                         }
                     })
                     .catch(error => {
-                        console.error('Error checking segments:', error);
+                        console.error('Error checking processing status:', error);
                     });
             }, 2000);
             
-            // Set timeout to stop checking after 2 minutes
-            setTimeout(() => {
-                clearInterval(processingInterval);
-                if (isProcessingUrl) {
-                    transcriptContainer.innerHTML = `
-                        <div class="alert alert-warning">
-                            <div>
-                                <svg xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24" class="stroke-current shrink-0 w-6 h-6"><path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M13 16h-1v-4h-1m1-4h.01M21 12a9 9 0 11-18 0 9 9 0 0118 0z"></path></svg>
-                                <span>Processing is taking longer than expected. Refresh the page to check progress.</span>
-                            </div>
-                        </div>
-                    `;
-                    isProcessingUrl = false;
-                }
-            }, 120000);
-            
             return true;
         }
         return false;
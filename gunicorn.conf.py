@@ -1,5 +1,16 @@
+import glob
 import os
 import multiprocessing
+import subprocess
+import sys
+
+# Prometheus metrics of all the workers are aggregated through files in this
+# directory, which must be set before the app is imported. The samples of the
+# previous run are removed, but nothing else, as the directory is configurable.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus-metrics")
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+for metrics_file in glob.glob(os.path.join(os.environ["PROMETHEUS_MULTIPROC_DIR"], "*.db")):
+    os.remove(metrics_file)
 
 # Get the number of workers from environment variable or calculate based on CPU cores
 workers_env = os.getenv("WORKERS")
@@ -29,4 +40,50 @@ worker_connections = 1000  # Maximum number of connections each worker can handl
 keepalive = 5  # Seconds to wait between client requests before closing connection
 
 # For better performance with Uvicorn
-proc_name = "vibe-coding-rag"
\ No newline at end of file
+proc_name = "vibe-coding-rag"
+
+# Embedding model sharing, see app/services/embedding_service.py
+embedding_mode = os.getenv("EMBEDDING_MODE", "local")
+embedding_server = None
+
+if embedding_mode == "preload":
+    # Load the model in the master, so the forked workers share its weights.
+    # Freezing the heap keeps the garbage collector from touching those pages.
+    import gc
+    from app.services.embedding_service import get_encoder
+
+    get_encoder()
+    gc.freeze()
+
+
+def on_starting(server):
+    """Start the embedding server before the workers in the sidecar mode, then
+    reconcile the Qdrant schema once."""
+    global embedding_server
+    if embedding_mode == "sidecar":
+        embedding_server = subprocess.Popen(
+            [sys.executable, "-m", "app.services.embedding_server"]
+        )
+        server.log.info(f"Started embedding server (pid: {embedding_server.pid})")
+
+    # Only the master changes the schema, the workers just verify it. It runs
+    # in a subprocess, so the workers do not inherit its Qdrant connections.
+    if os.getenv("SCHEMA_RECONCILE", "apply") == "apply":
+        result = subprocess.run([sys.executable, "-m", "app.services.schema_service"])
+        if result.returncode != 0:
+            server.log.error("Schema reconciliation failed, the workers will report the drift")
+
+
+def child_exit(server, worker):
+    """Stop reporting the live metrics of a worker that exited."""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def on_exit(server):
+    """Stop the embedding server together with gunicorn."""
+    if embedding_server is not None:
+        embedding_server.terminate()
+        embedding_server.wait(timeout=graceful_timeout)
+
@@ -0,0 +1,107 @@
+"""Parity of the NumPy static embedding encoder with SentenceTransformer."""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from app.services.embedding_service import MODEL_CACHE_FOLDER, MODEL_NAME, LocalEncoder
+from app.services.static_encoder import StaticEmbeddingEncoder
+
+# Largest absolute difference allowed between the embeddings of both encoders
+ATOL = 1e-4
+
+# Dimension of the embeddings of the synthetic model
+SYNTHETIC_DIMENSION = 16
+
+TEXTS = [
+    "Introduction to large language models",
+    "In this demo we build a vector search engine with Qdrant.",
+    "",
+    "conclusion " * 300,
+    "Tokenizers, APIs & acronyms: RAG, HNSW, BM25!",
+]
+
+
+@pytest.fixture(scope="module")
+def synthetic_model_path(tmp_path_factory: pytest.TempPathFactory) -> str:
+    """A tiny static embedding model, saved in the SentenceTransformer layout."""
+    from safetensors.numpy import save_file
+    from tokenizers import Tokenizer, models, normalizers, pre_tokenizers
+
+    # Leave some words out of the vocabulary, so that [UNK] is exercised too
+    words = sorted({w for text in TEXTS for w in text.lower().replace(",", " ").split()})
+    vocab = {"[UNK]": 0, **{word: i + 1 for i, word in enumerate(words[::2])}}
+    tokenizer = Tokenizer(models.WordLevel(vocab, unk_token="[UNK]"))
+    tokenizer.normalizer = normalizers.Lowercase()
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+
+    path = tmp_path_factory.mktemp("static-model")
+    module_path = path / "0_StaticEmbedding"
+    module_path.mkdir()
+    (path / "1_Normalize").mkdir()
+    tokenizer.save(str(module_path / "tokenizer.json"))
+
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((len(vocab), SYNTHETIC_DIMENSION)).astype(np.float32)
+    save_file({"embedding.weight": embeddings}, str(module_path / "model.safetensors"))
+
+    modules = [
+        {"idx": 0, "name": "0", "path": "0_StaticEmbedding", "type": "sentence_transformers.models.StaticEmbedding"},
+        {"idx": 1, "name": "1", "path": "1_Normalize", "type": "sentence_transformers.models.Normalize"},
+    ]
+    with open(os.path.join(path, "modules.json"), "w") as f:
+        json.dump(modules, f)
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def model_path() -> str:
+    """The local directory of the real model, skipping the tests if it is not cached."""
+    from huggingface_hub import snapshot_download
+
+    try:
+        return snapshot_download(MODEL_NAME, cache_dir=MODEL_CACHE_FOLDER, local_files_only=True)
+    except Exception:
+        pytest.skip(f"Model {MODEL_NAME} is not cached in {MODEL_CACHE_FOLDER}")
+
+
+def _assert_parity(path: str) -> None:
+    sentence_transformers = pytest.importorskip("sentence_transformers")
+
+    model = sentence_transformers.SentenceTransformer(path, device="cpu")
+    expected = LocalEncoder(model).encode(TEXTS)
+    encoder = StaticEmbeddingEncoder(path, MODEL_CACHE_FOLDER)
+    actual = encoder.encode(TEXTS)
+
+    assert actual.shape == expected.shape
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=ATOL)
+    assert encoder.dimension() == LocalEncoder(model).dimension()
+
+
+def test_static_encoder_matches_sentence_transformers(synthetic_model_path: str):
+    _assert_parity(synthetic_model_path)
+
+
+def test_static_encoder_matches_reference_mean_pooling(synthetic_model_path: str):
+    from safetensors.numpy import load_file
+    from tokenizers import Tokenizer
+
+    module_path = os.path.join(synthetic_model_path, "0_StaticEmbedding")
+    tokenizer = Tokenizer.from_file(os.path.join(module_path, "tokenizer.json"))
+    embeddings = load_file(os.path.join(module_path, "model.safetensors"))["embedding.weight"]
+
+    expected = np.zeros((len(TEXTS), SYNTHETIC_DIMENSION), dtype=np.float32)
+    for i, text in enumerate(TEXTS):
+        ids = tokenizer.encode(text, add_special_tokens=False).ids
+        if ids:
+            vector = embeddings[ids].mean(axis=0)
+            expected[i] = vector / np.linalg.norm(vector)
+
+    actual = StaticEmbeddingEncoder(synthetic_model_path).encode(TEXTS, batch_size=2)
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=ATOL)
+
+
+def test_static_encoder_matches_sentence_transformers_real_model(model_path: str):
+    _assert_parity(model_path)